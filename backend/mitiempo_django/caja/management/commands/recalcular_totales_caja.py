@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from caja.models import Caja
+
+class Command(BaseCommand):
+    help = 'Recalcula los totales materializados de cada caja a partir de sus ventas, compras, ingresos y egresos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo informa las cajas con diferencias, sin modificarlas'
+        )
+
+    def handle(self, *args, **options):
+        verificar = options['verificar']
+        campos = list(Caja.CAMPOS_TOTALES.values())
+
+        with transaction.atomic():
+            cajas = Caja.objects.with_totales().order_by('id')
+            if not verificar:
+                cajas = cajas.select_for_update()
+
+            a_corregir = []
+            for caja in cajas:
+                diferencias = []
+                for anotacion, campo in Caja.CAMPOS_TOTALES.items():
+                    real = getattr(caja, anotacion)
+                    if getattr(caja, campo) != real:
+                        diferencias.append(f'{campo}: {getattr(caja, campo)} -> {real}')
+                        setattr(caja, campo, real)
+                if diferencias:
+                    a_corregir.append(caja)
+                    self.stdout.write(self.style.WARNING(f'Caja N°{caja.id}: ' + ', '.join(diferencias)))
+
+            if not a_corregir:
+                self.stdout.write(self.style.SUCCESS('Todos los totales de caja coinciden.'))
+                return
+
+            if verificar:
+                self.stdout.write(self.style.WARNING(f'{len(a_corregir)} cajas con diferencias.'))
+            else:
+                Caja.objects.bulk_update(a_corregir, campos, batch_size=500)
+                self.stdout.write(self.style.SUCCESS(f'Se corrigieron {len(a_corregir)} cajas.'))
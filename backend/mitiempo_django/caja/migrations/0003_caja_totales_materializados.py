@@ -0,0 +1,78 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:41
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_totales(apps, schema_editor):
+    Caja = apps.get_model('caja', 'Caja')
+    Venta = apps.get_model('ventas', 'Venta')
+    Compra = apps.get_model('compras', 'Compra')
+    Ingreso = apps.get_model('movimiento_caja', 'Ingreso')
+    Egreso = apps.get_model('movimiento_caja', 'Egreso')
+
+    def total(modelo, campo, **filtros):
+        sub = modelo.objects.filter(caja=OuterRef('pk'), **filtros).order_by().values('caja').annotate(
+            total=Sum(campo)
+        ).values('total')
+        return Coalesce(
+            Subquery(sub, output_field=DecimalField(max_digits=12, decimal_places=2)),
+            Value(Decimal('0.00'))
+        )
+
+    pagado = {'estado_venta__estado_venta_nombre': 'Pagado'}
+    Caja.objects.update(
+        caja_total_ventas_efectivo=total(Venta, 'venta_total', venta_medio_pago='efectivo', **pagado),
+        caja_total_ventas_transferencia=total(Venta, 'venta_total', venta_medio_pago='transferencia', **pagado),
+        caja_total_compras_efectivo=total(Compra, 'compra_total', compra_metodo_pago='efectivo'),
+        caja_total_compras_transferencia=total(Compra, 'compra_total', compra_metodo_pago='transferencia'),
+        caja_total_ingresos=total(Ingreso, 'ingreso_monto'),
+        caja_total_egresos=total(Egreso, 'egreso_monto'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0002_initial'),
+        ('ventas', '0004_alter_detalle_venta_producto_and_more'),
+        ('compras', '0006_alter_detalle_compra_compra_and_more'),
+        ('movimiento_caja', '0002_remove_egreso_egreso_fecha_hora_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caja',
+            name='caja_total_compras_efectivo',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='caja',
+            name='caja_total_compras_transferencia',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='caja',
+            name='caja_total_egresos',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='caja',
+            name='caja_total_ingresos',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='caja',
+            name='caja_total_ventas_efectivo',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='caja',
+            name='caja_total_ventas_transferencia',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
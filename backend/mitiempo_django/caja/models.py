@@ -1,6 +1,53 @@
+from decimal import Decimal
+from django.apps import apps
 from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
 from empleado.models import Empleado
-# Create your models here.
+
+
+def _total_por_caja(modelo, campo, **filtros):
+    """Subconsulta con la suma de 'campo' de las filas de 'modelo' de cada caja."""
+    sub = modelo.objects.filter(caja=OuterRef('pk'), **filtros).order_by().values('caja').annotate(
+        total=Sum(campo)
+    ).values('total')
+    return Coalesce(
+        Subquery(sub, output_field=DecimalField(max_digits=12, decimal_places=2)),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+class CajaQuerySet(models.QuerySet):
+    def with_totales(self):
+        """
+        Anota los totales de ventas, compras, ingresos y egresos de cada caja
+        con subconsultas correlacionadas: todo sale en una sola consulta.
+
+        No la usan las vistas: leen las columnas caja_total_* (ver
+        acumular()). Es la fuente de verdad de recalcular_totales_caja, que
+        compara y corrige esas columnas contra estas sumas, y de los tests
+        que verifican que los acumulados no se desvían.
+        """
+        # Import diferido: ventas/compras/movimiento_caja importan Caja
+        Venta = apps.get_model('ventas', 'Venta')
+        Compra = apps.get_model('compras', 'Compra')
+        Ingreso = apps.get_model('movimiento_caja', 'Ingreso')
+        Egreso = apps.get_model('movimiento_caja', 'Egreso')
+
+        Estado_Venta = apps.get_model('ventas', 'Estado_Venta')
+
+        pagado = {'estado_venta_id': Estado_Venta.id_por_nombre(Estado_Venta.PAGADO)}
+        return self.annotate(
+            total_ventas_efectivo=_total_por_caja(Venta, 'venta_total', venta_medio_pago='efectivo', **pagado),
+            total_ventas_transferencia=_total_por_caja(Venta, 'venta_total', venta_medio_pago='transferencia', **pagado),
+            total_compras_efectivo=_total_por_caja(Compra, 'compra_total', compra_metodo_pago='efectivo'),
+            total_compras_transferencia=_total_por_caja(Compra, 'compra_total', compra_metodo_pago='transferencia'),
+            total_ingresos_manuales=_total_por_caja(Ingreso, 'ingreso_monto'),
+            total_egresos_manuales=_total_por_caja(Egreso, 'egreso_monto'),
+        )
+
+
 class Caja(models.Model):#SOLO EL ADMINISTRADOR MANEJA CAJA
     empleado=models.ForeignKey(Empleado,on_delete=models.CASCADE)
     caja_estado=models.BooleanField(default=True)
@@ -9,11 +56,49 @@ class Caja(models.Model):#SOLO EL ADMINISTRADOR MANEJA CAJA
     caja_fecha_hora_apertura=models.DateTimeField(auto_now_add=True)
     caja_fecha_hora_cierre=models.DateTimeField(null=True,blank=True)
     caja_observacion=models.CharField(max_length=400,blank=True,null=True)
+
+    # Totales acumulados al registrar cada movimiento (ver acumular()).
+    # 'python manage.py recalcular_totales_caja' los reconstruye desde las filas.
+    caja_total_ventas_efectivo=models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    caja_total_ventas_transferencia=models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    caja_total_compras_efectivo=models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    caja_total_compras_transferencia=models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    caja_total_ingresos=models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    caja_total_egresos=models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Nombre de la anotación de with_totales() -> columna materializada
+    CAMPOS_TOTALES = {
+        'total_ventas_efectivo': 'caja_total_ventas_efectivo',
+        'total_ventas_transferencia': 'caja_total_ventas_transferencia',
+        'total_compras_efectivo': 'caja_total_compras_efectivo',
+        'total_compras_transferencia': 'caja_total_compras_transferencia',
+        'total_ingresos_manuales': 'caja_total_ingresos',
+        'total_egresos_manuales': 'caja_total_egresos',
+    }
+
+    objects = CajaQuerySet.as_manager()
     
     class Meta:
         verbose_name_plural="Cajas"
         verbose_name="Caja"
     def __str__(self):
         return f"Caja N°{self.id} - Apertura: {self.caja_fecha_hora_apertura.strftime('%Y-%m-%d %H:%M')}"
+
+    def acumular(self, saldo=0, **totales):
+        """
+        Suma montos a los totales materializados y al saldo con un único
+        UPDATE atómico (F()), sin pisar lo que sumen otras transacciones.
+        Las claves de 'totales' son las de CAMPOS_TOTALES, ej:
+        caja.acumular(saldo=monto, total_ventas_efectivo=monto)
+        """
+        cambios = {}
+        for nombre, monto in totales.items():
+            if monto:
+                campo = self.CAMPOS_TOTALES[nombre]
+                cambios[campo] = F(campo) + monto
+        if saldo:
+            cambios['caja_saldo_final'] = Coalesce(F('caja_saldo_final'), Value(Decimal('0.00'))) + saldo
+        if cambios:
+            Caja.objects.filter(pk=self.pk).update(**cambios)
     
     
@@ -1,12 +1,8 @@
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
-from django.db.models import Sum
-from decimal import Decimal
 from .models import Caja
 from empleado.serializers import EmpleadoNestedSerializer
-from ventas.models import Venta
-from compras.models import Compra
-from movimiento_caja.models import Ingreso, Egreso
 
 class CajaListSerializer(serializers.ModelSerializer):
     """ 
@@ -36,47 +32,24 @@ class CajaListSerializer(serializers.ModelSerializer):
             'saldo_calculado_efectivo', 'saldo_calculado_transferencia'
         ]
         
+    # Totales materializados en la propia caja (ver Caja.acumular())
     def get_total_ventas_efectivo(self, obj):
-        total = Venta.objects.filter(
-            caja=obj, 
-            estado_venta__estado_venta_nombre='Pagado', # <-- CORREGIDO
-            venta_medio_pago='efectivo'
-        ).aggregate(total=Sum('venta_total'))['total']
-        return total or Decimal('0.00')
+        return obj.caja_total_ventas_efectivo
 
     def get_total_ventas_transferencia(self, obj):
-        total = Venta.objects.filter(
-            caja=obj, 
-            estado_venta__estado_venta_nombre='Pagado', # <-- CORREGIDO
-            venta_medio_pago='transferencia'
-        ).aggregate(total=Sum('venta_total'))['total']
-        return total or Decimal('0.00')
+        return obj.caja_total_ventas_transferencia
 
     def get_total_compras_efectivo(self, obj):
-        total = Compra.objects.filter(
-            caja=obj,
-            compra_metodo_pago='efectivo'
-        ).aggregate(total=Sum('compra_total'))['total']
-        return total or Decimal('0.00')
-        
+        return obj.caja_total_compras_efectivo
+
     def get_total_compras_transferencia(self, obj):
-        total = Compra.objects.filter(
-            caja=obj,
-            compra_metodo_pago='transferencia'
-        ).aggregate(total=Sum('compra_total'))['total']
-        return total or Decimal('0.00')
-        
+        return obj.caja_total_compras_transferencia
+
     def get_total_ingresos_manuales(self, obj):
-        total = Ingreso.objects.filter(
-            caja=obj
-        ).aggregate(total=Sum('ingreso_monto'))['total']
-        return total or Decimal('0.00')
-        
+        return obj.caja_total_ingresos
+
     def get_total_egresos_manuales(self, obj):
-        total = Egreso.objects.filter(
-            caja=obj
-        ).aggregate(total=Sum('egreso_monto'))['total']
-        return total or Decimal('0.00')
+        return obj.caja_total_egresos
 
     def get_saldo_calculado_efectivo(self, obj):
         monto_inicial = obj.caja_monto_inicial
@@ -114,34 +87,20 @@ class CajaCloseSerializer(serializers.ModelSerializer):
         ]
 
     def update(self, instance, validated_data):
-        monto_inicial = instance.caja_monto_inicial
-        
-        
-        ventas_efectivo = Venta.objects.filter(
-            caja=instance, 
-            estado_venta__estado_venta_nombre='Pagado', # <-- CORREGIDO
-            venta_medio_pago='efectivo'
-        ).aggregate(total=Sum('venta_total'))['total'] or Decimal('0.00')
-        
-        ingresos_extra = Ingreso.objects.filter(
-            caja=instance
-        ).aggregate(total=Sum('ingreso_monto'))['total'] or Decimal('0.00')
+        with transaction.atomic():
+            # Releer bloqueando: los totales pueden haber cambiado desde get_object()
+            caja = Caja.objects.select_for_update().get(pk=instance.pk)
 
-        compras_efectivo = Compra.objects.filter(
-            caja=instance,
-            compra_metodo_pago='efectivo'
-        ).aggregate(total=Sum('compra_total'))['total'] or Decimal('0.00')
-        
-        egresos_extra = Egreso.objects.filter(
-            caja=instance
-        ).aggregate(total=Sum('egreso_monto'))['total'] or Decimal('0.00')
-
-        saldo_calculado = (monto_inicial + ventas_efectivo + ingresos_extra) - (compras_efectivo + egresos_extra)
+            saldo_calculado = (
+                caja.caja_monto_inicial + caja.caja_total_ventas_efectivo + caja.caja_total_ingresos
+            ) - (caja.caja_total_compras_efectivo + caja.caja_total_egresos)
 
-        instance.caja_saldo_final = saldo_calculado
-        instance.caja_observacion = validated_data.get('caja_observacion', instance.caja_observacion)
-        instance.caja_estado = False 
-        instance.caja_fecha_hora_cierre = timezone.now()
-        
-        instance.save()
-        return instance
\ No newline at end of file
+            caja.caja_saldo_final = saldo_calculado
+            caja.caja_observacion = validated_data.get('caja_observacion', caja.caja_observacion)
+            caja.caja_estado = False 
+            caja.caja_fecha_hora_cierre = timezone.now()
+            
+            caja.save(update_fields=[
+                'caja_saldo_final', 'caja_observacion', 'caja_estado', 'caja_fecha_hora_cierre'
+            ])
+        return caja
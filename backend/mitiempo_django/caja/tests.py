@@ -1,3 +1,137 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from compras.models import Proveedor
+from empleado.models import Empleado
+from inventario.models import Categoria_Insumo, Insumo, Producto, Tipo_Producto
+from servicio.models import Servicio
+from ventas.models import Estado_Venta, Venta, VentasDiarias
+from .models import Caja
+
+
+class TotalesMaterializadosTest(TestCase):
+    """Las columnas caja_total_* deben coincidir con la suma de los movimientos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        Empleado.objects.create(user=cls.staff)
+        cls.caja = Caja.objects.create(empleado=cls.staff.empleado, caja_monto_inicial=100)
+        tipo = Tipo_Producto.objects.create(tipo_producto_nombre='Reventa')
+        cls.producto = Producto.objects.create(
+            tipo_producto=tipo, producto_nombre='Shampoo', producto_precio=10, stock=100
+        )
+        cls.servicio = Servicio.objects.create(
+            tipo_serv='peluqueria', nombre='Corte', precio=100, duracion=30, dias_disponibles=['lunes']
+        )
+        cls.proveedor = Proveedor.objects.create(proveedor_nombre='Proveedor')
+        categoria = Categoria_Insumo.objects.create(categoria_insumo_nombre='Tintes')
+        cls.insumo = Insumo.objects.create(
+            categoria_insumo=categoria, insumo_nombre='Tinte', insumo_unidad='ml'
+        )
+        cls.anulado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.ANULADO)
+
+    def setUp(self):
+        cache.clear()
+        Estado_Venta.limpiar_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def vender(self, medio_pago, productos=0, servicios=0):
+        resp = self.client.post('/api/ventas/ventas/', {
+            'venta_medio_pago': medio_pago,
+            'productos': [
+                {'producto_id': self.producto.pk, 'cantidad': productos, 'precio_unitario': '10'}
+            ] if productos else [],
+            'servicios': [
+                {'servicio_id': self.servicio.pk, 'cantidad': servicios, 'precio': '100'}
+            ] if servicios else [],
+        }, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return self.caja.venta_set.latest('id')
+
+    def comprar(self, medio_pago, cantidad):
+        resp = self.client.post('/api/compras/compras/', {
+            'proveedor': self.proveedor.pk,
+            'compra_metodo_pago': medio_pago,
+            'detalles': [{
+                'insumo_id': self.insumo.pk, 'detalle_compra_cantidad': cantidad,
+                'detalle_compra_precio_unitario': '5',
+            }],
+        }, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+
+    def anular(self, venta):
+        resp = self.client.patch(
+            f'/api/ventas/ventas/{venta.pk}/', {'estado_venta': self.anulado.pk}, format='json'
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+
+    def verificar(self):
+        salida = StringIO()
+        call_command('recalcular_totales_caja', '--verificar', stdout=salida)
+        return salida.getvalue()
+
+    def test_coinciden_con_recalcular_totales_caja(self):
+        solo_productos = self.vender('efectivo', productos=2)
+        self.vender('transferencia', productos=5)
+        mixta = self.vender('efectivo', productos=1, servicios=1)
+        self.vender('transferencia', servicios=2)
+        self.comprar('efectivo', 4)
+        self.comprar('transferencia', 2)
+        self.client.post('/api/movimiento-caja/ingresos/',
+                         {'ingreso_descripcion': 'Cambio', 'ingreso_monto': '30'}, format='json')
+        self.client.post('/api/movimiento-caja/egresos/',
+                         {'egreso_descripcion': 'Limpieza', 'egreso_monto': '5'}, format='json')
+        self.assertIn('coinciden', self.verificar())
+
+        # Anulación (sólo productos) y devolución parcial (venta mixta)
+        self.anular(solo_productos)
+        self.anular(mixta)
+        mixta.refresh_from_db()
+        self.assertEqual(mixta.estado_venta.estado_venta_nombre, Estado_Venta.DEVOLUCION_PARCIAL)
+
+        salida = self.verificar()
+        self.assertIn('Todos los totales de caja coinciden.', salida)
+        self.assertNotIn('Caja N°', salida)
+
+        caja = Caja.objects.with_totales().get(pk=self.caja.pk)
+        for anotacion, campo in Caja.CAMPOS_TOTALES.items():
+            self.assertEqual(getattr(caja, campo), getattr(caja, anotacion), campo)
+        # Sólo queda pagada la venta por transferencia de productos y la de servicios
+        self.assertEqual(caja.caja_total_ventas_efectivo, Decimal('0'))
+        self.assertEqual(caja.caja_total_ventas_transferencia, Decimal('250'))
+        self.assertEqual(caja.caja_total_egresos, Decimal('35'))
+
+    def test_verificar_detecta_diferencias(self):
+        self.vender('efectivo', productos=2)
+        Caja.objects.filter(pk=self.caja.pk).update(caja_total_ventas_efectivo=0)
+
+        salida = self.verificar()
+        self.assertIn(f'Caja N°{self.caja.pk}', salida)
+        self.assertIn('caja_total_ventas_efectivo: 0', salida)
+
+        call_command('recalcular_totales_caja', stdout=StringIO())
+        self.assertIn('coinciden', self.verificar())
+
+    def test_una_venta_no_se_borra(self):
+        venta = self.vender('efectivo', productos=2)
+        acumulados = list(VentasDiarias.objects.values_list('fecha', 'medio_pago', 'cantidad_ventas', 'total'))
+
+        resp = self.client.delete(f'/api/ventas/ventas/{venta.pk}/')
+        self.assertEqual(resp.status_code, 405)
+        self.assertTrue(Venta.objects.filter(pk=venta.pk).exists())
 
-# Create your tests here.
+        # Caja y acumulados siguen coincidiendo con sus recálculos
+        self.assertIn('Todos los totales de caja coinciden.', self.verificar())
+        call_command('recalcular_ventas_diarias', stdout=StringIO())
+        self.assertEqual(
+            list(VentasDiarias.objects.values_list('fecha', 'medio_pago', 'cantidad_ventas', 'total')),
+            acumulados
+        )
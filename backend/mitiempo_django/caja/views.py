@@ -1,14 +1,20 @@
 from rest_framework import generics, permissions, status, views, serializers
 from rest_framework.response import Response
 from decimal import Decimal
+from core.pagination import HistorialCursorPagination
 from .models import Caja
 from .serializers import CajaListSerializer, CajaCreateSerializer, CajaCloseSerializer
 
 
+class CajaPagination(HistorialCursorPagination):
+    ordering = ('-caja_fecha_hora_apertura', '-id')
+
+
 class CajaHistoryView(generics.ListAPIView):
     queryset = Caja.objects.select_related("empleado__user").order_by("-caja_fecha_hora_apertura")
     serializer_class = CajaListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CajaPagination
 
 
 class CajaStatusView(views.APIView):
@@ -17,7 +23,7 @@ class CajaStatusView(views.APIView):
     def get(self, request):
         # Si hay una caja abierta → devolverla
         try:
-            caja_abierta = Caja.objects.get(caja_estado=True)
+            caja_abierta = Caja.objects.select_related("empleado__user").get(caja_estado=True)
             return Response(CajaListSerializer(caja_abierta).data, status=200)
 
         except Caja.DoesNotExist:
@@ -88,6 +94,11 @@ class CerrarCajaView(generics.UpdateAPIView):
 from rest_framework.views import APIView
 from django.db.models import Sum, Q
 from datetime import date, timedelta, datetime
+from ventas.models import Venta, Estado_Venta
+from compras.models import Compra
+from movimiento_caja.models import Ingreso, Egreso
+from core.fechas import filtro_dias
+from django.utils import timezone
 
 class ReporteIngresosEgresos(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -111,7 +122,7 @@ class ReporteIngresosEgresos(APIView):
         except Exception:
             dias = 30
 
-        hoy = date.today()
+        hoy = timezone.localdate()
         inicio = hoy - timedelta(days=dias)
         return inicio, hoy
 
@@ -139,8 +150,8 @@ class ReporteIngresosEgresos(APIView):
 
         # INGRESOS por VENTAS pagadas
         ventas_qs = Venta.objects.filter(
-            venta_fecha_hora__date__range=[inicio, hasta],
-            estado_venta__estado_venta_nombre='Pagado',
+            **filtro_dias('venta_fecha_hora', inicio, hasta),
+            estado_venta_id=Estado_Venta.id_por_nombre(Estado_Venta.PAGADO),
             **caja_filter
         ).aggregate(total=Sum('venta_total'))
         ingresos_ventas = ventas_qs['total'] or 0
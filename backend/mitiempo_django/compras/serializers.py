@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from django.db import transaction
-from django.db.models import F
+from django.core.exceptions import ValidationError as DjangoValidationError
 from .models import Proveedor, Compra, Detalle_Compra
 from inventario.models import Insumo , Producto
+from inventario import stock
 from caja.models import Caja
 from empleado.serializers import EmpleadoNestedSerializer
+from core.serializers import CamposDinamicosMixin
 from django.contrib.auth.models import User
 from django.utils import timezone # Necesario para validaciones de fecha/hora si se envían
 # --- Serializer para Proveedor (CRUD completo) ---
@@ -109,53 +111,58 @@ class CompraCreateSerializer(serializers.ModelSerializer):
                     **validated_data
                 )
 
-                detalles_objs = []
-                
-                # 2. Iterar detalles y actualizar stocks según tipo
-                for item in detalles_data:
-                    insumo_id = item.get('insumo_id')
-                    producto_id = item.get('producto_id')
-                    cantidad = item['detalle_compra_cantidad']
-                    precio = item['detalle_compra_precio_unitario']
-                    
-                    if insumo_id:
-                        # Es un INSUMO
-                        insumo = Insumo.objects.select_for_update().get(id=insumo_id)
-                        insumo.insumo_stock = F('insumo_stock') + cantidad
-                        insumo.save()
-                        
-                        detalles_objs.append(Detalle_Compra(
-                            compra=compra,
-                            insumo=insumo,
-                            producto=None,
-                            detalle_compra_cantidad=cantidad,
-                            detalle_compra_precio_unitario=precio
-                        ))
-                    
-                    elif producto_id:
-                        # Es un PRODUCTO
-                        producto = Producto.objects.select_for_update().get(id=producto_id)
-                        producto.stock = F('stock') + cantidad # Usamos campo 'stock' del modelo Producto
-                        producto.save()
-
-                        detalles_objs.append(Detalle_Compra(
-                            compra=compra,
-                            insumo=None,
-                            producto=producto,
-                            detalle_compra_cantidad=cantidad,
-                            detalle_compra_precio_unitario=precio
-                        ))
+                # 2. Stock: insumos y productos se bloquean en una consulta por
+                # modelo (ordenados por id), se validan en memoria y se suman
+                # con un único UPDATE por modelo
+                insumos_cant = stock.sumar_cantidades(
+                    (item['insumo_id'], item['detalle_compra_cantidad'])
+                    for item in detalles_data if item.get('insumo_id')
+                )
+                productos_cant = stock.sumar_cantidades(
+                    (item['producto_id'], item['detalle_compra_cantidad'])
+                    for item in detalles_data if item.get('producto_id')
+                )
+                insumos = stock.bloquear(Insumo, insumos_cant)
+                productos = stock.bloquear(Producto, productos_cant)
+                if len(insumos) != len(insumos_cant):
+                    raise Insumo.DoesNotExist("Insumo no encontrado.")
+                if len(productos) != len(productos_cant):
+                    raise Producto.DoesNotExist("Producto no encontrado.")
+
+                for insumo_id, cantidad in insumos_cant.items():
+                    insumos[insumo_id].insumo_stock += cantidad
+                for producto_id, cantidad in productos_cant.items():
+                    productos[producto_id].stock += cantidad
+                stock.validar(insumos.values())
+                stock.validar(productos.values())
+
+                detalles_objs = [
+                    Detalle_Compra(
+                        compra=compra,
+                        insumo_id=item.get('insumo_id') or None,
+                        producto_id=item.get('producto_id') or None,
+                        detalle_compra_cantidad=item['detalle_compra_cantidad'],
+                        detalle_compra_precio_unitario=item['detalle_compra_precio_unitario']
+                    )
+                    for item in detalles_data
+                ]
+
+                stock.mover(Insumo, 'insumo_stock', insumos_cant, campo_fecha='insumo_fecha_actualizacion')
+                stock.mover(Producto, 'stock', productos_cant, campo_fecha='producto_fecha_actualizacion')
 
                 # Guardar detalles en lote
                 Detalle_Compra.objects.bulk_create(detalles_objs)
                 
-                # 3. Descontar de Caja si es efectivo
-                if compra.compra_metodo_pago == 'efectivo':
-                    caja_abierta.caja_saldo_final -= compra_total
-                    caja_abierta.save()
+                # 3. Totales de la caja; descontar saldo si es efectivo
+                caja_abierta.acumular(
+                    saldo=-compra_total if compra.compra_metodo_pago == 'efectivo' else 0,
+                    **{f'total_compras_{compra.compra_metodo_pago}': compra_total}
+                )
                     
                 return compra
 
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
         except Exception as e:
             raise serializers.ValidationError(f"Error procesando compra: {str(e)}")
 
@@ -176,22 +183,23 @@ class DetalleCompraReadSerializer(serializers.ModelSerializer):
             'detalle_compra_cantidad', 
             'detalle_compra_precio_unitario'
         ]
+    # Se pregunta por el *_id: no carga la relación si la línea es del otro tipo
     def get_item_nombre(self, obj):
-        if obj.insumo: return obj.insumo.insumo_nombre
-        if obj.producto: return obj.producto.producto_nombre
+        if obj.insumo_id: return obj.insumo.insumo_nombre
+        if obj.producto_id: return obj.producto.producto_nombre
         return "Desconocido"
 
     def get_item_tipo(self, obj):
-        if obj.insumo: return "Insumo"
-        if obj.producto: return "Producto"
+        if obj.insumo_id: return "Insumo"
+        if obj.producto_id: return "Producto"
         return "-"
 
     def get_unidad(self, obj):
-        if obj.insumo: return obj.insumo.insumo_unidad
-        if obj.producto: return "unidades" # Productos de reventa suelen ser por unidad
+        if obj.insumo_id: return obj.insumo.insumo_unidad
+        if obj.producto_id: return "unidades" # Productos de reventa suelen ser por unidad
         return ""
 
-class CompraListSerializer(serializers.ModelSerializer):
+class CompraListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     proveedor = serializers.StringRelatedField()
     # Empleado Nested para mostrar el nombre/datos del usuario que registró la compra
     empleado_nombre = serializers.StringRelatedField(source='empleado', read_only=True)
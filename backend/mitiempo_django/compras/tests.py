@@ -1,3 +1,267 @@
+from datetime import date, time
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from caja.models import Caja
+from empleado.models import Empleado
+from inventario.models import Categoria_Insumo, Insumo, Producto, Tipo_Producto
+from .models import Compra, Detalle_Compra, Proveedor
+
+
+class ComprasConDetallesTest(TestCase):
+    """Base: compras con líneas de productos e insumos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        rol = Group.objects.create(name='Cajero')
+        cls.empleado = Empleado.objects.create(user=cls.staff, rol=rol)
+        cls.caja = Caja.objects.create(empleado=cls.empleado, caja_monto_inicial=0)
+        cls.proveedor = Proveedor.objects.create(proveedor_nombre='Proveedor')
+
+        tipo = Tipo_Producto.objects.create(tipo_producto_nombre='Reventa')
+        categoria = Categoria_Insumo.objects.create(categoria_insumo_nombre='Tintes')
+        cls.productos = [
+            Producto.objects.create(tipo_producto=tipo, producto_nombre=f'Producto {i}', producto_precio=100)
+            for i in range(3)
+        ]
+        cls.insumos = [
+            Insumo.objects.create(categoria_insumo=categoria, insumo_nombre=f'Insumo {i}', insumo_unidad='ml')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def crear_compras(self, cantidad):
+        for _ in range(cantidad):
+            compra = Compra.objects.create(
+                proveedor=self.proveedor, empleado=self.empleado, caja=self.caja,
+                compra_total=Decimal('60.00')
+            )
+            # Líneas mezcladas: productos e insumos en la misma compra
+            Detalle_Compra.objects.bulk_create(
+                [
+                    Detalle_Compra(compra=compra, producto=p, detalle_compra_cantidad=1,
+                                   detalle_compra_precio_unitario=10)
+                    for p in self.productos
+                ] + [
+                    Detalle_Compra(compra=compra, insumo=i, detalle_compra_cantidad=1,
+                                   detalle_compra_precio_unitario=10)
+                    for i in self.insumos
+                ]
+            )
+        return compra
+
+
+class CompraListQueriesTest(ComprasConDetallesTest):
+    """Las compras (lista y detalle) deben leerse con una cantidad fija de consultas."""
+
+    def test_lista_con_consultas_constantes(self):
+        # compras (con proveedor, empleado, rol y caja) + detalles (con insumo y producto)
+        self.crear_compras(2)
+        with self.assertNumQueries(2):
+            resp = self.client.get('/api/compras/compras/')
+        self.assertEqual(len(resp.data), 2)
+
+        self.crear_compras(8)
+        with self.assertNumQueries(2):
+            resp = self.client.get('/api/compras/compras/')
+        self.assertEqual(len(resp.data), 10)
+
+        tipos = {d['item_tipo'] for d in resp.data[0]['detalles']}
+        self.assertEqual(tipos, {'Producto', 'Insumo'})
+        self.assertIn('Cajero', resp.data[0]['empleado_nombre'])
+
+    def test_detalle_con_consultas_constantes(self):
+        compra = self.crear_compras(1)
+        with self.assertNumQueries(2):
+            resp = self.client.get(f'/api/compras/compras/{compra.pk}/')
+        self.assertEqual(len(resp.data['detalles']), 6)
+        self.assertEqual(resp.data['detalles'][0]['item_nombre'], 'Producto 0')
+
+
+class CompraCamposTest(ComprasConDetallesTest):
+    """?fields= y ?expand= en el listado de compras (core/serializers.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_compras(3)
+
+    def get(self, params):
+        resp = self.client.get('/api/compras/compras/', params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_sin_detalles_no_hay_prefetch(self):
+        # Sólo la consulta de compras: los detalles no se piden
+        with self.assertNumQueries(1):
+            data = self.get({'fields': 'id,compra_total'})
+        self.assertEqual(len(data), 3)
+        self.assertEqual(set(data[0]), {'id', 'compra_total'})
+
+        with self.assertNumQueries(2):
+            data = self.get({'fields': 'id', 'expand': 'detalles'})
+        self.assertEqual(set(data[0]), {'id', 'detalles'})
+        # Los anidados salen completos
+        self.assertEqual(len(data[0]['detalles']), 6)
+        self.assertIn('item_nombre', data[0]['detalles'][0])
+
+    def test_nombres_desconocidos(self):
+        data = self.get({'fields': 'id,inexistente', 'expand': 'otro'})
+        self.assertEqual(set(data[0]), {'id'})
+
+        # expand sin fields no recorta nada
+        completo = self.get({})
+        self.assertEqual(self.get({'expand': 'inexistente'}), completo)
+
+        # Los nombres anidados con punto no se resuelven: se ignoran
+        with self.assertNumQueries(1):
+            data = self.get({'fields': 'id', 'expand': 'detalles.item_nombre'})
+        self.assertEqual(set(data[0]), {'id'})
+
+    def test_fields_solo_aplica_a_get(self):
+        resp = self.client.post('/api/compras/compras/?fields=id', {
+            'proveedor': self.proveedor.pk,
+            'compra_metodo_pago': 'efectivo',
+            'detalles': [{
+                'insumo_id': self.insumos[0].pk, 'detalle_compra_cantidad': 1,
+                'detalle_compra_precio_unitario': '5',
+            }],
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertIn('compra_metodo_pago', resp.data)
+
+
+class CompraStockTest(TestCase):
+    """El alta valida las filas de stock en memoria, como su save()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        Empleado.objects.create(user=cls.staff)
+        Caja.objects.create(empleado=cls.staff.empleado, caja_monto_inicial=0)
+        cls.proveedor = Proveedor.objects.create(proveedor_nombre='Proveedor')
+        categoria = Categoria_Insumo.objects.create(categoria_insumo_nombre='Tintes')
+        cls.insumos = [
+            Insumo.objects.create(categoria_insumo=categoria, insumo_nombre=f'Insumo {i}', insumo_unidad='ml')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def comprar(self, insumos, cantidad='1'):
+        return self.client.post('/api/compras/compras/', {
+            'proveedor': self.proveedor.pk,
+            'compra_metodo_pago': 'transferencia',
+            'detalles': [
+                {'insumo_id': i.pk, 'detalle_compra_cantidad': cantidad, 'detalle_compra_precio_unitario': '1'}
+                for i in insumos
+            ],
+        }, format='json')
+
+    def test_stock_que_supera_max_digits(self):
+        Insumo.objects.filter(pk=self.insumos[0].pk).update(insumo_stock=Decimal('999999999'))
+
+        resp = self.comprar(self.insumos[:2], cantidad='5')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Compra.objects.count(), 0)
+        self.assertEqual(
+            list(Insumo.objects.order_by('pk').values_list('insumo_stock', flat=True)),
+            [Decimal('999999999'), Decimal('0'), Decimal('0')]
+        )
+
+    def test_validar_no_agrega_consultas_por_fila(self):
+        with CaptureQueriesContext(connection) as una:
+            self.assertEqual(self.comprar(self.insumos[:1]).status_code, 201)
+        with CaptureQueriesContext(connection) as tres:
+            self.assertEqual(self.comprar(self.insumos).status_code, 201)
+        self.assertEqual(len(tres), len(una))
+
+
+class CompraPaginacionTest(TestCase):
+    """El cursor de compras no saltea ni repite filas con la misma fecha y hora."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.empleado = Empleado.objects.create(user=cls.staff)
+        cls.caja = Caja.objects.create(empleado=cls.empleado, caja_monto_inicial=0)
+        cls.proveedor = Proveedor.objects.create(proveedor_nombre='Proveedor')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def crear(self, cantidad, fecha=date(2025, 3, 10), hora=time(10)):
+        return [
+            Compra.objects.create(
+                proveedor=self.proveedor, empleado=self.empleado, caja=self.caja,
+                compra_total=10, compra_fecha=fecha, compra_hora=hora
+            ).pk
+            for _ in range(cantidad)
+        ]
+
+    def recorrer(self, url, campo='next'):
+        ids = []
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            ids += [c['id'] for c in resp.data['results']]
+            url = resp.data[campo]
+        return ids
+
+    def test_empates_de_fecha_y_hora(self):
+        mismo_momento = self.crear(7)
+        anteriores = self.crear(3, fecha=date(2025, 3, 9), hora=time(18))
+        esperados = sorted(mismo_momento, reverse=True) + sorted(anteriores, reverse=True)
+
+        self.assertEqual(self.recorrer('/api/compras/compras/?page_size=3'), esperados)
+
+    def test_altas_entre_paginas(self):
+        ids = self.crear(6)
+        resp = self.client.get('/api/compras/compras/?page_size=2')
+        primera = [c['id'] for c in resp.data['results']]
+
+        # Compras nuevas del mismo día y hora mientras se pagina
+        self.crear(3)
+        resto = self.recorrer(resp.data['next'])
+
+        self.assertEqual(primera + resto, sorted(ids, reverse=True))
+
+    def test_volver_a_la_pagina_anterior(self):
+        ids = sorted(self.crear(5), reverse=True)
+        resp = self.client.get('/api/compras/compras/?page_size=2')
+        resp = self.client.get(resp.data['next'])
+        resp = self.client.get(resp.data['next'])
+        self.assertEqual([c['id'] for c in resp.data['results']], ids[4:])
+
+        resp = self.client.get(resp.data['previous'])
+        self.assertEqual([c['id'] for c in resp.data['results']], ids[2:4])
+        resp = self.client.get(resp.data['previous'])
+        self.assertEqual([c['id'] for c in resp.data['results']], ids[:2])
+        self.assertIsNone(resp.data['previous'])
+
+    def test_cursor_invalido(self):
+        self.crear(1)
+        resp = self.client.get('/api/compras/compras/?cursor=no-es-un-cursor')
+        self.assertEqual(resp.status_code, 404)
 
-# Create your tests here.
+    def test_exportar(self):
+        ids = self.crear(2)
+        anterior, = self.crear(1, fecha=date(2025, 3, 9))
+        resp = self.client.get('/api/compras/compras/exportar/', {'desde': '2025-03-10'})
+        self.assertEqual(resp.status_code, 200)
+        lineas = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertTrue(lineas[0].startswith('id,compra_fecha,compra_hora,proveedor_id'))
+        self.assertEqual([int(l.split(',')[0]) for l in lineas[1:]], ids)
+        self.assertNotIn(str(anterior), [l.split(',')[0] for l in lineas[1:]])
+        self.assertIn('Proveedor', lineas[1])
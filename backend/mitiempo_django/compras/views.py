@@ -1,5 +1,11 @@
 from rest_framework import viewsets, permissions, mixins
-from .models import Proveedor, Compra
+from rest_framework.decorators import action
+from django.db.models import Prefetch
+from core.pagination import HistorialCursorPagination
+from core import exportar
+from core.idempotencia import IdempotenciaMixin
+from core.serializers import incluye
+from .models import Proveedor, Compra, Detalle_Compra
 from .serializers import (
     ProveedorSerializer,
     CompraListSerializer,
@@ -17,7 +23,12 @@ class ProveedorViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]  # O [permissions.IsAdminUser]
 
 
+class CompraPagination(HistorialCursorPagination):
+    ordering = ('-compra_fecha', '-compra_hora', '-id')
+
+
 class CompraViewSet(
+    IdempotenciaMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -26,6 +37,7 @@ class CompraViewSet(
     """
     API endpoint para Compras:
     - POST (create): Crear una nueva compra (y actualizar stock).
+      Acepta el header Idempotency-Key para reintentos seguros.
     - GET (list): Ver lista de compras.
     - GET (retrieve): Ver detalle de una compra.
 
@@ -34,12 +46,24 @@ class CompraViewSet(
 
     queryset = (
         Compra.objects.all()
-        .select_related("proveedor", "empleado__user", "caja")
-        .prefetch_related("detalle_compra_set__insumo")  # Optimiza la carga de detalles
+        # empleado__rol: Empleado.__str__ lo usa para 'empleado_nombre'
+        .select_related("proveedor", "empleado__user", "empleado__rol", "caja")
         .order_by("-compra_fecha", "-compra_hora")
     )  # Más nuevas primero
 
     permission_classes = [permissions.IsAuthenticated]  # O [permissions.IsAdminUser]
+    pagination_class = CompraPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # Con ?fields= los detalles sólo se cargan si se piden
+        if incluye(self.request, "detalles"):
+            # Cada línea es de un insumo o de un producto: ambos en el mismo JOIN
+            qs = qs.prefetch_related(Prefetch(
+                "detalle_compra_set",
+                queryset=Detalle_Compra.objects.select_related("insumo", "producto").order_by("id"),
+            ))
+        return qs
 
     def get_serializer_class(self):
         """
@@ -57,3 +81,25 @@ class CompraViewSet(
         context = super().get_serializer_context()
         context["request"] = self.request
         return context
+
+    @action(detail=False, methods=["get"], url_path="exportar")
+    def exportar_compras(self, request):
+        """
+        GET /api/compras/compras/exportar/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&formato=csv|ndjson
+        Exporta las compras (una fila por compra) en streaming.
+        """
+        formato = exportar.formato_pedido(request)
+        desde, hasta = exportar.rango_fechas(request)
+
+        qs = Compra.objects.order_by("compra_fecha", "compra_hora", "id")
+        if desde:
+            qs = qs.filter(compra_fecha__gte=desde)
+        if hasta:
+            qs = qs.filter(compra_fecha__lte=hasta)
+
+        columnas = [
+            "id", "compra_fecha", "compra_hora", "proveedor_id", "proveedor__proveedor_nombre",
+            "empleado__user__username", "caja_id", "compra_metodo_pago", "compra_total"
+        ]
+        filas = qs.values(*columnas).iterator(chunk_size=exportar.CHUNK_SIZE)
+        return exportar.respuesta_streaming(filas, columnas, formato, "compras")
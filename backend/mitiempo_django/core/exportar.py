@@ -0,0 +1,112 @@
+# core/exportar.py
+"""
+Exportaciones en streaming (CSV o NDJSON).
+
+Las filas se escriben a medida que se leen de la base con
+.iterator(chunk_size=...), así la memoria no depende de cuántas filas
+se exporten.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-archivo: csv.writer devuelve la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def fecha_param(request, param):
+    """
+    ?param=YYYY-MM-DD como date, o None si no vino. Un valor mal formado o
+    una fecha inexistente (2020-13-01) es un ValidationError (400).
+    """
+    valor = request.query_params.get(param)
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        # Bien formada pero inválida: parse_date lanza en lugar de devolver None
+        fecha = None
+    if not fecha:
+        raise ValidationError({param: "Formato de fecha inválido (YYYY-MM-DD)."})
+    return fecha
+
+
+def rango_fechas(request):
+    """
+    Lee ?desde= y ?hasta= (YYYY-MM-DD, inclusive). Cualquiera puede faltar.
+    """
+    rango = []
+    for param in ('desde', 'hasta'):
+        rango.append(fecha_param(request, param))
+
+    desde, hasta = rango
+    if desde and hasta and desde > hasta:
+        raise ValidationError({'hasta': "'hasta' no puede ser anterior a 'desde'."})
+    return desde, hasta
+
+
+def formato_pedido(request):
+    # 'format' lo reserva DRF para la negociación de contenido
+    formato = request.query_params.get('formato', 'csv').lower()
+    if formato not in FORMATOS:
+        raise ValidationError({'formato': f"Formato no soportado. Opciones: {', '.join(FORMATOS)}."})
+    return formato
+
+
+def _local(valor):
+    # Fechas en hora local, igual que en la API
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor)
+    return valor
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    valor = _local(valor)
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def _lineas_csv(filas, columnas):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columnas)
+    for fila in filas:
+        yield writer.writerow([_valor_csv(fila[c]) for c in columnas])
+
+
+def _lineas_ndjson(filas, columnas):
+    for fila in filas:
+        yield json.dumps({c: _local(fila[c]) for c in columnas}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def respuesta_streaming(filas, columnas, formato, nombre):
+    """
+    Respuesta en streaming a partir de un iterable de dicts (ej. un
+    queryset .values(...).iterator(chunk_size=CHUNK_SIZE)).
+    """
+    if formato == 'ndjson':
+        lineas = _lineas_ndjson(filas, columnas)
+    else:
+        lineas = _lineas_csv(filas, columnas)
+
+    response = StreamingHttpResponse(lineas, content_type=FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
@@ -0,0 +1,71 @@
+# core/fechas.py
+"""
+Rangos de días locales para filtrar DateTimeField.
+
+Filtrar con __date, __year o __month aplica una función sobre la columna
+(DATE(CONVERT_TZ(...)) en MySQL) y el motor no puede usar el índice. Con
+estos helpers el filtro queda como un rango [inicio, fin) de datetimes
+aware en la zona del local, que sí es un range scan sobre el índice.
+
+También los nombres de los días de la semana y las máscaras de 7 bits
+(Servicio.dias_mascara, ConfiguracionLocal.dias_mascara).
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def inicio_dia(fecha):
+    """Medianoche local (aware) de 'fecha'."""
+    return timezone.make_aware(datetime.combine(fecha, time.min), timezone.get_current_timezone())
+
+
+def rango_dias(desde=None, hasta=None):
+    """
+    Límites aware [inicio, fin) que cubren los días locales 'desde' a
+    'hasta' inclusive. Cualquiera de los dos puede ser None (sin límite).
+    """
+    inicio = inicio_dia(desde) if desde else None
+    fin = inicio_dia(hasta + timedelta(days=1)) if hasta else None
+    return inicio, fin
+
+
+def filtro_dias(campo, desde=None, hasta=None):
+    """
+    kwargs para .filter() con el rango de días locales sobre 'campo':
+    Venta.objects.filter(**filtro_dias('venta_fecha_hora', desde, hasta))
+    """
+    inicio, fin = rango_dias(desde, hasta)
+    filtro = {}
+    if inicio:
+        filtro[f'{campo}__gte'] = inicio
+    if fin:
+        filtro[f'{campo}__lt'] = fin
+    return filtro
+
+
+# ------------------------------------------------------
+# DÍAS DE LA SEMANA
+# ------------------------------------------------------
+# Índice = date.weekday() (lunes = 0). No depende del locale como strftime('%A').
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+BIT_DIA = {dia: 1 << i for i, dia in enumerate(DIAS_SEMANA)}
+TODOS_LOS_DIAS = (1 << len(DIAS_SEMANA)) - 1
+
+
+def dia_semana(fecha):
+    """Nombre del día ('lunes', ...) de una fecha o datetime local."""
+    return DIAS_SEMANA[fecha.weekday()]
+
+
+def bit_dia(fecha):
+    """Bit del día de la semana de 'fecha' en una máscara de días."""
+    return 1 << fecha.weekday()
+
+
+def mascara_dias(dias):
+    """Máscara de 7 bits (lunes = bit 0) a partir de nombres de días."""
+    mascara = 0
+    for dia in dias or ():
+        mascara |= BIT_DIA.get(str(dia).lower().strip(), 0)
+    return mascara
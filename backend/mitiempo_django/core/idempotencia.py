@@ -0,0 +1,119 @@
+# core/idempotencia.py
+"""
+Soporte para el header Idempotency-Key en los POST de creación.
+
+La primera respuesta exitosa se guarda en la base (RespuestaIdempotente)
+bajo (usuario, ruta, clave); un reintento con la misma clave se responde
+desde ahí sin volver a ejecutar la creación (no descuenta stock ni vuelve
+a sumar en la caja).
+
+La clave se reserva insertando su fila en la misma transacción que la
+creación: el índice único hace que un reintento concurrente espere a que
+la primera termine y repita su respuesta, en cualquier proceso.
+
+- Misma clave con otro cuerpo       -> 422
+- Respuestas con error no se guardan: el cliente puede reintentar.
+- Vencen a las IDEMPOTENCIA_TTL (ver el comando limpiar_idempotencia).
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import RespuestaIdempotente
+
+HEADER = 'Idempotency-Key'
+MAX_LARGO_CLAVE = 255
+
+
+def _timeout():
+    return getattr(settings, 'IDEMPOTENCIA_TTL', 60 * 60 * 24)
+
+
+def vencimiento():
+    """Las respuestas guardadas antes de este momento ya no se repiten."""
+    return timezone.now() - timedelta(seconds=_timeout())
+
+
+def _huella(data):
+    cuerpo = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(cuerpo.encode()).hexdigest()
+
+
+def _guardada(filtro):
+    """Respuesta vigente para (usuario, ruta, clave), o None. Borra la vencida."""
+    guardada = RespuestaIdempotente.objects.filter(**filtro).first()
+    if guardada is not None and guardada.creado < vencimiento():
+        guardada.delete()
+        return None
+    return guardada
+
+
+def _reservar(filtro, huella):
+    """Inserta la fila de la clave; None si otra solicitud ya la guardó."""
+    try:
+        with transaction.atomic():
+            return RespuestaIdempotente.objects.create(**filtro, huella=huella, status=0)
+    except IntegrityError:
+        return None
+
+
+def _repetir(guardada, huella):
+    if guardada.huella != huella:
+        return Response(
+            {"detail": f"La {HEADER} ya se usó con un cuerpo distinto."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(guardada.data, status=guardada.status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+class IdempotenciaMixin:
+    """
+    Mixin para vistas con create() (ListCreateAPIView, CreateModelMixin).
+    Debe ir antes que la vista base en la herencia.
+    """
+
+    def create(self, request, *args, **kwargs):
+        clave = request.headers.get(HEADER)
+        if not clave:
+            return super().create(request, *args, **kwargs)
+        if len(clave) > MAX_LARGO_CLAVE:
+            return Response(
+                {"detail": f"La {HEADER} no puede superar {MAX_LARGO_CLAVE} caracteres."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filtro = {'usuario': request.user, 'ruta': request.path, 'clave': clave}
+        huella = _huella(request.data)
+
+        guardada = _guardada(filtro)
+        if guardada is not None:
+            return _repetir(guardada, huella)
+
+        with transaction.atomic():
+            registro = _reservar(filtro, huella)
+            if registro is None:
+                # Otra solicitud con la misma clave terminó mientras esperábamos
+                guardada = _guardada(filtro)
+                if guardada is None:
+                    return Response(
+                        {"detail": f"Ya hay una solicitud con esta {HEADER} en proceso."},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                return _repetir(guardada, huella)
+
+            response = super().create(request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                registro.status = response.status_code
+                registro.data = response.data
+                registro.save(update_fields=['status', 'data'])
+            else:
+                registro.delete()
+            return response
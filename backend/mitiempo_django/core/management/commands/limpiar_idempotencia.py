@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core.idempotencia import vencimiento
+from core.models import RespuestaIdempotente
+
+class Command(BaseCommand):
+    help = 'Borra las respuestas guardadas por Idempotency-Key que ya vencieron (IDEMPOTENCIA_TTL)'
+
+    def handle(self, *args, **options):
+        borradas, _ = RespuestaIdempotente.objects.filter(creado__lt=vencimiento()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Respuestas vencidas borradas: {borradas}.'))
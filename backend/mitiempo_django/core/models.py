@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class RespuestaIdempotente(models.Model):
+    """
+    Respuesta guardada de un POST con Idempotency-Key (core/idempotencia.py).
+    Vive en la base y no en el cache para que la vean todos los procesos.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    ruta = models.CharField(max_length=255)
+    clave = models.CharField(max_length=255)
+    huella = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField()
+    data = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    creado = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Respuesta idempotente"
+        verbose_name_plural = "Respuestas idempotentes"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'ruta', 'clave'], name='idempotencia_clave_unica'),
+        ]
@@ -0,0 +1,138 @@
+# core/pagination.py
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+class HistorialCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para historiales que crecen sin límite.
+
+    Es opcional: sólo pagina cuando el cliente envía ?cursor= o ?page_size=,
+    así las pantallas que todavía esperan la lista completa no se rompen.
+
+    A diferencia de CursorPagination, que se posiciona sólo sobre el primer
+    campo de 'ordering' y resuelve los empates con OFFSET, el cursor guarda
+    los valores de todos los campos y filtra por la tupla completa:
+
+        (fecha, hora, id) < (f, h, i)
+        -> fecha < f OR (fecha = f AND hora < h) OR (fecha = f AND hora = h AND id < i)
+
+    Así una columna con empates (una DATE, un total) no saltea ni repite
+    filas entre páginas. 'ordering' debe terminar en un campo único (el id)
+    y sus campos no pueden ser NULL.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self._despues_de(current_position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                # Valores que no corresponden a los campos (cursor adulterado)
+                raise NotFound(self.invalid_cursor_message)
+
+        # Con posiciones únicas el offset sólo aparece en cursores armados a mano
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _despues_de(self, posicion, reverse):
+        """Q de las filas que siguen a 'posicion' en el orden recorrido."""
+        try:
+            valores = json.loads(posicion)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            # Cursor de otro orden (ej. cambió ?ordering=)
+            raise NotFound(self.invalid_cursor_message)
+
+        condicion = Q()
+        iguales = {}
+        for orden, valor in zip(self.ordering, valores):
+            campo = orden.lstrip('-')
+            # (cursor hacia atrás) XOR (campo descendente) -> menores
+            lookup = 'lt' if reverse != orden.startswith('-') else 'gt'
+            condicion |= Q(**iguales, **{f'{campo}__{lookup}': valor})
+            iguales[campo] = valor
+        return condicion
+
+    def _get_position_from_instance(self, instance, ordering):
+        valores = []
+        for orden in ordering:
+            campo = orden.lstrip('-')
+            valor = instance[campo] if isinstance(instance, dict) else getattr(instance, campo)
+            valores.append(str(valor))
+        return json.dumps(valores)
+
+
+class OpcionalPageNumberPagination(PageNumberPagination):
+    """
+    Paginación por número de página, también opcional (?page= o ?page_size=).
+    Para listados que no admiten el filtro del cursor, como los armados
+    con UNION; la base resuelve cada página con LIMIT/OFFSET.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
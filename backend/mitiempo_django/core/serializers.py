@@ -0,0 +1,57 @@
+# core/serializers.py
+"""
+Selección de columnas para los serializers de listado.
+
+    ?fields=id,venta_fecha_hora,venta_total   sólo esas columnas
+    ?expand=productos                         suma relaciones anidadas
+
+Sin ?fields= la respuesta es la de siempre. Con ?fields=, las relaciones
+anidadas (productos, detalles, cliente...) sólo salen si se nombran en
+?fields= o en ?expand=. Los campos que no se piden no se serializan, y la
+vista puede usar incluye() para saltear los select/prefetch que no hacen
+falta. Sólo aplica a GET y al serializer raíz, no a los anidados.
+"""
+from rest_framework import serializers
+
+
+def _lista(valor):
+    return {c.strip() for c in valor.split(',') if c.strip()}
+
+
+def campos_pedidos(request):
+    """Nombres pedidos con ?fields= más ?expand=, o None (todos)."""
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return _lista(fields) | _lista(request.query_params.get('expand', ''))
+
+
+def incluye(request, campo):
+    """True si 'campo' va a salir en la respuesta."""
+    pedidos = campos_pedidos(request)
+    return pedidos is None or campo in pedidos
+
+
+class CamposDinamicosMixin:
+    """
+    Mixin para ModelSerializer. Los nombres desconocidos en ?fields= se
+    ignoran (la vista ya decidió qué cargar con incluye()).
+    """
+
+    def _es_raiz(self):
+        padre = self.parent
+        if isinstance(padre, serializers.ListSerializer):
+            padre = padre.parent
+        return padre is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._es_raiz():
+            return fields
+
+        pedidos = campos_pedidos(self.context.get('request'))
+        if pedidos is None:
+            return fields
+        return {nombre: campo for nombre, campo in fields.items() if nombre in pedidos}
@@ -1,5 +1,6 @@
 from pathlib import Path
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
@@ -33,6 +34,10 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# El front reintenta ventas/compras con Idempotency-Key (core/idempotencia.py)
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed"]
+
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -63,6 +68,7 @@ INSTALLED_APPS = [
     'inventario',
     'movimiento_caja',
     'caja',
+    'core',
 ]
 
 MIDDLEWARE = [
@@ -157,6 +163,33 @@ DATABASES = {
         
     }
 }
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# En producción con varios procesos conviene un backend compartido
+# (ej: django.core.cache.backends.filebased.FileBasedCache o Redis).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mitiempo',
+    }
+}
+
+# Fotos de disponibilidad de turnos por día (turnos/disponibilidad.py).
+# Con varios procesos el cache tiene que ser compartido (Redis, Memcached):
+# la invalidación al guardar un turno sólo llega a los procesos que lo ven.
+# Con LocMemCache el TTL es el tiempo máximo que otro proceso puede mostrar
+# como libre un horario ya tomado; con un cache compartido puede subirse.
+TURNOS_DISPONIBILIDAD_CACHE = 'default'
+TURNOS_DISPONIBILIDAD_TTL = 60
+
+# Vigencia de las respuestas guardadas por Idempotency-Key (core/idempotencia.py).
+# Se guardan en la base; las vencidas se borran con 'manage.py limpiar_idempotencia'.
+IDEMPOTENCIA_TTL = 60 * 60 * 24
+
+# Respuestas de los endpoints de estadísticas (ventas/cache_estadisticas.py)
+VENTAS_ESTADISTICAS_CACHE = 'default'
+VENTAS_ESTADISTICAS_TTL = 60
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
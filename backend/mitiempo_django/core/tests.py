@@ -0,0 +1,163 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from caja.models import Caja
+from compras.models import Compra, Proveedor
+from empleado.models import Empleado
+from inventario.models import Categoria_Insumo, Insumo, Producto, Tipo_Producto
+from ventas.models import Estado_Venta, Venta
+from .models import RespuestaIdempotente
+
+
+class IdempotenciaTest(TestCase):
+    """
+    POST con Idempotency-Key (core/idempotencia.py). Cada prueba recorre
+    todos los endpoints que usan IdempotenciaMixin.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.otro = User.objects.create_user('cajero', password='x', is_staff=True)
+        Empleado.objects.create(user=cls.staff)
+        Empleado.objects.create(user=cls.otro)
+        cls.caja = Caja.objects.create(empleado=cls.staff.empleado, caja_monto_inicial=0)
+
+        tipo = Tipo_Producto.objects.create(tipo_producto_nombre='Reventa')
+        cls.producto = Producto.objects.create(
+            tipo_producto=tipo, producto_nombre='Shampoo', producto_precio=10, stock=100
+        )
+        proveedor = Proveedor.objects.create(proveedor_nombre='Proveedor')
+        categoria = Categoria_Insumo.objects.create(categoria_insumo_nombre='Tintes')
+        cls.insumo = Insumo.objects.create(
+            categoria_insumo=categoria, insumo_nombre='Tinte', insumo_unidad='ml', insumo_stock=0
+        )
+
+        # Por endpoint: cuerpo, variante con otro medio de pago, modelo creado,
+        # stock que mueve (y cuánto por pedido) y total de caja que suma
+        cls.endpoints = [
+            {
+                'url': '/api/ventas/ventas/',
+                'cuerpo': {
+                    'venta_medio_pago': 'efectivo',
+                    'productos': [{'producto_id': cls.producto.pk, 'cantidad': 2, 'precio_unitario': '10'}],
+                },
+                'medio_pago': 'venta_medio_pago',
+                'modelo': Venta,
+                'stock': (cls.producto, 'stock', Decimal('-2')),
+                'total_caja': ('caja_total_ventas_efectivo', Decimal('20')),
+            },
+            {
+                'url': '/api/compras/compras/',
+                'cuerpo': {
+                    'proveedor': proveedor.pk,
+                    'compra_metodo_pago': 'efectivo',
+                    'detalles': [{
+                        'insumo_id': cls.insumo.pk, 'detalle_compra_cantidad': 3,
+                        'detalle_compra_precio_unitario': '5',
+                    }],
+                },
+                'medio_pago': 'compra_metodo_pago',
+                'modelo': Compra,
+                'stock': (cls.insumo, 'insumo_stock', Decimal('3')),
+                'total_caja': ('caja_total_compras_efectivo', Decimal('15')),
+            },
+        ]
+
+    def setUp(self):
+        Estado_Venta.limpiar_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def enviar(self, endpoint, cuerpo=None, clave='clave-1', client=None):
+        return (client or self.client).post(
+            endpoint['url'], cuerpo or endpoint['cuerpo'], format='json', HTTP_IDEMPOTENCY_KEY=clave
+        )
+
+    def stock(self, endpoint):
+        objeto, campo, _ = endpoint['stock']
+        objeto.refresh_from_db()
+        return getattr(objeto, campo)
+
+    def test_reintento_devuelve_la_respuesta_guardada(self):
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint['url']):
+                stock_inicial = self.stock(endpoint)
+                primera = self.enviar(endpoint)
+                segunda = self.enviar(endpoint)
+
+                self.assertEqual(primera.status_code, 201)
+                self.assertEqual(segunda.status_code, 201)
+                self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+                self.assertEqual(segunda.data, primera.data)
+                self.assertEqual(endpoint['modelo'].objects.count(), 1)
+                self.assertEqual(self.stock(endpoint), stock_inicial + endpoint['stock'][2])
+                campo, total = endpoint['total_caja']
+                self.caja.refresh_from_db()
+                self.assertEqual(getattr(self.caja, campo), total)
+
+    def test_misma_clave_con_otro_cuerpo(self):
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint['url']):
+                self.enviar(endpoint)
+                stock = self.stock(endpoint)
+                resp = self.enviar(endpoint, dict(endpoint['cuerpo'], **{endpoint['medio_pago']: 'transferencia'}))
+
+                self.assertEqual(resp.status_code, 422)
+                self.assertEqual(endpoint['modelo'].objects.count(), 1)
+                self.assertEqual(self.stock(endpoint), stock)
+
+    def test_clave_de_otro_usuario(self):
+        client = APIClient()
+        client.force_authenticate(self.otro)
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint['url']):
+                self.enviar(endpoint)
+
+                anonimo = self.enviar(endpoint, client=APIClient())
+                self.assertIn(anonimo.status_code, (401, 403))
+                self.assertNotIn('Idempotent-Replayed', anonimo)
+
+                # La clave es por usuario: no repite lo del otro, crea lo suyo
+                resp = self.enviar(endpoint, client=client)
+                self.assertEqual(resp.status_code, 201)
+                self.assertNotIn('Idempotent-Replayed', resp)
+                self.assertEqual(
+                    endpoint['modelo'].objects.filter(empleado=self.otro.empleado).count(), 1
+                )
+
+    def test_errores_no_se_guardan(self):
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint['url']):
+                invalido = dict(endpoint['cuerpo'], **{endpoint['medio_pago']: 'cheque'})
+                self.assertEqual(self.enviar(endpoint, invalido).status_code, 400)
+                self.assertFalse(RespuestaIdempotente.objects.filter(ruta=endpoint['url']).exists())
+
+                # La misma clave sigue libre para el reintento corregido
+                self.assertEqual(self.enviar(endpoint).status_code, 201)
+
+    def test_respuesta_vencida(self):
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint['url']):
+                self.enviar(endpoint)
+                RespuestaIdempotente.objects.filter(ruta=endpoint['url']).update(
+                    creado=timezone.now() - timedelta(days=2)
+                )
+
+                resp = self.enviar(endpoint)
+                self.assertEqual(resp.status_code, 201)
+                self.assertNotIn('Idempotent-Replayed', resp)
+                self.assertEqual(endpoint['modelo'].objects.count(), 2)
+
+        # El comando borra sólo las vencidas
+        RespuestaIdempotente.objects.update(creado=timezone.now() - timedelta(days=2))
+        self.enviar(self.endpoints[0], clave='clave-2')
+        call_command('limpiar_idempotencia', stdout=io.StringIO())
+        self.assertEqual(list(RespuestaIdempotente.objects.values_list('clave', flat=True)), ['clave-2'])
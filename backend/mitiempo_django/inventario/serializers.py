@@ -3,6 +3,8 @@ from rest_framework import serializers
 from .models import Producto, Tipo_Producto, Categoria_Insumo, Insumo, Marca
 import json
 
+from core.serializers import CamposDinamicosMixin
+
 # --- SERIALIZERS DE LECTURA ---
 
 class TipoProductoSerializer(serializers.ModelSerializer):
@@ -17,7 +19,7 @@ class MarcaSerializer(serializers.ModelSerializer):
         fields = ["id", "nombre", "activo"]
 
 
-class ProductoSerializer(serializers.ModelSerializer):
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     tipo_producto = serializers.StringRelatedField()
     tipo_producto_id = serializers.PrimaryKeyRelatedField(source="tipo_producto", read_only=True)
     marca = serializers.StringRelatedField()
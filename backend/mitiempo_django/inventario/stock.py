@@ -0,0 +1,87 @@
+# inventario/stock.py
+"""
+Movimientos de stock en bloque.
+
+Quien mueve stock de varias filas a la vez:
+1. bloquea todas las filas en una sola consulta, siempre ordenadas por id
+   (dos transacciones que tocan los mismos productos los bloquean en el
+   mismo orden y no se cruzan en un deadlock),
+2. valida en memoria,
+3. aplica todos los cambios con un único UPDATE condicional.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+
+class StockInsuficiente(Exception):
+    pass
+
+
+def sumar_cantidades(pares):
+    """Agrupa pares (id, cantidad) sumando las cantidades del mismo id."""
+    totales = defaultdict(Decimal)
+    for pk, cantidad in pares:
+        totales[pk] += Decimal(cantidad)
+    return dict(totales)
+
+
+def bloquear(modelo, ids):
+    """
+    SELECT ... FOR UPDATE de todas las filas de 'ids', ordenadas por id.
+    Devuelve {id: instancia}; los ids inexistentes no aparecen.
+    """
+    filas = modelo.objects.select_for_update().filter(pk__in=set(ids)).order_by('pk')
+    return {obj.pk: obj for obj in filas}
+
+
+def validar(objetos):
+    """
+    Valida en memoria las filas bloqueadas con el stock ya sumado, como lo
+    hacía su save(): clean_fields() (max_digits, choices...) y clean(). Las
+    relaciones no se revisan: vienen de la fila leída y cada una costaría
+    una consulta.
+    """
+    for obj in objetos:
+        relaciones = [f.name for f in obj._meta.concrete_fields if f.is_relation]
+        obj.clean_fields(exclude=relaciones)
+        obj.clean()
+
+
+def mover(modelo, campo, deltas, campo_fecha=None):
+    """
+    Aplica {id: delta} sobre 'campo' con un solo UPDATE:
+
+        SET campo = campo + CASE id WHEN .. THEN delta .. END
+        WHERE (id = a AND campo >= -delta_a) OR ... OR id IN (ingresos)
+
+    Los deltas negativos sólo se aplican si alcanza el stock; si alguna
+    fila no se actualiza se lanza StockInsuficiente (y la transacción del
+    llamador se revierte). .update() no dispara auto_now: 'campo_fecha'
+    se setea a mano.
+    """
+    deltas = {pk: d for pk, d in deltas.items() if d}
+    if not deltas:
+        return 0
+
+    condicion = Q(pk__in=[pk for pk, d in deltas.items() if d > 0])
+    for pk, d in deltas.items():
+        if d < 0:
+            condicion |= Q(pk=pk, **{f'{campo}__gte': -d})
+
+    cambios = {
+        campo: F(campo) + Case(
+            *[When(pk=pk, then=Value(d)) for pk, d in deltas.items()],
+            default=Value(Decimal(0)),
+            output_field=modelo._meta.get_field(campo)
+        )
+    }
+    if campo_fecha:
+        cambios[campo_fecha] = timezone.now()
+
+    actualizadas = modelo.objects.filter(condicion).update(**cambios)
+    if actualizadas != len(deltas):
+        raise StockInsuficiente("Stock insuficiente: otro movimiento consumió el stock.")
+    return actualizadas
@@ -6,6 +6,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.shortcuts import get_object_or_404
 from django.db.models import ProtectedError, F # <--- CLAVE PARA EL BORRADO INTELIGENTE
+from core.serializers import incluye
 
 from .models import Producto, Tipo_Producto, Insumo, Categoria_Insumo, Marca
 from .serializers import (
@@ -23,6 +24,10 @@ class ProductoListCreateView(generics.ListCreateAPIView):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     def get_queryset(self):
         qs = Producto.objects.all().order_by("producto_nombre")
+        # Con ?fields= sólo se cargan las relaciones que se van a mostrar
+        relaciones = [r for r in ("tipo_producto", "marca") if incluye(self.request, r)]
+        if relaciones:
+            qs = qs.select_related(*relaciones)
         if not self.request.user.is_staff:
             qs = qs.filter(activo=True)
         return qs
@@ -0,0 +1,135 @@
+# movimiento_caja/movimientos.py
+"""
+Feed de movimientos de una caja armado en la base de datos.
+
+Cada origen (Ingreso, Egreso, Venta, Compra) se proyecta a las mismas
+columnas (movimiento_id, tipo, fecha, descripcion, monto) y se combinan con
+UNION ALL, así el orden y la paginación los resuelve el motor en lugar de
+cargar todas las filas en Python.
+
+'fecha' queda siempre en hora local: las ventas guardan un DateTimeField
+(UTC) que se convierte con TruncSecond(tzinfo=...), y los movimientos que
+guardan fecha y hora por separado ya están en hora local (FechaHora).
+"""
+from django.db import models
+from django.db.models import Case, CharField, F, Func, Value, When
+from django.db.models.functions import Concat, TruncSecond
+from django.utils import timezone
+
+from core.fechas import filtro_dias
+from ventas.models import Venta, Estado_Venta
+from compras.models import Compra
+from .models import Ingreso, Egreso
+
+CAMPOS = ('movimiento_id', 'tipo', 'fecha', 'descripcion', 'monto')
+
+ESTADOS_VENTA_HISTORIAL = [Estado_Venta.PAGADO, Estado_Venta.ANULADO, Estado_Venta.DEVOLUCION_PARCIAL]
+
+
+class FechaHora(Func):
+    """Combina una columna DATE y una TIME en un DATETIME (sin zona)."""
+    arity = 2
+    output_field = models.DateTimeField()
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='TIMESTAMP', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template="datetime(%(expressions)s)",
+            arg_joiner=" || ' ' || ", **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' + ', **extra_context)
+
+    def convert_value(self, value, expression, connection):
+        # El backend la interpreta como UTC: es hora local
+        if value is not None:
+            value = timezone.make_aware(value.replace(tzinfo=None), timezone.get_current_timezone())
+        return value
+
+
+def _texto(*partes):
+    return Concat(*partes, output_field=CharField())
+
+
+def _proyectar(qs, tipo, fecha, descripcion, monto):
+    # Mismo orden de columnas en todas las ramas del UNION
+    return qs.order_by().annotate(
+        movimiento_id=F('id'),
+        tipo=Value(tipo, output_field=CharField()),
+        fecha=fecha,
+        descripcion=descripcion,
+        monto=monto,
+    ).values(*CAMPOS)
+
+
+def _filtrar(qs, caja, campo_fecha, desde, hasta):
+    """Filtra por caja (None = todas) y por un rango de fechas locales."""
+    if caja is not None:
+        qs = qs.filter(caja=caja)
+    if desde:
+        qs = qs.filter(**{f'{campo_fecha}__gte': desde})
+    if hasta:
+        qs = qs.filter(**{f'{campo_fecha}__lte': hasta})
+    return qs
+
+
+def _fecha_local(campo):
+    return TruncSecond(campo, tzinfo=timezone.get_current_timezone(), output_field=models.DateTimeField())
+
+
+def ventas(caja, estados=(Estado_Venta.PAGADO,), desde=None, hasta=None):
+    qs = Venta.objects.filter(estado_venta_id__in=[Estado_Venta.id_por_nombre(e) for e in estados])
+    if caja is not None:
+        qs = qs.filter(caja=caja)
+    qs = qs.filter(**filtro_dias('venta_fecha_hora', desde, hasta))
+    sufijo = Case(
+        When(estado_venta_id=Estado_Venta.id_por_nombre(Estado_Venta.ANULADO), then=Value(' [ANULADA]')),
+        When(estado_venta_id=Estado_Venta.id_por_nombre(Estado_Venta.DEVOLUCION_PARCIAL), then=Value(' [DEV. PARCIAL]')),
+        default=Value(''),
+        output_field=CharField()
+    )
+    return _proyectar(
+        qs, 'Venta',
+        fecha=_fecha_local('venta_fecha_hora'),
+        descripcion=_texto(Value('Venta #'), F('id'), Value(' ('), F('venta_medio_pago'), Value(')'), sufijo),
+        monto=F('venta_total'),
+    )
+
+
+def ingresos(caja, desde=None, hasta=None):
+    return _proyectar(
+        _filtrar(Ingreso.objects.all(), caja, 'ingreso_fecha', desde, hasta), 'Ingreso',
+        fecha=FechaHora('ingreso_fecha', 'ingreso_hora'),
+        descripcion=F('ingreso_descripcion'),
+        monto=F('ingreso_monto'),
+    )
+
+
+def egresos(caja, desde=None, hasta=None):
+    return _proyectar(
+        _filtrar(Egreso.objects.all(), caja, 'egreso_fecha', desde, hasta), 'Egreso',
+        fecha=FechaHora('egreso_fecha', 'egreso_hora'),
+        descripcion=F('egreso_descripcion'),
+        monto=F('egreso_monto'),
+    )
+
+
+def compras(caja, desde=None, hasta=None):
+    return _proyectar(
+        _filtrar(Compra.objects.all(), caja, 'compra_fecha', desde, hasta), 'Compra',
+        fecha=FechaHora('compra_fecha', 'compra_hora'),
+        descripcion=_texto(
+            Value('Compra a '), F('proveedor__proveedor_nombre'),
+            Value(' ('), F('compra_metodo_pago'), Value(')')
+        ),
+        monto=F('compra_total'),
+    )
+
+
+def combinar(*partes):
+    """UNION ALL de las proyecciones, más recientes primero."""
+    primera, *resto = partes
+    return primera.union(*resto, all=True).order_by('-fecha', 'tipo', '-movimiento_id')
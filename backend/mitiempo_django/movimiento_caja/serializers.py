@@ -27,4 +27,4 @@ class MovimientoConsolidadoSerializer(serializers.Serializer):
     monto = serializers.DecimalField(max_digits=10, decimal_places=2)
 
     def get_id(self, obj):
-        return f"{obj['tipo'].lower()}-{obj['id']}"
\ No newline at end of file
+        return f"{obj['tipo'].lower()}-{obj['movimiento_id']}"
\ No newline at end of file
@@ -1,3 +1,104 @@
+import json
+from datetime import date, datetime, time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from caja.models import Caja
+from compras.models import Compra, Proveedor
+from empleado.models import Empleado
+from ventas.models import Estado_Venta, Venta
+from .models import Egreso, Ingreso
+
+
+class MovimientosConsolidadosTest(TestCase):
+    """Orden y ids del feed UNION ALL (movimiento_caja/movimientos.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        empleado = Empleado.objects.create(user=cls.staff)
+        cls.caja = Caja.objects.create(empleado=empleado, caja_monto_inicial=0)
+        pagado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.PAGADO)
+        proveedor = Proveedor.objects.create(proveedor_nombre='Proveedor')
+
+        # Mismo id en cada tabla y la misma hora local para todos
+        cls.dia = date(2025, 3, 10)
+        cls.hora = time(10, 30)
+        for pk in (7, 8):
+            Ingreso.objects.create(id=pk, caja=cls.caja, ingreso_descripcion='Cambio', ingreso_monto=10)
+            Egreso.objects.create(id=pk, caja=cls.caja, egreso_descripcion='Limpieza', egreso_monto=5)
+            Venta.objects.create(
+                id=pk, caja=cls.caja, empleado=empleado, estado_venta=pagado, venta_total=20
+            )
+            Compra.objects.create(
+                id=pk, caja=cls.caja, empleado=empleado, proveedor=proveedor, compra_total=15,
+                compra_fecha=cls.dia, compra_hora=cls.hora
+            )
+        # auto_now_add: las fechas se fijan después
+        Ingreso.objects.update(ingreso_fecha=cls.dia, ingreso_hora=cls.hora)
+        Egreso.objects.update(egreso_fecha=cls.dia, egreso_hora=cls.hora)
+        Venta.objects.update(venta_fecha_hora=timezone.make_aware(datetime.combine(cls.dia, cls.hora)))
+
+    def setUp(self):
+        cache.clear()
+        Estado_Venta.limpiar_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def feed(self, **params):
+        resp = self.client.get('/api/movimiento-caja/', {'caja_id': self.caja.pk, **params})
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_orden_con_la_misma_hora(self):
+        movimientos = self.feed()
+        # Misma fecha: desempata por tipo y después por id descendente
+        self.assertEqual([m['id'] for m in movimientos], [
+            'compra-8', 'compra-7', 'egreso-8', 'egreso-7',
+            'ingreso-8', 'ingreso-7', 'venta-8', 'venta-7',
+        ])
+        esperada = timezone.make_aware(datetime.combine(self.dia, self.hora))
+        for m in movimientos:
+            self.assertEqual(m['fecha'], timezone.localtime(esperada).isoformat(), m['id'])
+
+    def test_ids_unicos_y_paginas_estables(self):
+        movimientos = self.feed()
+        ids = [m['id'] for m in movimientos]
+        self.assertEqual(len(ids), len(set(ids)))
+
+        paginado = []
+        for pagina in (1, 2, 3):
+            paginado += [m['id'] for m in self.feed(page=pagina, page_size=3)['results']]
+        self.assertEqual(paginado, ids)
+
+    def test_listados_de_ingresos_y_egresos(self):
+        ingresos = self.client.get('/api/movimiento-caja/ingresos/', {'caja_id': self.caja.pk}).data
+        self.assertEqual([m['id'] for m in ingresos], ['ingreso-8', 'ingreso-7', 'venta-8', 'venta-7'])
+        egresos = self.client.get('/api/movimiento-caja/egresos/', {'caja_id': self.caja.pk}).data
+        self.assertEqual([m['id'] for m in egresos], ['compra-8', 'compra-7', 'egreso-8', 'egreso-7'])
+
+    def test_exportar_por_caja_y_rango(self):
+        otra = Caja.objects.create(empleado=self.caja.empleado, caja_monto_inicial=0, caja_estado=False)
+        Ingreso.objects.create(caja=otra, ingreso_descripcion='Otra caja', ingreso_monto=1)
+
+        resp = self.client.get('/api/movimiento-caja/exportar/', {'caja_id': self.caja.pk, 'formato': 'ndjson'})
+        self.assertEqual(resp.status_code, 200)
+        filas = [json.loads(l) for l in b''.join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual(
+            [f"{f['tipo'].lower()}-{f['movimiento_id']}" for f in filas],
+            [m['id'] for m in self.feed()]
+        )
+        self.assertEqual(set(filas[0]), {'movimiento_id', 'tipo', 'fecha', 'descripcion', 'monto'})
+
+        # Sin caja_id: todas las cajas, acotado por fecha
+        resp = self.client.get('/api/movimiento-caja/exportar/', {'desde': '2025-03-11'})
+        lineas = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lineas), 2)
+        self.assertIn('Otra caja', lineas[1])
 
-# Create your tests here.
+        resp = self.client.get('/api/movimiento-caja/exportar/', {'caja_id': 999999})
+        self.assertEqual(resp.status_code, 404)
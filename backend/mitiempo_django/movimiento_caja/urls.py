@@ -3,6 +3,7 @@ from .views import (
     IngresoCreateListView, 
     EgresoCreateListView, 
     MovimientoConsolidadoListView,
+    MovimientoExportarView,
    
 )
 
@@ -11,6 +12,9 @@ urlpatterns = [
     # GET /api/movimiento-caja/?caja_id=2
     path('', MovimientoConsolidadoListView.as_view(), name='movimiento-consolidado'),
 
+    # GET /api/movimiento-caja/exportar/?caja_id=2&formato=ndjson
+    path('exportar/', MovimientoExportarView.as_view(), name='movimiento-exportar'),
+
     # Rutas específicas para crear
     # POST /api/movimiento-caja/ingresos/
     path('ingresos/', IngresoCreateListView.as_view(), name='ingreso-list-create'),
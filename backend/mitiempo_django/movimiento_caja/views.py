@@ -1,15 +1,14 @@
 from rest_framework import generics, permissions, views, status, serializers
 from rest_framework.response import Response
-from datetime import datetime, time
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from django.db import transaction
 
 # Modelos
 from .models import Ingreso, Egreso
 from caja.models import Caja
-from ventas.models import Venta
-from compras.models import Compra
+from core.pagination import OpcionalPageNumberPagination
+from core import exportar
+from . import movimientos
 
 # Serializers
 from .serializers import (
@@ -20,6 +19,7 @@ from .serializers import (
 
 class BaseMovimientoView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OpcionalPageNumberPagination
 
     def get_caja(self):
         caja_id = self.request.query_params.get('caja_id', None)
@@ -36,16 +36,15 @@ class BaseMovimientoView(generics.ListCreateAPIView):
         if not caja:
             return Response([])
 
-        movimientos_combinados = self.get_movimientos_combinados(caja)
-        
-        # Ordenar descendente por fecha (asegurando que todas sean aware)
-        movimientos_ordenados = sorted(
-            movimientos_combinados, 
-            key=lambda x: x['fecha'], 
-            reverse=True
-        )
-        
-        serializer = MovimientoConsolidadoSerializer(movimientos_ordenados, many=True)
+        # UNION ALL ordenado (más recientes primero) en la base
+        qs = self.get_movimientos_combinados(caja)
+
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            serializer = MovimientoConsolidadoSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = MovimientoConsolidadoSerializer(qs, many=True)
         return Response(serializer.data)
     
     def get_movimientos_combinados(self, caja):
@@ -65,41 +64,18 @@ class IngresoCreateListView(BaseMovimientoView):
             # 1. Guardar el Movimiento
             instance = serializer.save(caja=caja_abierta)
             
-            # 2. Actualizar Saldo de Caja (SUMAR)
-            # Si saldo final es None, asumimos 0
-            saldo_actual = caja_abierta.caja_saldo_final or 0
-            caja_abierta.caja_saldo_final = saldo_actual + instance.ingreso_monto
-            caja_abierta.save()
+            # 2. Actualizar Saldo y total de ingresos de la Caja (SUMAR)
+            caja_abierta.acumular(
+                saldo=instance.ingreso_monto,
+                total_ingresos_manuales=instance.ingreso_monto
+            )
 
     def get_movimientos_combinados(self, caja):
-        # 1. Ingresos manuales
-        ingresos = Ingreso.objects.filter(caja=caja).values(
-            'id', 'ingreso_fecha', 'ingreso_hora', 'ingreso_descripcion', 'ingreso_monto'
+        # Ingresos manuales + Ventas (Pagadas)
+        return movimientos.combinar(
+            movimientos.ventas(caja),
+            movimientos.ingresos(caja)
         )
-        lista_ingresos = []
-        for i in ingresos:
-            # Combinar y hacer AWARE (con zona horaria)
-            dt_naive = datetime.combine(i['ingreso_fecha'], i['ingreso_hora'])
-            dt_aware = timezone.make_aware(dt_naive)
-            lista_ingresos.append({
-                'id': i['id'], 'tipo': 'Ingreso', 'fecha': dt_aware,
-                'descripcion': i['ingreso_descripcion'], 'monto': i['ingreso_monto']
-            })
-        
-        # 2. Ventas (Pagadas)
-        ventas = Venta.objects.filter(
-            caja=caja, 
-            estado_venta__estado_venta_nombre='Pagado'
-        ).values('id', 'venta_fecha_hora', 'venta_total', 'venta_medio_pago')
-        
-        lista_ventas = [
-            {
-                'id': v['id'], 'tipo': 'Venta', 'fecha': v['venta_fecha_hora'],
-                'descripcion': f"Venta #{v['id']} ({v['venta_medio_pago']})", 
-                'monto': v['venta_total']
-            } for v in ventas
-        ]
-        return lista_ingresos + lista_ventas
 
 
 class EgresoCreateListView(BaseMovimientoView):
@@ -115,46 +91,23 @@ class EgresoCreateListView(BaseMovimientoView):
             # 1. Guardar el Movimiento
             instance = serializer.save(caja=caja_abierta)
             
-            # 2. Actualizar Saldo de Caja (RESTAR)
-            saldo_actual = caja_abierta.caja_saldo_final or 0
-            caja_abierta.caja_saldo_final = saldo_actual - instance.egreso_monto
-            caja_abierta.save()
+            # 2. Actualizar Saldo (RESTAR) y total de egresos de la Caja
+            caja_abierta.acumular(
+                saldo=-instance.egreso_monto,
+                total_egresos_manuales=instance.egreso_monto
+            )
 
     def get_movimientos_combinados(self, caja):
-        # 1. Egresos manuales
-        egresos = Egreso.objects.filter(caja=caja).values(
-            'id', 'egreso_fecha', 'egreso_hora', 'egreso_descripcion', 'egreso_monto'
+        # Egresos manuales + Compras
+        return movimientos.combinar(
+            movimientos.egresos(caja),
+            movimientos.compras(caja)
         )
-        lista_egresos = []
-        for e in egresos:
-            dt_naive = datetime.combine(e['egreso_fecha'], e['egreso_hora'])
-            dt_aware = timezone.make_aware(dt_naive)
-            lista_egresos.append({
-                'id': e['id'], 'tipo': 'Egreso', 'fecha': dt_aware,
-                'descripcion': e['egreso_descripcion'], 'monto': e['egreso_monto']
-            })
-        
-        # 2. Compras
-        compras = Compra.objects.filter(caja=caja).values(
-            'id', 'compra_fecha', 'compra_hora', 'compra_total', 
-            'proveedor__proveedor_nombre', 'compra_metodo_pago'
-        )
-        lista_compras = []
-        for c in compras:
-            hora = c['compra_hora'] or time(0,0,0)
-            dt_naive = datetime.combine(c['compra_fecha'], hora)
-            dt_aware = timezone.make_aware(dt_naive)
-            lista_compras.append({
-                'id': c['id'], 'tipo': 'Compra', 'fecha': dt_aware,
-                'descripcion': f"Compra a {c['proveedor__proveedor_nombre']} ({c['compra_metodo_pago']})",
-                'monto': c['compra_total']
-            })
-        
-        return lista_egresos + lista_compras
 
 # --- VISTA CONSOLIDADA (Main Dashboard Caja) ---
 class MovimientoConsolidadoListView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OpcionalPageNumberPagination
 
     def get(self, request):
         # 1. Obtener la Caja
@@ -167,88 +120,52 @@ class MovimientoConsolidadoListView(views.APIView):
         if not caja:
             return Response([], status=status.HTTP_200_OK)
 
-        lista_movimientos = []
-
-        # 2. INGRESOS
-        ingresos = Ingreso.objects.filter(caja=caja).values(
-            'id', 'ingreso_fecha', 'ingreso_hora', 'ingreso_descripcion', 'ingreso_monto'
+        # Un solo UNION ALL ordenado en la base. Las ventas incluyen pagadas,
+        # anuladas y devoluciones para tener la traza completa (la anulación
+        # luego aparece como Egreso que la cancela).
+        qs = movimientos.combinar(
+            movimientos.ventas(caja, estados=movimientos.ESTADOS_VENTA_HISTORIAL),
+            movimientos.ingresos(caja),
+            movimientos.egresos(caja),
+            movimientos.compras(caja)
         )
-        for i in ingresos:
-            dt_naive = datetime.combine(i['ingreso_fecha'], i['ingreso_hora'])
-            dt_aware = timezone.make_aware(dt_naive) # Fix Timezone
-            lista_movimientos.append({
-                'id': i['id'], 'tipo': 'Ingreso', 'fecha': dt_aware,
-                'descripcion': i['ingreso_descripcion'], 'monto': i['ingreso_monto']
-            })
 
-        # 3. EGRESOS
-        egresos = Egreso.objects.filter(caja=caja).values(
-            'id', 'egreso_fecha', 'egreso_hora', 'egreso_descripcion', 'egreso_monto'
-        )
-        for e in egresos:
-            dt_naive = datetime.combine(e['egreso_fecha'], e['egreso_hora'])
-            dt_aware = timezone.make_aware(dt_naive) # Fix Timezone
-            lista_movimientos.append({
-                'id': e['id'], 'tipo': 'Egreso', 'fecha': dt_aware,
-                'descripcion': e['egreso_descripcion'], 'monto': e['egreso_monto']
-            })
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        if page is not None:
+            serializer = MovimientoConsolidadoSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
 
-        # 4. VENTAS (Incluye Pagadas y Anuladas para historial completo)
-        ventas = Venta.objects.filter(
-            caja=caja,
-            # Mostramos pagadas, anuladas y devoluciones para tener la traza completa
-            estado_venta__estado_venta_nombre__in=['Pagado', 'Anulado', 'Devolución Parcial']
-        ).values(
-            'id', 'venta_fecha_hora', 'venta_total', 'venta_medio_pago', 
-            'estado_venta__estado_venta_nombre'
-        )
-        
-        for v in ventas:
-            estado = v['estado_venta__estado_venta_nombre']
-            desc = f"Venta #{v['id']} ({v['venta_medio_pago']})"
-            
-            # Si está anulada, aclaramos en el texto, pero mostramos el ingreso original
-            # (porque luego habrá un Egreso de anulación que lo cancela)
-            if estado == 'Anulado':
-                desc += " [ANULADA]"
-            elif estado == 'Devolución Parcial':
-                desc += " [DEV. PARCIAL]"
+        serializer = MovimientoConsolidadoSerializer(qs, many=True)
+        return Response(serializer.data)
+    
 
-            lista_movimientos.append({
-                'id': v['id'], 
-                'tipo': 'Venta', 
-                'fecha': v['venta_fecha_hora'], # Ya es Aware (Django DateTimeField)
-                'descripcion': desc, 
-                'monto': v['venta_total']
-            })
+class MovimientoExportarView(views.APIView):
+    """
+    GET /api/movimiento-caja/exportar/?caja_id=2&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&formato=csv|ndjson
+    Exporta en streaming el mismo feed consolidado. Sin caja_id incluye
+    todas las cajas del rango.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-        # 5. COMPRAS
-        compras = Compra.objects.filter(caja=caja).values(
-            'id', 'compra_fecha', 'compra_hora', 'compra_total', 
-            'proveedor__proveedor_nombre', 'compra_metodo_pago'
-        )
-        for c in compras:
-            hora = c['compra_hora'] or time(0,0,0)
-            dt_naive = datetime.combine(c['compra_fecha'], hora)
-            dt_aware = timezone.make_aware(dt_naive) # Fix Timezone
+    def get(self, request):
+        formato = exportar.formato_pedido(request)
+        desde, hasta = exportar.rango_fechas(request)
 
-            lista_movimientos.append({
-                'id': c['id'], 
-                'tipo': 'Compra', 
-                'fecha': dt_aware,
-                'descripcion': f"Compra a {c['proveedor__proveedor_nombre']} ({c['compra_metodo_pago']})",
-                'monto': c['compra_total']
-            })
+        caja = None
+        caja_id = request.query_params.get('caja_id')
+        if caja_id:
+            caja = get_object_or_404(Caja, id=caja_id)
 
-        # 6. Ordenar todo
-        movimientos_ordenados = sorted(
-            lista_movimientos, 
-            key=lambda x: x['fecha'], 
-            reverse=True
+        rango = {'desde': desde, 'hasta': hasta}
+        qs = movimientos.combinar(
+            movimientos.ventas(caja, estados=movimientos.ESTADOS_VENTA_HISTORIAL, **rango),
+            movimientos.ingresos(caja, **rango),
+            movimientos.egresos(caja, **rango),
+            movimientos.compras(caja, **rango)
         )
-
-        serializer = MovimientoConsolidadoSerializer(movimientos_ordenados, many=True)
-        return Response(serializer.data)
+        filas = qs.iterator(chunk_size=exportar.CHUNK_SIZE)
+        return exportar.respuesta_streaming(filas, list(movimientos.CAMPOS), formato, 'movimientos_caja')
     
 
     ##########
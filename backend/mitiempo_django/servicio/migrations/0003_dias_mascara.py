@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+
+
+def calcular_mascaras(apps, schema_editor):
+    Servicio = apps.get_model('servicio', 'Servicio')
+    servicios = list(Servicio.objects.only('id_serv', 'dias_disponibles'))
+    for servicio in servicios:
+        dias = {str(d).lower().strip() for d in servicio.dias_disponibles or ()}
+        servicio.dias_mascara = sum(1 << i for i, dia in enumerate(DIAS_SEMANA) if dia in dias)
+    Servicio.objects.bulk_update(servicios, ['dias_mascara'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicio', '0002_alter_servicioinsumo_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicio',
+            name='dias_mascara',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_mascaras, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,8 @@ from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.apps import apps # Importante para evitar ciclos
 
+from core.fechas import BIT_DIA, bit_dia, mascara_dias
+
 # Intentamos importar Insumo (si no existe, dejamos None y validamos luego)
 try:
     from inventario.models import Insumo
@@ -27,6 +29,8 @@ class Servicio(models.Model):
         default=list,
         help_text="Ej: ['lunes','martes','miercoles']"
     )
+    # Los mismos días como máscara de 7 bits (lunes = bit 0), se mantiene en save()
+    dias_mascara = models.PositiveSmallIntegerField(default=0, editable=False)
 
 
     descripcion = models.TextField(blank=True, null=True)
@@ -46,6 +50,10 @@ class Servicio(models.Model):
         estado = "Activo" if self.activo else "Inactivo"
         return f"{self.nombre} ({self.duracion} min) - {estado}"
 
+    def disponible_el(self, fecha):
+        """True si el servicio se ofrece el día de la semana de 'fecha'."""
+        return bool(self.dias_mascara & bit_dia(fecha))
+
     # -------------------------
     # Validaciones
     # -------------------------
@@ -56,9 +64,8 @@ class Servicio(models.Model):
             raise ValidationError("La duración mínima es de 5 minutos.")
         if not self.dias_disponibles:
             raise ValidationError("Debe seleccionar al menos un día disponible.")
-        dias_validos = {"lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"}
         for d in self.dias_disponibles:
-            if str(d).lower().strip() not in dias_validos:
+            if str(d).lower().strip() not in BIT_DIA:
                 raise ValidationError(f"'{d}' no es un día válido.")
 
     def save(self, *args, **kwargs):
@@ -66,6 +73,7 @@ class Servicio(models.Model):
             self.dias_disponibles = []
         else:
             self.dias_disponibles = [str(d).lower().strip() for d in self.dias_disponibles]
+        self.dias_mascara = mascara_dias(self.dias_disponibles)
         self.full_clean()
         super().save(*args, **kwargs)
 
@@ -4,6 +4,8 @@ from .models import Servicio, ServicioInsumo
 from inventario.models import Insumo
 from django.db import transaction
 
+from core.fechas import BIT_DIA
+
 
 # Agregamos un serializer simple para recibir datos de escritura de la receta
 class ServicioInsumoWriteSerializer(serializers.Serializer):
@@ -69,9 +71,8 @@ class ServicioCreateUpdateSerializer(serializers.ModelSerializer):
     def validate_dias_disponibles(self, value):
         if not value:
             raise serializers.ValidationError("Debe seleccionar al menos un día disponible.")
-        dias_validos = {"lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"}
         for d in value:
-            if str(d).lower().strip() not in dias_validos:
+            if str(d).lower().strip() not in BIT_DIA:
                 raise serializers.ValidationError(f"'{d}' no es un día válido.")
         # normalizar
         return [str(d).lower().strip() for d in value]
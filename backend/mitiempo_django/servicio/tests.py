@@ -1,3 +1,64 @@
+from datetime import date
+from importlib import import_module
+
+from django.apps import apps
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.fechas import TODOS_LOS_DIAS
+from .models import Servicio
+
+# Lunes 10 de marzo de 2025
+LUNES = date(2025, 3, 10)
+
+
+class DiasMascaraTest(TestCase):
+    """Servicio.dias_mascara: cálculo, migración de datos y filtro ?dia=."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fin_de_semana = Servicio.objects.create(
+            tipo_serv='peluqueria', nombre='Brushing', precio=100, duracion=30,
+            dias_disponibles=['Sabado', ' domingo ']
+        )
+        cls.lunes = Servicio.objects.create(
+            tipo_serv='peluqueria', nombre='Corte', precio=100, duracion=30,
+            dias_disponibles=['lunes']
+        )
+
+    def test_mascara_y_disponible_el(self):
+        self.assertEqual(self.fin_de_semana.dias_mascara, 0b1100000)
+        self.assertEqual(self.lunes.dias_mascara, 0b0000001)
+        self.assertTrue(self.lunes.disponible_el(LUNES))
+        self.assertFalse(self.lunes.disponible_el(date(2025, 3, 11)))
+        self.assertTrue(self.fin_de_semana.disponible_el(date(2025, 3, 15)))
+        self.assertTrue(self.fin_de_semana.disponible_el(date(2025, 3, 16)))
+        self.assertFalse(self.fin_de_semana.disponible_el(LUNES))
+
+    def test_migracion_completa_las_mascaras(self):
+        Servicio.objects.create(
+            tipo_serv='peluqueria', nombre='Color', precio=100, duracion=30,
+            dias_disponibles=['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+        )
+        # Como quedan las filas antes de la migración
+        Servicio.objects.update(dias_mascara=0)
+
+        migracion = import_module('servicio.migrations.0003_dias_mascara')
+        migracion.calcular_mascaras(apps, None)
+
+        mascaras = dict(Servicio.objects.values_list('nombre', 'dias_mascara'))
+        self.assertEqual(mascaras, {'Brushing': 0b1100000, 'Corte': 0b0000001, 'Color': TODOS_LOS_DIAS})
+
+    def test_filtro_por_dia(self):
+        client = APIClient()
+        resp = client.get('/api/servicio/servicios/', {'dia': 'sabado'})
+        self.assertEqual([s['nombre'] for s in resp.data['results']], ['Brushing'])
+
+        resp = client.get('/api/servicio/servicios/', {'dia': 'Lunes,domingo'})
+        self.assertEqual([s['nombre'] for s in resp.data['results']], ['Brushing', 'Corte'])
 
-# Create your tests here.
+    def test_dia_desconocido(self):
+        for dia in ('sabdo', 'lunes,sabdo', ','):
+            resp = APIClient().get('/api/servicio/servicios/', {'dia': dia})
+            self.assertEqual(resp.status_code, 400, dia)
+            self.assertIn('dia', resp.data)
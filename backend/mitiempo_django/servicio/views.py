@@ -1,11 +1,12 @@
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import ProtectedError, Q
+from django.db.models import ProtectedError, Q, F
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 
+from core.fechas import BIT_DIA, mascara_dias
 from .models import Servicio, ServicioInsumo
 from .serializers import (
     ServicioListSerializer, ServicioDetailSerializer, ServicioCreateUpdateSerializer,
@@ -49,6 +50,7 @@ class ServicioListCreateView(generics.ListCreateAPIView):
         max_price = self.request.query_params.get('max_price')
         activo = self.request.query_params.get('activo') # Filtro clave para la papelera
         search = self.request.query_params.get('search')
+        dia = self.request.query_params.get('dia')
 
         if tipo:
             qs = qs.filter(tipo_serv__icontains=tipo)
@@ -62,6 +64,16 @@ class ServicioListCreateView(generics.ListCreateAPIView):
         if search:
             qs = qs.filter(Q(nombre__icontains=search) | Q(descripcion__icontains=search))
 
+        # ?dia=sabado (o varios: ?dia=sabado,domingo): disponibles alguno de
+        # esos días, resuelto en SQL con un AND de bits sobre dias_mascara.
+        # Un nombre desconocido es un error, no "todos los servicios".
+        if dia:
+            dias = [d.lower().strip() for d in dia.split(',')]
+            invalidos = [d for d in dias if d not in BIT_DIA]
+            if invalidos:
+                raise serializers.ValidationError({'dia': f"'{invalidos[0]}' no es un día válido."})
+            qs = qs.alias(dias_pedidos=F('dias_mascara').bitand(mascara_dias(dias))).filter(dias_pedidos__gt=0)
+
         # --- Lógica de Activos/Inactivos ---
         if activo is not None:
             # Si el frontend pide explícitamente (ej: papelera)
@@ -66,6 +66,10 @@ class TurnoAdmin(admin.ModelAdmin):
     # --- Orden por defecto ---
     ordering = ("-fecha_hora_inicio",)
     
+    # --- Duración y fin calculados en SQL (ver TurnoQuerySet) ---
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("cliente").with_fin()
+
     # --- Campos calculados (solo lectura) ---
     readonly_fields = ("duracion_total_minutos", "fecha_hora_fin") 
 
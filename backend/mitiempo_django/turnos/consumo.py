@@ -0,0 +1,163 @@
+# turnos/consumo.py
+"""
+Consumo de insumos de los turnos completados.
+
+Las recetas (ServicioInsumo) de todos los servicios de los turnos se
+expanden con una sola consulta a un mapa neto {insumo_id: cantidad}: si
+varios servicios (o varios turnos) usan el mismo insumo se descuenta una
+vez, sumado. Después se sigue el mismo esquema que las ventas
+(inventario/stock.py): bloquear los insumos ordenados por id, validar en
+memoria y aplicar todo con un único UPDATE condicional.
+
+completar() cierra varios turnos en una transacción (fin del día).
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventario import stock
+from inventario.models import Insumo
+from servicio.models import ServicioInsumo
+
+
+def consumo_neto(turno_ids):
+    """{insumo_id: cantidad total} que consumen los servicios de esos turnos."""
+    filas = ServicioInsumo.objects.filter(
+        servicio__turnoservicio__turno_id__in=list(turno_ids)
+    ).values('insumo_id').annotate(total=Sum('cantidad')).order_by()
+    return {f['insumo_id']: f['total'] for f in filas if f['total']}
+
+
+def consumo_por_turno(turno_ids):
+    """{turno_id: {insumo_id: cantidad}} con una sola consulta."""
+    filas = ServicioInsumo.objects.filter(
+        servicio__turnoservicio__turno_id__in=list(turno_ids)
+    ).values('servicio__turnoservicio__turno_id', 'insumo_id').annotate(total=Sum('cantidad')).order_by()
+    por_turno = defaultdict(dict)
+    for f in filas:
+        if f['total']:
+            por_turno[f['servicio__turnoservicio__turno_id']][f['insumo_id']] = f['total']
+    return por_turno
+
+
+def faltantes(cantidades, insumos):
+    """Mensajes de los insumos (ya bloqueados) que no alcanzan."""
+    return [
+        f"No hay suficiente stock de {insumos[pk].insumo_nombre}"
+        for pk, cantidad in cantidades.items()
+        if insumos[pk].insumo_stock < cantidad
+    ]
+
+
+def consumir(turno_ids):
+    """
+    Descuenta los insumos de los turnos en una transacción. Si alguno no
+    alcanza lanza ValidationError y no se descuenta nada.
+    Devuelve el mapa {insumo_id: cantidad} descontado.
+    """
+    with transaction.atomic():
+        cantidades = consumo_neto(turno_ids)
+        if not cantidades:
+            return {}
+
+        insumos = stock.bloquear(Insumo, cantidades)
+        errores = faltantes(cantidades, insumos)
+        if errores:
+            raise ValidationError("\n".join(errores))
+
+        try:
+            stock.mover(
+                Insumo, 'insumo_stock',
+                {pk: -cantidad for pk, cantidad in cantidades.items()},
+                campo_fecha='insumo_fecha_actualizacion'
+            )
+        except stock.StockInsuficiente as e:
+            raise ValidationError(str(e))
+        return cantidades
+
+
+def completar(turno_ids):
+    """
+    Marca como completados los turnos de 'turno_ids' y descuenta sus
+    insumos, todo en una transacción y con un número fijo de consultas:
+
+    1. bloquea los turnos (ordenados por id) con sus servicios precargados
+       y los valida contra la configuración del local (cacheada),
+    2. bloquea todos los insumos de sus recetas,
+    3. admite los turnos en el orden pedido mientras alcance el stock
+       (un turno sin stock no impide cerrar los siguientes),
+    4. un UPDATE de stock para todos los admitidos y uno de estado.
+
+    Devuelve [{'id', 'ok', 'error'}] en el orden de 'turno_ids'.
+    """
+    from .models import Turno, ConfiguracionLocal
+    from .disponibilidad import invalidar_dias
+
+    ids = list(dict.fromkeys(turno_ids))
+    errores = {}
+
+    with transaction.atomic():
+        turnos = {
+            t.pk: t for t in Turno.objects.select_for_update().filter(pk__in=ids)
+            .prefetch_related('servicios_asignados__servicio').order_by('pk')
+        }
+        config = ConfiguracionLocal.actual()
+
+        candidatos = []
+        for pk in ids:
+            turno = turnos.get(pk)
+            if turno is None:
+                errores[pk] = "Turno no encontrado."
+            elif turno.estado == 'completado':
+                errores[pk] = "El turno ya está completado."
+            elif turno.estado == 'cancelado':
+                errores[pk] = "No se puede completar un turno cancelado."
+            elif config is None:
+                errores[pk] = "Falta configuración del local."
+            else:
+                try:
+                    turno.validar_agenda(config)
+                except ValidationError as e:
+                    errores[pk] = " ".join(e.messages)
+                else:
+                    candidatos.append(turno)
+
+        por_turno = consumo_por_turno([t.pk for t in candidatos])
+        insumos = stock.bloquear(Insumo, {i for receta in por_turno.values() for i in receta})
+        disponible = {pk: insumo.insumo_stock for pk, insumo in insumos.items()}
+
+        admitidos = []
+        total = defaultdict(int)
+        for turno in candidatos:
+            receta = por_turno.get(turno.pk, {})
+            sin_stock = [
+                insumos[i].insumo_nombre
+                for i, cantidad in receta.items()
+                if disponible.get(i, 0) < cantidad
+            ]
+            if sin_stock:
+                errores[turno.pk] = f"No hay suficiente stock de {', '.join(sin_stock)}"
+                continue
+            for i, cantidad in receta.items():
+                disponible[i] -= cantidad
+                total[i] += cantidad
+            admitidos.append(turno)
+
+        if admitidos:
+            stock.mover(
+                Insumo, 'insumo_stock',
+                {pk: -cantidad for pk, cantidad in total.items()},
+                campo_fecha='insumo_fecha_actualizacion'
+            )
+            # .update() no dispara las señales: la disponibilidad se invalida acá
+            Turno.objects.filter(pk__in=[t.pk for t in admitidos]).update(estado='completado')
+            fechas = {timezone.localtime(t.fecha_hora_inicio).date() for t in admitidos}
+            transaction.on_commit(lambda: invalidar_dias(fechas))
+
+    return [
+        {'id': pk, 'ok': pk not in errores, 'error': errores.get(pk)}
+        for pk in ids
+    ]
@@ -0,0 +1,271 @@
+# turnos/disponibilidad.py
+"""
+Motor de disponibilidad de turnos.
+
+Los bloques ocupados de cada día se cargan una sola vez, se ordenan y se
+fusionan; cada horario candidato se resuelve con búsqueda binaria o con un
+barrido lineal, en lugar de recorrer todos los turnos por cada horario.
+
+Cada día se guarda como una foto (SnapshotDia) en el cache de Django. Las
+señales de turnos/models.py borran la foto del día cuando cambia un Turno o
+un TurnoServicio, y suben la versión global cuando cambia un Servicio o la
+ConfiguracionLocal.
+
+Con varios procesos TURNOS_DISPONIBILIDAD_CACHE tiene que ser un cache
+compartido: en uno por proceso (LocMemCache) la invalidación sólo llega al
+proceso que guardó el turno y los demás sirven su foto hasta que vence
+(TURNOS_DISPONIBILIDAD_TTL).
+"""
+import time as _time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.fechas import dia_semana, filtro_dias
+from servicio.models import Servicio
+from .models import Turno, ConfiguracionLocal
+
+ESTADOS_OCUPAN = ('pendiente', 'confirmado')
+
+CLAVE_VERSION = 'turnos:disponibilidad:version'
+
+
+class AgendaDia:
+    """
+    Bloques ocupados de un día como intervalos [inicio, fin) ordenados y
+    sin solapamientos.
+    """
+
+    def __init__(self, bloques=()):
+        inicios, fines = [], []
+        for inicio, fin in sorted(bloques):
+            if fin <= inicio:
+                continue
+            if fines and inicio <= fines[-1]:
+                # Se solapa (o toca) con el bloque anterior: fusionar
+                if fin > fines[-1]:
+                    fines[-1] = fin
+                continue
+            inicios.append(inicio)
+            fines.append(fin)
+        self._inicios = inicios
+        self._fines = fines
+
+    def __len__(self):
+        return len(self._inicios)
+
+    def esta_libre(self, inicio, fin):
+        """True si [inicio, fin) no pisa ningún bloque ocupado."""
+        # Primer bloque que termina después de 'inicio'
+        i = bisect_right(self._fines, inicio)
+        return i == len(self._inicios) or self._inicios[i] >= fin
+
+    def horarios(self, candidatos, fin, duracion, ahora=None):
+        """
+        Recorre los horarios 'candidatos' (ordenados) en los que el bloque
+        de 'duracion' termina antes de 'fin' y devuelve tuplas
+        (fecha_hora, estado) con estado 'disponible', 'ocupado' o 'pasado'.
+
+        Los candidatos avanzan en orden, así que el índice de bloques sólo
+        avanza: el barrido completo es O(horarios + bloques).
+        """
+        i = 0
+        total = len(self._inicios)
+        for curr in candidatos:
+            if curr + duracion > fin:
+                break
+            while i < total and self._fines[i] <= curr:
+                i += 1
+
+            if i < total and self._inicios[i] < curr + duracion:
+                estado = 'ocupado'
+            elif ahora is not None and curr <= ahora:
+                estado = 'pasado'
+            else:
+                estado = 'disponible'
+
+            yield curr, estado
+
+
+def bloques_por_dia(desde, hasta):
+    """
+    Bloques ocupados entre las fechas 'desde' y 'hasta' (inclusive),
+    agrupados por fecha local. Resuelve todo el rango en una sola consulta.
+    """
+    tz = timezone.get_current_timezone()
+
+    filas = Turno.objects.filter(
+        estado__in=ESTADOS_OCUPAN,
+        **filtro_dias('fecha_hora_inicio', desde, hasta)
+    ).with_duracion().values_list('fecha_hora_inicio', 'duracion_calculada').order_by()
+
+    bloques = defaultdict(list)
+    for start, dur in filas:
+        local = timezone.localtime(start, tz)
+        bloques[local.date()].append((local, local + timedelta(minutes=dur or 0)))
+    return bloques
+
+
+class SnapshotDia:
+    """
+    Foto cacheable de un día: horario del local y bloques ocupados.
+    El estado 'pasado' se calcula al consultar, no se guarda.
+    """
+
+    def __init__(self, fecha, config, bloques=()):
+        self.fecha = fecha
+        self.dia = dia_semana(fecha)
+        self.abierto = config.abre(fecha)
+        self.hora_cierre = config.hora_cierre
+        self.grilla = config.grilla()
+        self.agenda = AgendaDia(bloques)
+
+    def horarios(self, duracion, ahora=None):
+        """Grilla de horarios del día según la configuración del local."""
+        if not self.abierto:
+            return iter(())
+        tz = timezone.get_current_timezone()
+        candidatos = (
+            timezone.make_aware(datetime.combine(self.fecha, time(m // 60, m % 60)), tz)
+            for m in self.grilla
+        )
+        fin = timezone.make_aware(datetime.combine(self.fecha, self.hora_cierre), tz)
+        return self.agenda.horarios(candidatos, fin, duracion, ahora)
+
+
+# ------------------------------------------------------
+# CACHE
+# ------------------------------------------------------
+def _cache():
+    return caches[getattr(settings, 'TURNOS_DISPONIBILIDAD_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'TURNOS_DISPONIBILIDAD_TTL', 60)
+
+
+def _version():
+    cache = _cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Arranca en un valor distinto en cada reinicio del cache para no
+        # reutilizar fotos viejas que hayan quedado con la misma versión.
+        cache.add(CLAVE_VERSION, int(_time.time()), None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def _clave_dia(fecha, version):
+    # 'foto': formato de SnapshotDia con la grilla precalculada
+    return f'turnos:disponibilidad:{version}:foto:{fecha.isoformat()}'
+
+
+def _clave_cambios(fecha, version):
+    # Contador de invalidaciones del día: snapshots() no guarda una foto si
+    # el día cambió mientras la armaba
+    return f'turnos:disponibilidad:{version}:cambios:{fecha.isoformat()}'
+
+
+def invalidar_dias(fechas):
+    """Descarta las fotos de las fechas indicadas."""
+    cache = _cache()
+    version = _version()
+    fechas = set(fechas)
+    # Primero el contador y después el borrado: una foto armada con datos
+    # viejos o ve el contador nuevo, o se guarda antes del borrado
+    for fecha in fechas:
+        clave = _clave_cambios(fecha, version)
+        if not cache.add(clave, 1, _timeout()):
+            try:
+                cache.incr(clave)
+            except ValueError:
+                # Venció entre el add() y el incr()
+                cache.add(clave, 1, _timeout())
+    cache.delete_many([_clave_dia(f, version) for f in fechas])
+
+
+def invalidar_todo():
+    """Sube la versión global: todas las fotos y el catálogo quedan viejos."""
+    cache = _cache()
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        _version()
+
+
+def snapshots(desde, hasta):
+    """
+    Fotos de cada día entre 'desde' y 'hasta' (inclusive). Los días que no
+    están en cache se arman con una sola consulta y se guardan.
+    Devuelve None si el local no tiene configuración.
+    """
+    cache = _cache()
+    version = _version()
+
+    fechas = []
+    fecha = desde
+    while fecha <= hasta:
+        fechas.append(fecha)
+        fecha += timedelta(days=1)
+
+    claves = {_clave_dia(f, version): f for f in fechas}
+    encontrados = cache.get_many(list(claves))
+    resultado = {claves[k]: snap for k, snap in encontrados.items()}
+
+    faltantes = [f for f in fechas if f not in resultado]
+    if faltantes:
+        config = ConfiguracionLocal.actual()
+        if not config:
+            return None
+        claves_control = [CLAVE_VERSION] + [_clave_cambios(f, version) for f in faltantes]
+        antes = cache.get_many(claves_control)
+        bloques = bloques_por_dia(min(faltantes), max(faltantes))
+        nuevos = {f: SnapshotDia(f, config, bloques.get(f, ())) for f in faltantes}
+        resultado.update(nuevos)
+
+        # Sólo se guardan los días que nadie invalidó mientras se armaban
+        despues = cache.get_many(claves_control)
+        if despues.get(CLAVE_VERSION) == version:
+            cache.set_many({
+                _clave_dia(f, version): snap for f, snap in nuevos.items()
+                if antes.get(_clave_cambios(f, version)) == despues.get(_clave_cambios(f, version))
+            }, _timeout())
+
+    return resultado
+
+
+def duraciones_servicios():
+    """Catálogo {id_serv: duracion} de los servicios activos, cacheado."""
+    cache = _cache()
+    clave = f'turnos:disponibilidad:{_version()}:servicios'
+    catalogo = cache.get(clave)
+    if catalogo is None:
+        catalogo = dict(
+            Servicio.objects.filter(activo=True).values_list('id_serv', 'duracion')
+        )
+        cache.set(clave, catalogo, _timeout())
+    return catalogo
+
+
+def proximos_horarios_libres(desde, hasta, duracion, cantidad):
+    """
+    Primeros 'cantidad' horarios libres entre 'desde' y 'hasta' (fechas
+    inclusive) para un bloque de 'duracion'. None si falta la configuración.
+    """
+    ahora = timezone.now()
+    fotos = snapshots(desde, hasta)
+    if fotos is None:
+        return None
+
+    libres = []
+    for fecha in sorted(fotos):
+        for curr, estado in fotos[fecha].horarios(duracion, ahora):
+            if estado == 'disponible':
+                libres.append(curr)
+                if len(libres) >= cantidad:
+                    return libres
+    return libres
@@ -0,0 +1,14 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0002_alter_turno_cliente_alter_turnoservicio_servicio'),
+        ('turnos', '0003_turno_comprobante_pago_turno_estado_pago_and_more'),
+    ]
+
+    operations = [
+    ]
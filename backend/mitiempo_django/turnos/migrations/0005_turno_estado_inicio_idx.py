@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0004_merge_20261018_1438'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['estado', 'fecha_hora_inicio'], name='turno_estado_inicio_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+
+
+def calcular_mascaras(apps, schema_editor):
+    ConfiguracionLocal = apps.get_model('turnos', 'ConfiguracionLocal')
+    for config in ConfiguracionLocal.objects.all():
+        dias = {str(d).lower().strip() for d in config.dias_abiertos or ()}
+        config.dias_mascara = sum(1 << i for i, dia in enumerate(DIAS_SEMANA) if dia in dias)
+        config.save(update_fields=['dias_mascara'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0005_turno_estado_inicio_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracionlocal',
+            name='dias_mascara',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_mascaras, migrations.RunPython.noop),
+    ]
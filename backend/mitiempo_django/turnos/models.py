@@ -1,15 +1,27 @@
+import time as _time
+
 from django.db import models
 from django.conf import settings
-from django.db.models import Sum
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from django.db.models import Sum, F, Value, ExpressionWrapper, DateTimeField, DurationField
+from django.db.models.functions import Coalesce
 from datetime import timedelta
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from core.fechas import bit_dia, dia_semana, mascara_dias
 from servicio.models import Servicio
+from . import consumo
 
 class ConfiguracionLocal(models.Model):
     hora_apertura = models.TimeField(default="09:00")
     hora_cierre = models.TimeField(default="18:00")
     dias_abiertos = models.JSONField(default=list, blank=True)
+    # Los mismos días como máscara de 7 bits (lunes = bit 0), se mantiene en save()
+    dias_mascara = models.PositiveSmallIntegerField(default=0, editable=False)
     tiempo_intervalo = models.PositiveIntegerField(default=30)
 
     class Meta:
@@ -18,8 +30,115 @@ class ConfiguracionLocal(models.Model):
 
     def save(self, *args, **kwargs):
         self.dias_abiertos = [dia.lower().strip() for dia in self.dias_abiertos]
+        self.dias_mascara = mascara_dias(self.dias_abiertos)
         super().save(*args, **kwargs)
 
+    # ---------- Configuración vigente (cacheada) ----------
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, 'TURNOS_DISPONIBILIDAD_CACHE', 'default')]
+
+    @classmethod
+    def _version(cls):
+        cache = cls._cache()
+        version = cache.get(CLAVE_VERSION_CONFIGURACION)
+        if version is None:
+            # Igual que turnos/disponibilidad.py: distinta en cada reinicio del cache
+            cache.add(CLAVE_VERSION_CONFIGURACION, int(_time.time()), None)
+            version = cache.get(CLAVE_VERSION_CONFIGURACION)
+        return version
+
+    @classmethod
+    def actual(cls):
+        """
+        La configuración del local sin consultar la base en cada uso. Se
+        guarda en el cache con una versión que sube al guardar o borrar la
+        configuración. Devuelve None si todavía no se cargó.
+        """
+        cache = cls._cache()
+        clave = f'turnos:configuracion:{cls._version()}'
+        config = cache.get(clave)
+        if config is None:
+            config = cls.objects.first()
+            if config:
+                config._precalcular()
+            cache.set(clave, config or SIN_CONFIGURACION, getattr(settings, 'TURNOS_DISPONIBILIDAD_TTL', 60))
+        return config if isinstance(config, cls) else None
+
+    @classmethod
+    def invalidar_cache(cls):
+        try:
+            cls._cache().incr(CLAVE_VERSION_CONFIGURACION)
+        except ValueError:
+            cls._version()
+
+    def _precalcular(self):
+        """
+        Calcula los valores derivados que se guardan en la instancia
+        (minutos_apertura y la grilla por defecto) para que viajen en el
+        cache con ella y no se recalculen en cada proceso que la lee.
+        """
+        self.grilla()
+
+    def abre(self, fecha):
+        """True si el local abre el día de la semana de 'fecha'."""
+        return bool(self.dias_mascara & bit_dia(fecha))
+
+    @cached_property
+    def minutos_apertura(self):
+        """(apertura, cierre) en minutos desde la medianoche."""
+        return (
+            self.hora_apertura.hour * 60 + self.hora_apertura.minute,
+            self.hora_cierre.hour * 60 + self.hora_cierre.minute,
+        )
+
+    def grilla(self, intervalo=None):
+        """
+        Inicios de turno del día, en minutos desde la medianoche, cada
+        'intervalo' minutos (por defecto tiempo_intervalo) entre la
+        apertura y el cierre. Se guarda en la instancia por intervalo.
+        """
+        intervalo = intervalo or self.tiempo_intervalo
+        grillas = self.__dict__.setdefault('_grillas', {})
+        if intervalo not in grillas:
+            apertura, cierre = self.minutos_apertura
+            grillas[intervalo] = tuple(range(apertura, cierre, intervalo))
+        return grillas[intervalo]
+
+
+CLAVE_VERSION_CONFIGURACION = 'turnos:configuracion:version'
+# Marca en cache para "no hay configuración" (cache.get devuelve None si falta la clave)
+SIN_CONFIGURACION = 'sin-configuracion'
+
+
+MICROSEGUNDOS_POR_MINUTO = 60 * 1000 * 1000
+
+
+class TurnoQuerySet(models.QuerySet):
+    """
+    Anotaciones en SQL para no disparar un aggregate por fila al leer
+    duracion_total_minutos / fecha_hora_fin.
+    """
+
+    def with_duracion(self):
+        return self.annotate(
+            duracion_calculada=Coalesce(Sum('servicios_asignados__duracion_servicio'), 0)
+        )
+
+    def with_fin(self):
+        qs = self if 'duracion_calculada' in self.query.annotations else self.with_duracion()
+        # MySQL guarda DurationField como microsegundos (BIGINT): minutos * 60e6
+        return qs.annotate(
+            fin_calculado=ExpressionWrapper(
+                F('fecha_hora_inicio') + ExpressionWrapper(
+                    F('duracion_calculada') * Value(MICROSEGUNDOS_POR_MINUTO),
+                    output_field=DurationField()
+                ),
+                output_field=DateTimeField()
+            )
+        )
+
 
 class Turno(models.Model):
     id_turno = models.AutoField(primary_key=True)
@@ -64,6 +183,8 @@ class Turno(models.Model):
 
     servicios = models.ManyToManyField(Servicio, through='TurnoServicio', related_name='turnos')
 
+    objects = TurnoQuerySet.as_manager()
+
     class Meta:
         db_table = 'turnos'
         verbose_name = "Turno"
@@ -75,34 +196,116 @@ class Turno(models.Model):
                 name='turno_unico_fecha_hora'
             )
         ]
+        indexes = [
+            # Disponibilidad: turnos que ocupan agenda en un rango de días
+            models.Index(fields=['estado', 'fecha_hora_inicio'], name='turno_estado_inicio_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Foto de los valores leídos: save() compara contra ella en lugar de
+        # volver a leer la fila, y las señales invalidan también el día
+        # anterior si el turno se reprograma (ver final del archivo).
+        instance._originales = {
+            attname: valor for attname, valor in zip(field_names, values)
+            if valor is not models.DEFERRED
+        }
+        return instance
+
+    def _guardar_originales(self):
+        self._originales = {
+            f.attname: self.__dict__[f.attname]
+            for f in self._meta.concrete_fields if f.attname in self.__dict__
+        }
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Lo recargado pasa a ser el valor original. También lo usa Django
+        # para traer un campo diferido (.only()/.defer()) al leerlo.
+        if fields is None:
+            self._guardar_originales()
+            return
+        recargados = set(fields)
+        originales = getattr(self, '_originales', {})
+        for f in self._meta.concrete_fields:
+            if (f.name in recargados or f.attname in recargados) and f.attname in self.__dict__:
+                originales[f.attname] = self.__dict__[f.attname]
+        self._originales = originales
+
+    def valor_original(self, campo):
+        return getattr(self, '_originales', {}).get(self._meta.get_field(campo).attname)
+
+    def campos_modificados(self):
+        """
+        Nombres de los campos que cambiaron desde que se leyó el turno, o
+        None si es nuevo (o se armó sin leerlo de la base). Un campo diferido
+        que se asignó sin leerlo no tiene original: cuenta como cambiado.
+        """
+        originales = getattr(self, '_originales', None)
+        if self._state.adding or originales is None:
+            return None
+        return {
+            f.name for f in self._meta.concrete_fields
+            if f.attname in self.__dict__ and (
+                f.attname not in originales
+                or self.__dict__[f.attname] != originales[f.attname]
+            )
+        }
 
     def save(self, *args, **kwargs):
-        # Detectar si cambiamos a completado
-        recien_completado = False
-        if self.pk:
-            original = Turno.objects.get(pk=self.pk)
-            if original.estado != 'completado' and self.estado == 'completado':
-                recien_completado = True
-
-        # Validación normal
-        self.full_clean()
-        super().save(*args, **kwargs)
+        cambios = self.campos_modificados()
+        if cambios is None:
+            # Alta: validación completa (incluye el horario único)
+            self.full_clean()
+            super().save(*args, **kwargs)
+            self._guardar_originales()
+            return
+
+        recien_completado = (
+            'estado' in cambios and self.estado == 'completado'
+            and self.valor_original('estado') != 'completado'
+        )
+        self.validar_cambios(cambios, agenda=recien_completado)
+        # Sólo se escriben las columnas que cambiaron (sin cambios, no hay UPDATE)
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = cambios
 
         if recien_completado:
-            self.procesar_consumo_insumos()
+            # Consumo y guardado en la misma transacción: si falla uno no queda el otro
+            with transaction.atomic():
+                self.marcar_completado()
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        self._guardar_originales()
+
+    def validar_cambios(self, cambios, agenda=False):
+        """
+        Valida sólo lo que cambió. La agenda (config del local y servicios)
+        se revisa si se mueve el horario o si el turno se completa.
+        """
+        excluir = [f.name for f in self._meta.concrete_fields if f.name not in cambios]
+        self.clean_fields(exclude=excluir)
+        if 'fecha_hora_inicio' in cambios:
+            self.validate_constraints(exclude=excluir)
+        if agenda or 'fecha_hora_inicio' in cambios:
+            self.clean()
+
+    def marcar_completado(self):
+        """
+        Pasa el turno a completado y descuenta sus insumos. El UPDATE
+        condicional bloquea la fila antes que los insumos (mismo orden que
+        consumo.completar) y evita descontar dos veces si otro pedido ya
+        lo completó.
+        """
+        if not Turno.objects.filter(pk=self.pk).exclude(estado='completado').update(estado='completado'):
+            raise ValidationError("El turno ya está completado.")
+        self.procesar_consumo_insumos()
 
     def procesar_consumo_insumos(self):
-        errores = []
-        with transaction.atomic():
-            for turno_servicio in self.servicios_asignados.all():
-                servicio = turno_servicio.servicio
-                ok, mensaje = servicio.consumir_stock()
-
-                if not ok:
-                    errores.append(f"Servicio {servicio.nombre}: {mensaje}")
-
-            if errores:
-                raise ValidationError("\n".join(errores))
+        # Recetas netas de todos los servicios, un único UPDATE (turnos/consumo.py)
+        return consumo.consumir([self.pk])
 
     def __str__(self):
         return f"Turno {self.fecha_hora_inicio} - {self.cliente}"
@@ -111,6 +314,13 @@ class Turno(models.Model):
     def duracion_total_minutos(self):
         if not self.pk:
             return 0
+        # Valor anotado por TurnoQuerySet.with_duracion()
+        if hasattr(self, 'duracion_calculada'):
+            return self.duracion_calculada
+        # Si los servicios vienen precargados (prefetch_related) sumamos en memoria
+        precargados = getattr(self, '_prefetched_objects_cache', {}).get('servicios_asignados')
+        if precargados is not None:
+            return sum(ts.duracion_servicio for ts in precargados)
         datos = self.servicios_asignados.aggregate(total=Sum('duracion_servicio'))
         return datos['total'] or 0
 
@@ -118,64 +328,39 @@ class Turno(models.Model):
     def fecha_hora_fin(self):
         if not self.fecha_hora_inicio:
             return None
+        # Valor anotado por TurnoQuerySet.with_fin()
+        if hasattr(self, 'fin_calculado'):
+            return self.fin_calculado
         return self.fecha_hora_inicio + timedelta(minutes=self.duracion_total_minutos)
 
     def clean(self):
         if not self.pk:
             return
-        config = ConfiguracionLocal.objects.first()
+        config = ConfiguracionLocal.actual()
         if not config:
             raise ValidationError("Falta configuración del local.")
+        self.validar_agenda(config)
 
-        dia = self.fecha_hora_inicio.strftime("%A").lower()
-        mapa_dias = {
-            "monday": "lunes",
-            "tuesday": "martes",
-            "wednesday": "miercoles",
-            "thursday": "jueves",
-            "friday": "viernes",
-            "saturday": "sabado",
-            "sunday": "domingo"
-        }
-        dia = mapa_dias.get(dia, dia)
+    def validar_agenda(self, config):
+        """
+        Día abierto y servicios activos/disponibles ese día. Usa
+        servicios_asignados precargados si los hay (cierre en lote).
+        """
+        fecha = timezone.localtime(self.fecha_hora_inicio).date()
+        dia = dia_semana(fecha)
 
-        if dia not in config.dias_abiertos:
+        if not config.abre(fecha):
             raise ValidationError(f"Local cerrado los {dia}.")
 
         for ts in self.servicios_asignados.all():
             serv = ts.servicio
             if not serv.activo:
                 raise ValidationError(f"Servicio '{serv.nombre}' inactivo.")
-            if dia not in serv.dias_disponibles:
+            if not serv.disponible_el(fecha):
                 raise ValidationError(f"Servicio '{serv.nombre}' no disponible los {dia}.")
 
     def descontar_stock(self):
-        for turno_servicio in self.servicios_asignados.all():
-            servicio = turno_servicio.servicio
-            receta = servicio.insumos_receta.all()
-
-            for item in receta:
-                insumo = item.insumo
-                cantidad_necesaria = item.cantidad
-
-                if insumo.insumo_stock >= cantidad_necesaria:
-                    insumo.insumo_stock -= cantidad_necesaria
-                    insumo.save()
-                else:
-                    raise ValidationError(f"No hay suficiente stock de {insumo.insumo_nombre}")
-
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        if self.pk:
-            try:
-                old = Turno.objects.get(pk=self.pk)
-                if old.estado != 'completado' and self.estado == 'completado':
-                    with transaction.atomic():
-                        self.descontar_stock()
-            except Turno.DoesNotExist:
-                pass
-
-        super().save(*args, **kwargs)
+        return self.procesar_consumo_insumos()
 
 
 class TurnoServicio(models.Model):
@@ -198,3 +383,52 @@ class TurnoServicio(models.Model):
             if self.servicio.duracion > 0:
                 self.duracion_servicio = self.servicio.duracion
         super().save(*args, **kwargs)
+
+
+
+# ---------- Señales: cache de disponibilidad ----------
+
+def _fecha_local(fecha_hora):
+    return timezone.localtime(fecha_hora).date() if fecha_hora else None
+
+
+def _invalidar_al_confirmar(fechas):
+    from .disponibilidad import invalidar_dias
+    fechas = {f for f in fechas if f}
+    if fechas:
+        # Después del commit: si se invalida antes, otra consulta podría
+        # volver a cachear el estado previo a la transacción.
+        transaction.on_commit(lambda: invalidar_dias(fechas))
+
+
+@receiver([post_save, post_delete], sender=Turno)
+def invalidar_disponibilidad_turno(sender, instance, **kwargs):
+    _invalidar_al_confirmar({
+        _fecha_local(instance.fecha_hora_inicio),
+        _fecha_local(instance.valor_original('fecha_hora_inicio')),
+    })
+
+
+@receiver([post_save, post_delete], sender=TurnoServicio)
+def invalidar_disponibilidad_turno_servicio(sender, instance, **kwargs):
+    try:
+        fecha_hora = instance.turno.fecha_hora_inicio
+    except Turno.DoesNotExist:
+        # El turno ya se borró: su propia señal invalidó el día
+        return
+    _invalidar_al_confirmar({_fecha_local(fecha_hora)})
+
+
+@receiver([post_save, post_delete], sender=Servicio)
+@receiver([post_save, post_delete], sender=ConfiguracionLocal)
+def invalidar_disponibilidad_global(sender, **kwargs):
+    from .disponibilidad import invalidar_todo
+    transaction.on_commit(invalidar_todo)
+
+
+@receiver([post_save, post_delete], sender=ConfiguracionLocal)
+def invalidar_configuracion(sender, **kwargs):
+    # Ya mismo (el cambio se ve dentro de la transacción) y otra vez al
+    # confirmar, por si otra consulta cacheó el valor anterior entretanto
+    ConfiguracionLocal.invalidar_cache()
+    transaction.on_commit(ConfiguracionLocal.invalidar_cache)
@@ -57,7 +57,8 @@ class TurnoListSerializer(serializers.ModelSerializer):
                 'duracion_servicio': ts.duracion_servicio,
                 'precio': ts.servicio.precio
             }
-            for ts in obj.servicios_asignados.select_related('servicio').all()
+            # .all() reutiliza el prefetch_related de la vista
+            for ts in obj.servicios_asignados.all()
         ]
 
     def get_cliente_id(self, obj):
@@ -99,7 +100,8 @@ class TurnoDetailSerializer(serializers.ModelSerializer):
                 'duracion_servicio': ts.duracion_servicio,
                 'precio': ts.servicio.precio
             }
-            for ts in obj.servicios_asignados.select_related('servicio').all()
+            # .all() reutiliza el prefetch_related de la vista
+            for ts in obj.servicios_asignados.all()
         ]
 
     def get_cliente_telefono(self, obj):
@@ -1,3 +1,585 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cliente.models import Cliente
+from core.fechas import dia_semana
+from inventario.models import Categoria_Insumo, Insumo
+from servicio.models import Servicio, ServicioInsumo
+from . import consumo, disponibilidad
+from .disponibilidad import AgendaDia
+from .models import ConfiguracionLocal, Turno, TurnoServicio
+from .views import MAX_DIAS_RANGO, MAX_PROXIMOS
+
+DIAS = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+
+class TurnoListQueriesTest(TestCase):
+    """La lista de turnos debe serializarse con una cantidad fija de consultas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.servicios = [
+            Servicio.objects.create(
+                tipo_serv='peluqueria', nombre=f'Servicio {i}',
+                precio=1000, duracion=30, dias_disponibles=DIAS
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def crear_turnos(self, cantidad):
+        inicio = timezone.make_aware(
+            datetime.combine(timezone.localdate() + timedelta(days=1), time(9))
+        )
+        existentes = Turno.objects.count()
+        for i in range(existentes, existentes + cantidad):
+            user = User.objects.create_user(f'cliente{i}', password='x')
+            Cliente.objects.create(user=user, nombre=f'Cliente {i}', telefono='123')
+            turno = Turno.objects.create(
+                cliente=user, fecha_hora_inicio=inicio + timedelta(hours=i)
+            )
+            TurnoServicio.objects.bulk_create([
+                TurnoServicio(turno=turno, servicio=s, duracion_servicio=s.duracion)
+                for s in self.servicios
+            ])
+
+    def test_lista_con_consultas_constantes(self):
+        # grupos del usuario + turnos + servicios_asignados + servicio
+        self.crear_turnos(2)
+        with self.assertNumQueries(4):
+            resp = self.client.get('/api/turnos/')
+        self.assertEqual(len(resp.data), 2)
+
+        self.crear_turnos(8)
+        with self.assertNumQueries(4):
+            resp = self.client.get('/api/turnos/')
+        self.assertEqual(len(resp.data), 10)
+
+        primero = resp.data[0]
+        self.assertEqual(len(primero['servicios']), 2)
+        self.assertIsNotNone(primero['cliente_id'])
+        self.assertIsNotNone(primero['fecha_hora_fin'])
+
+    def test_fin_de_un_turno_con_varios_servicios(self):
+        inicio = timezone.make_aware(
+            datetime.combine(timezone.localdate() + timedelta(days=1), time(9, 15))
+        )
+        cliente = User.objects.create_user('cliente', password='x')
+        turno = Turno.objects.create(cliente=cliente, fecha_hora_inicio=inicio)
+        TurnoServicio.objects.bulk_create([
+            TurnoServicio(turno=turno, servicio=self.servicios[0], duracion_servicio=45),
+            TurnoServicio(turno=turno, servicio=self.servicios[1], duracion_servicio=90),
+        ])
+        fin = inicio + timedelta(minutes=135)
+
+        # Anotación en SQL (minutos * 60e6 microsegundos) y propiedad sin anotar
+        anotado = Turno.objects.with_fin().get(pk=turno.pk)
+        self.assertEqual(anotado.duracion_calculada, 135)
+        self.assertEqual(anotado.fin_calculado, fin)
+        self.assertEqual(anotado.fecha_hora_fin, fin)
+        self.assertEqual(Turno.objects.get(pk=turno.pk).fecha_hora_fin, fin)
+
+        resp = self.client.get('/api/turnos/')
+        self.assertEqual(resp.data[0]['fecha_hora_fin'], timezone.localtime(fin).isoformat())
+
+    def test_detalle_sin_consultas_por_relacion(self):
+        self.crear_turnos(1)
+        turno = Turno.objects.get()
+        with self.assertNumQueries(4):
+            resp = self.client.get(f'/api/turnos/{turno.pk}/')
+        self.assertEqual(resp.data['cliente_telefono'], '123')
+        self.assertEqual(len(resp.data['servicios']), 2)
+
+
+def a_las(fecha, hora, minuto=0):
+    return timezone.make_aware(datetime.combine(fecha, time(hora, minuto)))
+
+
+class TurnosConStockTest(TestCase):
+    """Base: local abierto todos los días, un cliente y servicios con receta."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.cliente = User.objects.create_user('cliente', password='x')
+        ConfiguracionLocal.objects.create(
+            hora_apertura=time(9), hora_cierre=time(18), dias_abiertos=DIAS, tiempo_intervalo=30
+        )
+        categoria = Categoria_Insumo.objects.create(categoria_insumo_nombre='Tintes')
+        cls.tinte = Insumo.objects.create(
+            categoria_insumo=categoria, insumo_nombre='Tinte', insumo_unidad='ml', insumo_stock=10
+        )
+        cls.oxidante = Insumo.objects.create(
+            categoria_insumo=categoria, insumo_nombre='Oxidante', insumo_unidad='ml', insumo_stock=3
+        )
+        cls.color = cls.crear_servicio('Color', {cls.tinte: 2})
+        cls.decoloracion = cls.crear_servicio('Decoloración', {cls.oxidante: 5})
+
+    @classmethod
+    def crear_servicio(cls, nombre, receta, duracion=30):
+        servicio = Servicio.objects.create(
+            tipo_serv='peluqueria', nombre=nombre, precio=1000,
+            duracion=duracion, dias_disponibles=DIAS
+        )
+        for insumo, cantidad in receta.items():
+            ServicioInsumo.objects.create(servicio=servicio, insumo=insumo, cantidad=cantidad)
+        return servicio
+
+    def setUp(self):
+        # Las fotos y la configuración cacheadas sobreviven al rollback de cada test
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def crear_turno(self, inicio, *servicios, **extra):
+        turno = Turno.objects.create(cliente=self.cliente, fecha_hora_inicio=inicio, **extra)
+        TurnoServicio.objects.bulk_create([
+            TurnoServicio(turno=turno, servicio=s, duracion_servicio=s.duracion)
+            for s in servicios
+        ])
+        return turno
+
+    def stock(self, insumo):
+        insumo.refresh_from_db()
+        return insumo.insumo_stock
+
+
+class CompletarLoteTest(TurnosConStockTest):
+    """POST /api/turnos/completar/"""
+
+    def setUp(self):
+        super().setUp()
+        manana = timezone.localdate() + timedelta(days=1)
+        self.ok = self.crear_turno(a_las(manana, 9), self.color)
+        self.ya_completado = self.crear_turno(a_las(manana, 10), self.color, estado='completado')
+        self.sin_stock = self.crear_turno(a_las(manana, 11), self.decoloracion)
+
+    def test_ids_que_no_son_lista(self):
+        for ids in ("12", {"1": True, "2": True}, 3, None, [1, "2"], [1.0], [True]):
+            resp = self.client.post('/api/turnos/completar/', {'ids': ids}, format='json')
+            self.assertEqual(resp.status_code, 400, ids)
+        self.assertFalse(Turno.objects.filter(estado='completado').exclude(pk=self.ya_completado.pk).exists())
+        self.assertEqual(self.stock(self.tinte), 10)
+
+    def test_lote_mixto(self):
+        inexistente = Turno.objects.order_by('-pk').first().pk + 100
+        ids = [self.ok.pk, self.ya_completado.pk, inexistente, self.sin_stock.pk]
+        resp = self.client.post('/api/turnos/completar/', {'ids': ids}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['completados'], 1)
+        resultados = resp.data['resultados']
+        self.assertEqual([r['id'] for r in resultados], ids)
+        self.assertEqual([r['ok'] for r in resultados], [True, False, False, False])
+        self.assertIn('ya está completado', resultados[1]['error'])
+        self.assertIn('no encontrado', resultados[2]['error'])
+        self.assertIn('Oxidante', resultados[3]['error'])
+
+        self.ok.refresh_from_db()
+        self.sin_stock.refresh_from_db()
+        self.assertEqual(self.ok.estado, 'completado')
+        self.assertEqual(self.sin_stock.estado, 'pendiente')
+        # Sólo se descuenta la receta del turno admitido
+        self.assertEqual(self.stock(self.tinte), Decimal('8'))
+        self.assertEqual(self.stock(self.oxidante), Decimal('3'))
+
+    def test_stock_compartido_entre_turnos(self):
+        # Dos turnos de color (2 + 2) con 3 de tinte: entra el primero pedido
+        self.tinte.insumo_stock = 3
+        self.tinte.save()
+        otro = self.crear_turno(a_las(timezone.localdate() + timedelta(days=1), 12), self.color)
+        resp = self.client.post('/api/turnos/completar/', {'ids': [otro.pk, self.ok.pk]}, format='json')
+
+        self.assertEqual([r['ok'] for r in resp.data['resultados']], [True, False])
+        self.assertEqual(self.stock(self.tinte), Decimal('1'))
+
+
+class AgendaDiaTest(TestCase):
+    """Fusión de bloques y barrido de horarios (turnos/disponibilidad.py)."""
+
+    def setUp(self):
+        self.fecha = timezone.localdate() + timedelta(days=1)
+
+    def test_bloques_solapados_y_contiguos_se_fusionan(self):
+        agenda = AgendaDia([
+            (a_las(self.fecha, 9), a_las(self.fecha, 10)),
+            (a_las(self.fecha, 9, 30), a_las(self.fecha, 10, 30)),   # se solapa
+            (a_las(self.fecha, 10, 30), a_las(self.fecha, 11)),      # contiguo
+            (a_las(self.fecha, 14), a_las(self.fecha, 14)),          # vacío
+        ])
+        self.assertEqual(len(agenda), 1)
+        self.assertFalse(agenda.esta_libre(a_las(self.fecha, 10, 45), a_las(self.fecha, 11, 15)))
+        self.assertTrue(agenda.esta_libre(a_las(self.fecha, 8), a_las(self.fecha, 9)))
+        self.assertTrue(agenda.esta_libre(a_las(self.fecha, 11), a_las(self.fecha, 12)))
+
+    def test_horarios_contra_bloques(self):
+        agenda = AgendaDia([
+            (a_las(self.fecha, 10), a_las(self.fecha, 11)),
+            (a_las(self.fecha, 11), a_las(self.fecha, 11, 30)),
+        ])
+        candidatos = [a_las(self.fecha, 9, m) for m in (0, 30)] + [
+            a_las(self.fecha, h, m) for h in (10, 11, 12) for m in (0, 30)
+        ]
+        estados = dict(agenda.horarios(
+            candidatos, a_las(self.fecha, 12, 30), timedelta(minutes=30),
+            ahora=a_las(self.fecha, 9)
+        ))
+        self.assertEqual(estados[a_las(self.fecha, 9)], 'pasado')
+        self.assertEqual(estados[a_las(self.fecha, 9, 30)], 'disponible')
+        self.assertEqual(estados[a_las(self.fecha, 10)], 'ocupado')
+        self.assertEqual(estados[a_las(self.fecha, 11)], 'ocupado')
+        self.assertEqual(estados[a_las(self.fecha, 11, 30)], 'disponible')
+        self.assertEqual(estados[a_las(self.fecha, 12)], 'disponible')
+        # 12:30 + 30 min pasa el fin del día
+        self.assertNotIn(a_las(self.fecha, 12, 30), estados)
+
+
+class DisponibilidadTest(TurnosConStockTest):
+    """Endpoints de disponibilidad y cache de fotos por día."""
+
+    def setUp(self):
+        super().setUp()
+        self.fecha = timezone.localdate() + timedelta(days=2)
+
+    def horarios(self, servicio=None, fecha=None):
+        resp = self.client.get('/api/turnos/disponibilidad/', {
+            'fecha': (fecha or self.fecha).isoformat(),
+            'servicios_ids': (servicio or self.color).pk,
+        })
+        self.assertEqual(resp.status_code, 200)
+        return {h['hora']: h['estado'] for h in resp.data['horarios']}
+
+    def test_turnos_solapados_y_contiguos(self):
+        largo = self.crear_servicio('Alisado', {}, duracion=90)
+        self.crear_turno(a_las(self.fecha, 10), largo)        # 10:00 - 11:30
+        self.crear_turno(a_las(self.fecha, 11, 30), self.color)  # 11:30 - 12:00
+
+        horarios = self.horarios()
+        self.assertEqual(horarios['09:30'], 'disponible')
+        for hora in ('10:00', '10:30', '11:00', '11:30'):
+            self.assertEqual(horarios[hora], 'ocupado', hora)
+        self.assertEqual(horarios['12:00'], 'disponible')
+
+        # Una hora desde las 9:30 pisa el turno de las 10
+        horarios = self.horarios(servicio=largo)
+        self.assertEqual(horarios['09:00'], 'ocupado')
+        self.assertEqual(horarios['12:00'], 'disponible')
+
+    def test_turno_que_pasa_el_cierre(self):
+        largo = self.crear_servicio('Alisado', {}, duracion=90)
+        self.crear_turno(a_las(self.fecha, 17), largo)        # 17:00 - 18:30
+
+        horarios = self.horarios()
+        self.assertEqual(horarios['16:30'], 'disponible')
+        self.assertEqual(horarios['17:00'], 'ocupado')
+        self.assertEqual(horarios['17:30'], 'ocupado')
+        self.assertNotIn('18:00', horarios)
+
+        # 90 minutos: a las 15:30 termina justo cuando empieza el otro turno,
+        # y después de las 16:30 no entra antes del cierre
+        horarios = self.horarios(servicio=largo)
+        self.assertEqual(horarios['15:30'], 'disponible')
+        self.assertEqual(horarios['16:00'], 'ocupado')
+        self.assertEqual(horarios['16:30'], 'ocupado')
+        self.assertNotIn('17:00', horarios)
+
+    def test_dia_cerrado(self):
+        config = ConfiguracionLocal.objects.get()
+        config.dias_abiertos = [d for d in DIAS if d != dia_semana(self.fecha)]
+        config.save()
+
+        resp = self.client.get('/api/turnos/disponibilidad/', {
+            'fecha': self.fecha.isoformat(), 'servicios_ids': self.color.pk,
+        })
+        self.assertEqual(resp.data['horarios'], [])
+        self.assertIn(dia_semana(self.fecha), resp.data['mensaje'])
+
+        resp = self.client.get('/api/turnos/disponibilidad/rango/', {
+            'desde': self.fecha.isoformat(),
+            'hasta': (self.fecha + timedelta(days=1)).isoformat(),
+            'servicios_ids': self.color.pk,
+        })
+        self.assertEqual([d['abierto'] for d in resp.data['dias']], [False, True])
+        self.assertEqual(resp.data['dias'][0]['disponibles'], 0)
+        self.assertEqual(resp.data['dias'][1]['disponibles'], 18)
+
+    def test_la_foto_se_invalida_al_confirmar(self):
+        self.assertEqual(self.horarios()['10:00'], 'disponible')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            turno = self.crear_turno(a_las(self.fecha, 10), self.color)
+        # Antes del commit se sigue sirviendo la foto cacheada
+        self.assertEqual(self.horarios()['10:00'], 'disponible')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.horarios()['10:00'], 'ocupado')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.estado = 'cancelado'
+            turno.save()
+        self.assertEqual(self.horarios()['10:00'], 'disponible')
+
+    def test_no_guarda_la_foto_de_un_dia_invalidado_mientras_se_armaba(self):
+        original = disponibilidad.bloques_por_dia
+        otro_dia = self.fecha + timedelta(days=1)
+
+        def bloques_y_turno_nuevo(desde, hasta):
+            # Otro proceso guarda un turno después de la lectura de esta foto
+            bloques = original(desde, hasta)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.crear_turno(a_las(self.fecha, 10), self.color)
+            return bloques
+
+        with mock.patch.object(disponibilidad, 'bloques_por_dia', bloques_y_turno_nuevo):
+            fotos = disponibilidad.snapshots(self.fecha, otro_dia)
+        self.assertEqual(len(fotos[self.fecha].agenda), 0)
+
+        # La foto vieja no quedó en cache; la del otro día sí
+        with self.assertNumQueries(1):
+            fotos = disponibilidad.snapshots(self.fecha, otro_dia)
+        self.assertEqual(len(fotos[self.fecha].agenda), 1)
+        self.assertEqual(self.horarios()['10:00'], 'ocupado')
+
+    def test_no_guarda_fotos_si_cambio_la_version(self):
+        original = disponibilidad.bloques_por_dia
+
+        def bloques_e_invalidar_todo(desde, hasta):
+            bloques = original(desde, hasta)
+            disponibilidad.invalidar_todo()
+            return bloques
+
+        with mock.patch.object(disponibilidad, 'bloques_por_dia', bloques_e_invalidar_todo):
+            disponibilidad.snapshots(self.fecha, self.fecha)
+        version = disponibilidad._version()
+        self.assertIsNone(cache.get(disponibilidad._clave_dia(self.fecha, version)))
+        self.assertIsNone(cache.get(disponibilidad._clave_dia(self.fecha, version - 1)))
+
+    def test_foto_cacheada_sin_consultas(self):
+        self.horarios()
+        # Foto, configuración y catálogo de servicios salen del cache
+        with self.assertNumQueries(0):
+            self.horarios()
+
+    def test_limite_de_dias_del_rango(self):
+        params = {'desde': self.fecha.isoformat(), 'servicios_ids': self.color.pk}
+
+        resp = self.client.get('/api/turnos/disponibilidad/rango/', {
+            **params, 'hasta': (self.fecha + timedelta(days=MAX_DIAS_RANGO)).isoformat()
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data['dias']), MAX_DIAS_RANGO + 1)
+
+        resp = self.client.get('/api/turnos/disponibilidad/rango/', {
+            **params, 'hasta': (self.fecha + timedelta(days=MAX_DIAS_RANGO + 1)).isoformat()
+        })
+        self.assertEqual(resp.status_code, 400)
+
+        resp = self.client.get('/api/turnos/disponibilidad/rango/', {
+            **params, 'hasta': (self.fecha - timedelta(days=1)).isoformat()
+        })
+        self.assertEqual(resp.status_code, 400)
+
+    def test_fechas_invalidas(self):
+        base = {'servicios_ids': self.color.pk}
+        casos = (
+            ('/api/turnos/disponibilidad/', {'fecha': 'abc'}),
+            ('/api/turnos/disponibilidad/', {'fecha': '2020-13-01'}),
+            ('/api/turnos/disponibilidad/proximos/', {'desde': 'abc'}),
+            ('/api/turnos/disponibilidad/proximos/', {'hasta': '2020-13-01'}),
+            ('/api/turnos/disponibilidad/proximos/', {'cantidad': 'x'}),
+            ('/api/turnos/disponibilidad/rango/', {'desde': '2020-13-01'}),
+            ('/api/turnos/disponibilidad/rango/', {'desde': self.fecha.isoformat(), 'hasta': 'abc'}),
+            ('/api/turnos/disponibilidad/rango/', {'desde': self.fecha.isoformat(), 'hasta': '2025-02-30'}),
+        )
+        for url, params in casos:
+            resp = self.client.get(url, {**base, **params})
+            self.assertEqual(resp.status_code, 400, (url, params))
+            self.assertEqual(resp.data['error'], 'Datos inválidos', (url, params))
+
+    def test_limite_de_proximos(self):
+        resp = self.client.get('/api/turnos/disponibilidad/proximos/', {
+            'servicios_ids': self.color.pk, 'desde': self.fecha.isoformat(), 'cantidad': 1000,
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data['horarios']), MAX_PROXIMOS)
+        self.assertEqual(resp.data['horarios'][0]['fecha'], self.fecha.isoformat())
+        self.assertEqual(resp.data['horarios'][0]['hora'], '09:00')
+
+        # El rango se recorta a MAX_DIAS_RANGO días desde 'desde'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_turno(a_las(self.fecha, 9), self.color)
+        resp = self.client.get('/api/turnos/disponibilidad/proximos/', {
+            'servicios_ids': self.color.pk, 'desde': self.fecha.isoformat(),
+            'hasta': (self.fecha + timedelta(days=10 * MAX_DIAS_RANGO)).isoformat(), 'cantidad': 1,
+        })
+        self.assertEqual(resp.data['horarios'][0]['hora'], '09:30')
+
+
+class ConsumoInsumosTest(TurnosConStockTest):
+    """Completar un turno descuenta su receta neta con un único UPDATE (turnos/consumo.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.turno = self.crear_turno(
+            a_las(timezone.localdate() + timedelta(days=1), 9), self.color, self.decoloracion
+        )
+
+    def test_sin_stock_no_descuenta_nada(self):
+        # Alcanza el tinte (2 de 10) pero no el oxidante (5 de 3)
+        self.turno.estado = 'completado'
+        with self.assertRaises(ValidationError):
+            self.turno.save()
+
+        self.assertEqual(self.stock(self.tinte), Decimal('10'))
+        self.assertEqual(self.stock(self.oxidante), Decimal('3'))
+        self.assertEqual(Turno.objects.get(pk=self.turno.pk).estado, 'pendiente')
+
+        with self.assertRaises(ValidationError):
+            consumo.consumir([self.turno.pk])
+        self.assertEqual(self.stock(self.tinte), Decimal('10'))
+
+    def test_receta_neta_de_varios_servicios(self):
+        mechas = self.crear_servicio('Mechas', {self.tinte: 3})
+        TurnoServicio.objects.create(turno=self.turno, servicio=mechas, duracion_servicio=30)
+        self.assertEqual(
+            consumo.consumo_neto([self.turno.pk]),
+            {self.tinte.pk: Decimal('5'), self.oxidante.pk: Decimal('5')}
+        )
+
+    def test_completar_dos_veces_descuenta_una(self):
+        self.oxidante.insumo_stock = 20
+        self.oxidante.save()
+
+        self.turno.estado = 'completado'
+        self.turno.save()
+        self.assertEqual(self.stock(self.tinte), Decimal('8'))
+        self.assertEqual(self.stock(self.oxidante), Decimal('15'))
+
+        # Otra instancia leída antes del primer guardado (pedido concurrente)
+        otra = Turno.objects.get(pk=self.turno.pk)
+        otra._originales['estado'] = 'pendiente'
+        otra.estado = 'completado'
+        with self.assertRaises(ValidationError):
+            otra.save()
+
+        # Y el cierre en lote lo rechaza sin volver a descontar
+        resp = self.client.post('/api/turnos/completar/', {'ids': [self.turno.pk]}, format='json')
+        self.assertFalse(resp.data['resultados'][0]['ok'])
+
+        self.assertEqual(self.stock(self.tinte), Decimal('8'))
+        self.assertEqual(self.stock(self.oxidante), Decimal('15'))
+
+
+class ConfiguracionActualTest(TurnosConStockTest):
+    """ConfiguracionLocal.actual() y su cache."""
+
+    def test_cacheada_con_la_grilla_precalculada(self):
+        ConfiguracionLocal.actual()
+        with self.assertNumQueries(0):
+            config = ConfiguracionLocal.actual()
+        self.assertIn('minutos_apertura', config.__dict__)
+        self.assertEqual(config.grilla()[:2], (9 * 60, 9 * 60 + 30))
+        self.assertEqual(len(config.grilla()), 18)
+
+    def test_se_rearma_al_guardar(self):
+        config = ConfiguracionLocal.objects.get()
+        self.assertEqual(ConfiguracionLocal.actual().hora_cierre, time(18))
+
+        config.hora_cierre = time(12)
+        config.tiempo_intervalo = 60
+        with self.captureOnCommitCallbacks(execute=True):
+            config.save()
+
+        actual = ConfiguracionLocal.actual()
+        self.assertEqual(actual.hora_cierre, time(12))
+        self.assertEqual(actual.grilla(), (9 * 60, 10 * 60, 11 * 60))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            config.delete()
+        self.assertIsNone(ConfiguracionLocal.actual())
+
+
+class CamposModificadosTest(TurnosConStockTest):
+    """Turno.campos_modificados() y la foto de los valores leídos."""
+
+    def setUp(self):
+        super().setUp()
+        self.turno = self.crear_turno(a_las(timezone.localdate() + timedelta(days=1), 9), self.color)
+
+    def test_refresh_from_db_actualiza_la_foto(self):
+        Turno.objects.filter(pk=self.turno.pk).update(estado='confirmado', observaciones='Sin cambios')
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.campos_modificados(), set())
+
+        # Un refresh parcial sólo toma los campos pedidos
+        Turno.objects.filter(pk=self.turno.pk).update(estado='cancelado')
+        self.turno.observaciones = 'Nueva'
+        self.turno.refresh_from_db(fields=['estado'])
+        self.assertEqual(self.turno.campos_modificados(), {'observaciones'})
+        self.assertEqual(self.turno.valor_original('estado'), 'cancelado')
+
+    def test_campo_diferido(self):
+        turno = Turno.objects.only('id_turno', 'estado').get(pk=self.turno.pk)
+        # Leerlo lo carga con refresh_from_db: no es un cambio
+        self.assertEqual(turno.observaciones, self.turno.observaciones)
+        self.assertEqual(turno.campos_modificados(), set())
+
+        turno = Turno.objects.only('id_turno', 'estado').get(pk=self.turno.pk)
+        turno.observaciones = 'Asignado sin leer'
+        self.assertEqual(turno.campos_modificados(), {'observaciones'})
+        turno.save()
+        self.assertEqual(Turno.objects.get(pk=turno.pk).observaciones, 'Asignado sin leer')
+
+
+class AccionesDeUnTurnoTest(TurnosConStockTest):
+    """Pagos y cancelación: buscar el turno y un UPDATE de las columnas cambiadas."""
+
+    def setUp(self):
+        super().setUp()
+        self.turno = self.crear_turno(
+            a_las(timezone.localdate() + timedelta(days=1), 9), self.color, estado_pago='seña'
+        )
+
+    def test_aceptar_pago(self):
+        # grupos del usuario + turno + UPDATE
+        with self.assertNumQueries(3):
+            resp = self.client.post(f'/api/turnos/{self.turno.pk}/aceptar_pago/')
+        self.assertEqual(resp.status_code, 200)
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.estado, self.turno.estado_pago), ('confirmado', 'pagado'))
+
+    def test_rechazar_pago_y_cancelar(self):
+        with self.assertNumQueries(3):
+            self.client.post(f'/api/turnos/{self.turno.pk}/rechazar_pago/')
+        with self.assertNumQueries(3):
+            resp = self.client.post(f'/api/turnos/{self.turno.pk}/solicitar_cancelacion/')
+        self.assertEqual(resp.status_code, 200)
+        self.turno.refresh_from_db()
+        self.assertEqual((self.turno.estado, self.turno.estado_pago), ('cancelado', 'no_pagado'))
+
+    def test_cliente_solo_ve_sus_turnos(self):
+        grupo, _ = Group.objects.get_or_create(name='Cliente')
+        otro = User.objects.create_user('otro', password='x')
+        otro.groups.add(grupo)
+        self.cliente.groups.add(grupo)
+
+        client = APIClient()
+        client.force_authenticate(otro)
+        resp = client.post(f'/api/turnos/{self.turno.pk}/solicitar_cancelacion/')
+        self.assertEqual(resp.status_code, 404)
 
-# Create your tests here.
+        client.force_authenticate(self.cliente)
+        resp = client.post(f'/api/turnos/{self.turno.pk}/solicitar_cancelacion/')
+        self.assertEqual(resp.status_code, 200)
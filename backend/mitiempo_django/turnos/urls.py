@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TurnosViewSet, horarios_disponibles
+from .views import TurnosViewSet, horarios_disponibles, horarios_rango, proximos_horarios
 
 router = DefaultRouter()
 # Configuración del router para el ViewSet de Turnos
@@ -13,6 +13,12 @@ urlpatterns = [
     
     # URL Final: /api/turnos/disponibilidad/?fecha=...
     path('disponibilidad/', horarios_disponibles, name='horarios-disponibles'),
+
+    # URL Final: /api/turnos/disponibilidad/proximos/?servicios_ids=...&cantidad=5
+    path('disponibilidad/proximos/', proximos_horarios, name='horarios-proximos'),
+
+    # URL Final: /api/turnos/disponibilidad/rango/?desde=...&hasta=...&servicios_ids=...
+    path('disponibilidad/rango/', horarios_rango, name='horarios-rango'),
     
     # Rutas generadas por el router (List, Create, Retrieve, Update, Delete)
     path('', include(router.urls)),
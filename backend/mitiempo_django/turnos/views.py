@@ -3,29 +3,62 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django.utils import timezone
 from django.utils.dateparse import parse_date
-from datetime import timedelta, datetime
-from .models import Turno, ConfiguracionLocal
+from datetime import timedelta
+from core.pagination import HistorialCursorPagination
+from .models import Turno
+from . import consumo
 from .serializers import (
     TurnoListSerializer, TurnoDetailSerializer,
     TurnoCreateSerializer, TurnoUpdateSerializer
 )
-from servicio.models import Servicio
+from .disponibilidad import (
+    duraciones_servicios, proximos_horarios_libres, snapshots
+)
+
+# Límites para las consultas de disponibilidad por rango
+MAX_DIAS_RANGO = 90
+MAX_PROXIMOS = 50
+
+# Turnos por pedido en el cierre en lote
+MAX_COMPLETAR = 200
+
+# Acciones que cambian columnas de un solo turno: no necesitan los joins,
+# el prefetch ni la anotación de fin que usa el listado
+ACCIONES_DE_UN_TURNO = {'solicitar_cancelacion', 'subir_comprobante', 'aceptar_pago', 'rechazar_pago'}
 
 
 # ======================================================
-# DISPONIBILIDAD DE HORARIOS (TU CÓDIGO ORIGINAL)
+# DISPONIBILIDAD DE HORARIOS
 # ======================================================
-def get_dia_semana_es(fecha):
-    mapa = {
-        'Monday': 'lunes',
-        'Tuesday': 'martes',
-        'Wednesday': 'miercoles',
-        'Thursday': 'jueves',
-        'Friday': 'viernes',
-        'Saturday': 'sabado',
-        'Sunday': 'domingo'
-    }
-    return mapa.get(fecha.strftime('%A'), '').lower()
+def _fecha_param(request, param):
+    """
+    ?param= como fecha, o None si no vino. Un valor que no es una fecha
+    (mal formado o inexistente, ej. 2020-13-01) lanza ValueError.
+    """
+    valor = request.query_params.get(param)
+    if not valor:
+        return None
+    fecha = parse_date(valor)
+    if not fecha:
+        raise ValueError(valor)
+    return fecha
+
+
+def _duracion_servicios(s_ids_str):
+    """
+    Duración total de los servicios pedidos. Devuelve (timedelta, None) o
+    (None, Response) con el error a devolver.
+    """
+    try:
+        s_ids = {int(x) for x in s_ids_str.split(',') if x.strip()}
+    except (TypeError, ValueError):
+        return None, Response({'error': 'Datos inválidos'}, status=400)
+
+    catalogo = duraciones_servicios()
+    if not s_ids.issubset(catalogo):
+        return None, Response({'error': 'Servicios inválidos'}, status=404)
+
+    return timedelta(minutes=sum(catalogo[sid] for sid in s_ids)), None
 
 
 @api_view(['GET'])
@@ -38,73 +71,37 @@ def horarios_disponibles(request):
         return Response({'error': 'Faltan parámetros'}, status=400)
 
     try:
-        fecha = parse_date(fecha_str)
-        s_ids = [int(x) for x in s_ids_str.split(',') if x.strip()]
-    except:
+        fecha = _fecha_param(request, 'fecha')
+    except ValueError:
         return Response({'error': 'Datos inválidos'}, status=400)
 
-    servicios = Servicio.objects.filter(id_serv__in=s_ids, activo=True)
-    if servicios.count() != len(set(s_ids)):
-        return Response({'error': 'Servicios inválidos'}, status=404)
-
-    total_min = sum(s.duracion for s in servicios)
-    duracion_td = timedelta(minutes=total_min)
+    duracion_td, error = _duracion_servicios(s_ids_str)
+    if error:
+        return error
 
-    config = ConfiguracionLocal.objects.first()
-    if not config:
+    fotos = snapshots(fecha, fecha)
+    if fotos is None:
         return Response({'error': 'Sin configuración del local'}, status=500)
 
-    dia = get_dia_semana_es(fecha)
-    if dia not in config.dias_abiertos:
+    foto = fotos[fecha]
+    if not foto.abierto:
         return Response({
             'horarios': [],
             'disponibilidad': [],
-            'mensaje': f"Cerrado los {dia}."
+            'mensaje': f"Cerrado los {foto.dia}."
         })
 
-    tz = timezone.get_current_timezone()
-    inicio = timezone.make_aware(datetime.combine(fecha, config.hora_apertura), tz)
-    fin = timezone.make_aware(datetime.combine(fecha, config.hora_cierre), tz)
-    paso = timedelta(minutes=config.tiempo_intervalo)
-
-    ocupados = Turno.objects.filter(
-        fecha_hora_inicio__date=fecha,
-        estado__in=['pendiente', 'confirmado']
-    ).prefetch_related('servicios_asignados')
-
-    bloqueos = []
-    for t in ocupados:
-        start = t.fecha_hora_inicio
-        dur = sum(ts.duracion_servicio for ts in t.servicios_asignados.all())
-        bloqueos.append((start, start + timedelta(minutes=dur)))
-
     horarios = []
     horas_disponibles = []
-    now = timezone.now()
-    curr = inicio
-
-    while curr + duracion_td <= fin:
+    for curr, estado in foto.horarios(duracion_td, timezone.now()):
         hora_str = curr.strftime("%H:%M")
-        estado = "disponible"
-
-        if curr.date() == now.date() and curr <= now:
-            estado = "pasado"
-
-        for b_start, b_end in bloqueos:
-            if b_start < curr + duracion_td and b_end > curr:
-                estado = "ocupado"
-                break
-
         if estado == "disponible":
             horas_disponibles.append(hora_str)
-
         horarios.append({
             "hora": hora_str,
             "estado": estado
         })
 
-        curr += paso
-
     return Response({
         'horarios': horarios,
         'disponibilidad': horas_disponibles,
@@ -112,23 +109,129 @@ def horarios_disponibles(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def proximos_horarios(request):
+    """
+    Próximos N horarios libres en un rango de fechas.
+    GET /api/turnos/disponibilidad/proximos/?servicios_ids=1,2&desde=&hasta=&cantidad=5
+    """
+    s_ids_str = request.query_params.get('servicios_ids')
+    if not s_ids_str:
+        return Response({'error': 'Faltan parámetros'}, status=400)
+
+    hoy = timezone.localdate()
+    try:
+        desde = _fecha_param(request, 'desde') or hoy
+        hasta = _fecha_param(request, 'hasta') or desde + timedelta(days=30)
+        cantidad = int(request.query_params.get('cantidad', 5))
+    except ValueError:
+        return Response({'error': 'Datos inválidos'}, status=400)
+
+    desde = max(desde, hoy)
+    hasta = min(hasta, desde + timedelta(days=MAX_DIAS_RANGO))
+    cantidad = max(1, min(cantidad, MAX_PROXIMOS))
+    if hasta < desde:
+        return Response({'error': 'Rango de fechas inválido'}, status=400)
+
+    duracion_td, error = _duracion_servicios(s_ids_str)
+    if error:
+        return error
+
+    libres = proximos_horarios_libres(desde, hasta, duracion_td, cantidad)
+    if libres is None:
+        return Response({'error': 'Sin configuración del local'}, status=500)
+
+    return Response({
+        'horarios': [
+            {
+                'fecha': curr.date().isoformat(),
+                'hora': curr.strftime("%H:%M"),
+                'fecha_hora': curr.isoformat()
+            }
+            for curr in libres
+        ],
+        'mensaje': '' if libres else 'No hay horarios libres en el rango pedido.'
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def horarios_rango(request):
+    """
+    Grilla de disponibilidad de varios días (ej: un mes) en un solo pedido.
+    GET /api/turnos/disponibilidad/rango/?desde=2025-12-01&hasta=2025-12-31&servicios_ids=1,2
+    """
+    s_ids_str = request.query_params.get('servicios_ids')
+    desde_str = request.query_params.get('desde')
+    if not desde_str or not s_ids_str:
+        return Response({'error': 'Faltan parámetros'}, status=400)
+
+    try:
+        desde = _fecha_param(request, 'desde')
+        hasta = _fecha_param(request, 'hasta') or desde + timedelta(days=30)
+    except ValueError:
+        return Response({'error': 'Datos inválidos'}, status=400)
+
+    if hasta < desde or (hasta - desde).days > MAX_DIAS_RANGO:
+        return Response({'error': f'El rango debe ser de 0 a {MAX_DIAS_RANGO} días.'}, status=400)
+
+    duracion_td, error = _duracion_servicios(s_ids_str)
+    if error:
+        return error
+
+    fotos = snapshots(desde, hasta)
+    if fotos is None:
+        return Response({'error': 'Sin configuración del local'}, status=500)
+
+    ahora = timezone.now()
+    dias = []
+    for fecha in sorted(fotos):
+        foto = fotos[fecha]
+        horarios = [
+            {"hora": curr.strftime("%H:%M"), "estado": estado}
+            for curr, estado in foto.horarios(duracion_td, ahora)
+        ]
+        dias.append({
+            'fecha': fecha.isoformat(),
+            'dia': foto.dia,
+            'abierto': foto.abierto,
+            'disponibles': sum(1 for h in horarios if h['estado'] == 'disponible'),
+            'horarios': horarios,
+        })
+
+    return Response({
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'dias': dias,
+    })
+
+
 # ======================================================
 # VIEWSET PRINCIPAL — AHORA CON PAGO
 # ======================================================
+class TurnoPagination(HistorialCursorPagination):
+    ordering = ('fecha_hora_inicio', 'id_turno')
+
+
 class TurnosViewSet(viewsets.ModelViewSet):
     queryset = Turno.objects.all().order_by('fecha_hora_inicio')
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TurnoPagination
 
     # ----------------------------
     # FILTROS PARA ADMIN
     # ----------------------------
     def get_queryset(self):
         user = self.request.user
-        qs = Turno.objects.select_related(
-            'cliente'
-        ).prefetch_related(
-            'servicios_asignados__servicio'
-        ).order_by('fecha_hora_inicio')
+        if self.action in ACCIONES_DE_UN_TURNO:
+            qs = Turno.objects.all()
+        else:
+            qs = Turno.objects.select_related(
+                'cliente__cliente'
+            ).prefetch_related(
+                'servicios_asignados__servicio'
+            ).with_fin().order_by('fecha_hora_inicio')
 
         if not user.is_authenticated:
             return qs.none()
@@ -136,6 +239,9 @@ class TurnosViewSet(viewsets.ModelViewSet):
         if user.groups.filter(name='Cliente').exists():
             return qs.filter(cliente=user)
 
+        if self.action in ACCIONES_DE_UN_TURNO:
+            return qs
+
         # FILTRO: turnos con comprobante pendiente
         if self.request.query_params.get("pendiente_pago") == "1":
             return qs.filter(comprobante_pago__isnull=False, estado_pago="seña")
@@ -164,6 +270,37 @@ class TurnosViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
+    # ----------------------------
+    # COMPLETAR EN LOTE (cierre del día)
+    # ----------------------------
+    @action(detail=False, methods=['post'])
+    def completar(self, request):
+        """
+        POST /api/turnos/completar/  {"ids": [1, 2, 3]}
+        Completa varios turnos en una transacción y descuenta sus insumos.
+        Responde el resultado de cada turno; los que fallan (estado, agenda
+        o stock) no impiden completar el resto.
+        """
+        if not request.user.is_staff and request.user.groups.filter(name='Cliente').exists():
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        ids = request.data.get('ids')
+        # Sin conversiones: "12" no son los turnos 1 y 2, ni un dict sus claves
+        if not isinstance(ids, (list, tuple)) or not all(
+            isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+        ):
+            return Response({'error': "'ids' debe ser una lista de ids de turno."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > MAX_COMPLETAR:
+            return Response({'error': f"Se pueden completar entre 1 y {MAX_COMPLETAR} turnos."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        resultados = consumo.completar(ids)
+        return Response({
+            'completados': sum(r['ok'] for r in resultados),
+            'resultados': resultados,
+        })
+
     # ----------------------------
     # CANCELAR
     # ----------------------------
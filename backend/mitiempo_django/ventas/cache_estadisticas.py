@@ -0,0 +1,75 @@
+# ventas/cache_estadisticas.py
+"""
+Cache de respuestas de los endpoints de estadísticas del dashboard.
+
+La clave incluye el endpoint, los parámetros y la fecha local (los totales
+"de hoy" cambian de día aunque no haya ventas nuevas). Cada venta, compra,
+ingreso o egreso confirmado sube la versión global (señales en
+ventas/models.py), así una venta nueva se ve en el siguiente refresco y no
+recién cuando vence el TTL.
+"""
+import hashlib
+import time as _time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.response import Response
+
+CLAVE_VERSION = 'ventas:estadisticas:version'
+
+
+def _cache():
+    return caches[getattr(settings, 'VENTAS_ESTADISTICAS_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'VENTAS_ESTADISTICAS_TTL', 60)
+
+
+def _version():
+    cache = _cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, int(_time.time()), None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar():
+    """Sube la versión: todas las respuestas guardadas quedan viejas."""
+    try:
+        _cache().incr(CLAVE_VERSION)
+    except ValueError:
+        _version()
+
+
+def _clave(nombre, request):
+    params = urlencode(sorted(
+        (k, v) for k, valores in request.query_params.lists() for v in valores
+    ))
+    digest = hashlib.sha256(params.encode()).hexdigest()[:32]
+    return f'ventas:estadisticas:{_version()}:{nombre}:{timezone.localdate().isoformat()}:{digest}'
+
+
+def cachear(vista):
+    """
+    Decorador para vistas de función de DRF (va debajo de @api_view y
+    @permission_classes: la autenticación se resuelve antes del cache).
+    Sólo guarda respuestas 200.
+    """
+    @wraps(vista)
+    def envoltorio(request, *args, **kwargs):
+        cache = _cache()
+        clave = _clave(vista.__name__, request)
+        data = cache.get(clave)
+        if data is not None:
+            return Response(data)
+
+        response = vista(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(clave, response.data, _timeout())
+        return response
+    return envoltorio
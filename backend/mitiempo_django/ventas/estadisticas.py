@@ -0,0 +1,162 @@
+# ventas/estadisticas.py
+"""
+Mantenimiento de los acumulados diarios de ventas (VentasDiarias,
+VentasDiariasProducto, VentasDiariasServicio).
+
+Se actualizan al registrar una venta pagada y cuando una venta entra o sale
+del estado 'Pagado' (anulación, devolución parcial). Los endpoints del
+dashboard leen de estas tablas: el costo depende de los días pedidos y no
+de la cantidad de ventas.
+
+'python manage.py recalcular_ventas_diarias' los reconstruye desde cero.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Venta, Estado_Venta, Detalle_Venta, Detalle_Venta_Servicio,
+    VentasDiarias, VentasDiariasProducto, VentasDiariasServicio
+)
+
+SUBTOTAL_PRODUCTO = ExpressionWrapper(
+    F('detalle_venta_precio_unitario') * F('detalle_venta_cantidad') - F('detalle_venta_descuento'),
+    output_field=DecimalField(max_digits=12, decimal_places=2)
+)
+SUBTOTAL_SERVICIO = ExpressionWrapper(
+    F('precio') * F('cantidad') - F('descuento'),
+    output_field=DecimalField(max_digits=12, decimal_places=2)
+)
+
+
+def fecha_local(venta):
+    return timezone.localtime(venta.venta_fecha_hora).date()
+
+
+def _sumar(modelo, fecha, campo_clave, incrementos):
+    """
+    Suma {clave: {campo: monto}} a las filas (fecha, clave) de 'modelo'.
+    Bloquea las filas existentes en una consulta (ordenadas por id), las
+    actualiza con un bulk_update y crea las que falten con un bulk_create.
+    Si otra transacción crea la misma fila en paralelo se reintenta una vez.
+    """
+    if not incrementos:
+        return
+    campos = sorted({c for inc in incrementos.values() for c in inc})
+
+    for intento in range(2):
+        try:
+            with transaction.atomic():
+                existentes = {
+                    getattr(obj, campo_clave): obj
+                    for obj in modelo.objects.select_for_update().filter(
+                        fecha=fecha, **{f'{campo_clave}__in': list(incrementos)}
+                    ).order_by('pk')
+                }
+                nuevos = []
+                for clave, inc in incrementos.items():
+                    obj = existentes.get(clave)
+                    if obj is None:
+                        nuevos.append(modelo(fecha=fecha, **{campo_clave: clave}, **inc))
+                    else:
+                        for campo, monto in inc.items():
+                            setattr(obj, campo, getattr(obj, campo) + monto)
+                if existentes:
+                    modelo.objects.bulk_update(list(existentes.values()), campos)
+                if nuevos:
+                    modelo.objects.bulk_create(nuevos)
+            return
+        except IntegrityError:
+            if intento:
+                raise
+
+
+def acumular_venta(venta, detalles, detalles_servicio, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) una venta en los acumulados de su día.
+    'detalles' y 'detalles_servicio' son las filas Detalle_Venta /
+    Detalle_Venta_Servicio de la venta (ya en memoria o un queryset).
+    """
+    fecha = fecha_local(venta)
+
+    _sumar(VentasDiarias, fecha, 'medio_pago', {
+        venta.venta_medio_pago: {'cantidad_ventas': signo, 'total': signo * venta.venta_total}
+    })
+
+    productos = defaultdict(lambda: {'cantidad': 0, 'total': Decimal(0)})
+    for d in detalles:
+        fila = productos[d.producto_id]
+        fila['cantidad'] += signo * d.detalle_venta_cantidad
+        fila['total'] += signo * (d.detalle_venta_precio_unitario * d.detalle_venta_cantidad - d.detalle_venta_descuento)
+    _sumar(VentasDiariasProducto, fecha, 'producto_id', productos)
+
+    servicios = defaultdict(lambda: {'cantidad': 0, 'total': Decimal(0)})
+    for d in detalles_servicio:
+        fila = servicios[d.servicio_id]
+        fila['cantidad'] += signo * d.cantidad
+        fila['total'] += signo * (d.precio * d.cantidad - d.descuento)
+    _sumar(VentasDiariasServicio, fecha, 'servicio_id', servicios)
+
+
+def recalcular(desde=None, hasta=None):
+    """
+    Borra y vuelve a generar los acumulados (todo, o el rango de fechas
+    locales [desde, hasta]) agrupando las ventas pagadas en la base.
+    Devuelve la cantidad de filas generadas por tabla.
+    """
+    pagado_id = Estado_Venta.id_por_nombre(Estado_Venta.PAGADO)
+
+    def rango(qs):
+        if desde:
+            qs = qs.filter(fecha__gte=desde)
+        if hasta:
+            qs = qs.filter(fecha__lte=hasta)
+        return qs
+
+    ventas = rango(
+        Venta.objects.filter(estado_venta_id=pagado_id).annotate(fecha=TruncDate('venta_fecha_hora'))
+    ).values('fecha', 'venta_medio_pago').annotate(
+        cantidad_ventas=Count('id'), total=Sum('venta_total')
+    ).order_by()
+
+    productos = rango(
+        Detalle_Venta.objects.filter(venta__estado_venta_id=pagado_id).annotate(fecha=TruncDate('venta__venta_fecha_hora'))
+    ).values('fecha', 'producto_id').annotate(
+        cantidad=Sum('detalle_venta_cantidad'), total=Sum(SUBTOTAL_PRODUCTO)
+    ).order_by()
+
+    servicios = rango(
+        Detalle_Venta_Servicio.objects.filter(venta__estado_venta_id=pagado_id).annotate(fecha=TruncDate('venta__venta_fecha_hora'))
+    ).values('fecha', 'servicio_id').annotate(
+        unidades=Sum('cantidad'), total=Sum(SUBTOTAL_SERVICIO)
+    ).order_by()
+
+    with transaction.atomic():
+        for modelo in (VentasDiarias, VentasDiariasProducto, VentasDiariasServicio):
+            rango(modelo.objects.all()).delete()
+
+        filas_ventas = [
+            VentasDiarias(fecha=v['fecha'], medio_pago=v['venta_medio_pago'],
+                          cantidad_ventas=v['cantidad_ventas'], total=v['total'])
+            for v in ventas
+        ]
+        filas_productos = [VentasDiariasProducto(**p) for p in productos]
+        filas_servicios = [
+            VentasDiariasServicio(fecha=s['fecha'], servicio_id=s['servicio_id'],
+                                  cantidad=s['unidades'], total=s['total'])
+            for s in servicios
+        ]
+
+        VentasDiarias.objects.bulk_create(filas_ventas, batch_size=1000)
+        VentasDiariasProducto.objects.bulk_create(filas_productos, batch_size=1000)
+        VentasDiariasServicio.objects.bulk_create(filas_servicios, batch_size=1000)
+
+    return {
+        'ventas': len(filas_ventas),
+        'productos': len(filas_productos),
+        'servicios': len(filas_servicios),
+    }
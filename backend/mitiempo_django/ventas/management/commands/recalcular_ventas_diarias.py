@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from ventas import estadisticas
+
+class Command(BaseCommand):
+    help = 'Reconstruye los acumulados diarios de ventas (VentasDiarias, por producto y por servicio) a partir de las ventas pagadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha local inicial (YYYY-MM-DD). Por defecto, todas.')
+        parser.add_argument('--hasta', help='Fecha local final (YYYY-MM-DD). Por defecto, todas.')
+
+    def handle(self, *args, **options):
+        fechas = {}
+        for opcion in ('desde', 'hasta'):
+            valor = options[opcion]
+            try:
+                fechas[opcion] = parse_date(valor) if valor else None
+            except ValueError:
+                # Bien formada pero inexistente (ej. 2020-13-01)
+                fechas[opcion] = None
+            if valor and not fechas[opcion]:
+                raise CommandError(f'--{opcion}: formato de fecha inválido (YYYY-MM-DD).')
+
+        generadas = estadisticas.recalcular(**fechas)
+        self.stdout.write(self.style.SUCCESS(
+            f"Acumulados regenerados: {generadas['ventas']} filas de ventas, "
+            f"{generadas['productos']} de productos y {generadas['servicios']} de servicios."
+        ))
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def generar_acumulados(apps, schema_editor):
+    Venta = apps.get_model('ventas', 'Venta')
+    Detalle_Venta = apps.get_model('ventas', 'Detalle_Venta')
+    Detalle_Venta_Servicio = apps.get_model('ventas', 'Detalle_Venta_Servicio')
+    VentasDiarias = apps.get_model('ventas', 'VentasDiarias')
+    VentasDiariasProducto = apps.get_model('ventas', 'VentasDiariasProducto')
+    VentasDiariasServicio = apps.get_model('ventas', 'VentasDiariasServicio')
+    decimal = DecimalField(max_digits=12, decimal_places=2)
+
+    ventas = Venta.objects.filter(estado_venta__estado_venta_nombre='Pagado').annotate(
+        fecha=TruncDate('venta_fecha_hora')
+    ).values('fecha', 'venta_medio_pago').annotate(cantidad_ventas=Count('id'), total=Sum('venta_total')).order_by()
+    VentasDiarias.objects.bulk_create([
+        VentasDiarias(fecha=v['fecha'], medio_pago=v['venta_medio_pago'],
+                      cantidad_ventas=v['cantidad_ventas'], total=v['total'])
+        for v in ventas
+    ], batch_size=1000)
+
+    productos = Detalle_Venta.objects.filter(venta__estado_venta__estado_venta_nombre='Pagado').annotate(
+        fecha=TruncDate('venta__venta_fecha_hora')
+    ).values('fecha', 'producto_id').annotate(
+        cantidad=Sum('detalle_venta_cantidad'),
+        total=Sum(ExpressionWrapper(
+            F('detalle_venta_precio_unitario') * F('detalle_venta_cantidad') - F('detalle_venta_descuento'),
+            output_field=decimal
+        ))
+    ).order_by()
+    VentasDiariasProducto.objects.bulk_create([VentasDiariasProducto(**p) for p in productos], batch_size=1000)
+
+    servicios = Detalle_Venta_Servicio.objects.filter(venta__estado_venta__estado_venta_nombre='Pagado').annotate(
+        fecha=TruncDate('venta__venta_fecha_hora')
+    ).values('fecha', 'servicio_id').annotate(
+        unidades=Sum('cantidad'),
+        total=Sum(ExpressionWrapper(F('precio') * F('cantidad') - F('descuento'), output_field=decimal))
+    ).order_by()
+    VentasDiariasServicio.objects.bulk_create([
+        VentasDiariasServicio(fecha=s['fecha'], servicio_id=s['servicio_id'], cantidad=s['unidades'], total=s['total'])
+        for s in servicios
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_alter_insumo_categoria_insumo'),
+        ('servicio', '0002_alter_servicioinsumo_options_and_more'),
+        ('ventas', '0004_alter_detalle_venta_producto_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentasDiarias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('medio_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia')], max_length=20)),
+                ('cantidad_ventas', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Ventas Diarias',
+                'verbose_name_plural': 'Ventas Diarias',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'medio_pago'), name='uniq_ventas_diarias_fecha_medio')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentasDiariasProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventario.producto')),
+            ],
+            options={
+                'verbose_name': 'Ventas Diarias (Producto)',
+                'verbose_name_plural': 'Ventas Diarias (Productos)',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto'), name='uniq_ventas_diarias_fecha_producto')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentasDiariasServicio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='servicio.servicio')),
+            ],
+            options={
+                'verbose_name': 'Ventas Diarias (Servicio)',
+                'verbose_name_plural': 'Ventas Diarias (Servicios)',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'servicio'), name='uniq_ventas_diarias_fecha_servicio')],
+            },
+        ),
+        migrations.RunPython(generar_acumulados, migrations.RunPython.noop),
+    ]
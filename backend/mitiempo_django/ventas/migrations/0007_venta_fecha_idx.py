@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0006_indices_reportes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['venta_fecha_hora', 'id'], name='venta_fecha_idx'),
+        ),
+    ]
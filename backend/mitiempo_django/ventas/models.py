@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from . import cache_estadisticas
 from cliente.models import Cliente
 from empleado.models import Empleado
 from caja.models import Caja
@@ -7,7 +10,15 @@ from turnos.models import Turno
 from servicio.models import Servicio
 from inventario.models import Producto
 
+# Cache por proceso {nombre: id}; None = sin cargar (ver Estado_Venta.id_por_nombre)
+_ids_estado_venta = None
+
+
 class Estado_Venta(models.Model):
+    PAGADO = 'Pagado'
+    ANULADO = 'Anulado'
+    DEVOLUCION_PARCIAL = 'Devolución Parcial'
+
     estado_venta_nombre = models.CharField(max_length=200)
 
     class Meta:
@@ -17,6 +28,44 @@ class Estado_Venta(models.Model):
     def __str__(self):
         return self.estado_venta_nombre
 
+    @classmethod
+    def _cargar_ids(cls):
+        global _ids_estado_venta
+        ids = {}
+        # Si hay nombres repetidos gana el id más bajo (como .first())
+        for pk, nombre_estado in cls.objects.order_by('-id').values_list('id', 'estado_venta_nombre'):
+            ids[nombre_estado] = pk
+        _ids_estado_venta = ids
+        return ids
+
+    @classmethod
+    def id_por_nombre(cls, nombre, crear=False):
+        """
+        id del estado con ese nombre sin consultar la base en cada uso: la
+        tabla entera se carga una vez por proceso y se descarta al guardar o
+        borrar un estado. Un nombre que no está vuelve a cargar la tabla
+        una vez, por si lo creó otro proceso o una migración de datos; si
+        tampoco aparece se recuerda como faltante (None) hasta el próximo
+        limpiar_cache().
+        Devuelve None si no existe, salvo crear=True. Filtrar por
+        estado_venta_id=None no trae filas, igual que filtrar por un nombre
+        que no existe.
+        """
+        ids = _ids_estado_venta
+        if ids is None or nombre not in ids:
+            ids = cls._cargar_ids()
+
+        pk = ids.setdefault(nombre, None)
+        if pk is None and crear:
+            pk = cls.objects.get_or_create(estado_venta_nombre=nombre)[0].pk
+            ids[nombre] = pk
+        return pk
+
+    @classmethod
+    def limpiar_cache(cls):
+        global _ids_estado_venta
+        _ids_estado_venta = None
+
 
 class Venta(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, null=True, blank=True)
@@ -39,6 +88,14 @@ class Venta(models.Model):
         verbose_name = "Venta"
         verbose_name_plural = "Ventas"
         ordering = ['-venta_fecha_hora']
+        indexes = [
+            # Listado: orden por fecha y filtros por rango de días
+            models.Index(fields=['venta_fecha_hora', 'id'], name='venta_fecha_idx'),
+            # Reportes y dashboard: ventas de un estado en un rango de fechas
+            models.Index(fields=['estado_venta', 'venta_fecha_hora'], name='venta_estado_fecha_idx'),
+            # Totales por medio de pago de una caja
+            models.Index(fields=['caja', 'venta_medio_pago'], name='venta_caja_medio_idx'),
+        ]
 
     def __str__(self):
         return f"Venta #{self.id} - {self.venta_fecha_hora.strftime('%d/%m/%Y')}"
@@ -77,4 +134,76 @@ class Detalle_Venta_Servicio(models.Model):
         verbose_name_plural = "Detalles de Venta (Servicios)"
 
     def __str__(self):
-        return f"Servicio: {self.servicio.nombre} en Venta #{self.venta.id}"
\ No newline at end of file
+        return f"Servicio: {self.servicio.nombre} en Venta #{self.venta.id}"
+
+
+# ---------- Acumulados diarios (ver ventas/estadisticas.py) ----------
+# Sólo cuentan ventas 'Pagado'. Fecha = día local de venta_fecha_hora.
+
+class VentasDiarias(models.Model):
+    fecha = models.DateField()
+    medio_pago = models.CharField(max_length=20, choices=Venta.MEDIO_PAGO_CHOICES)
+    cantidad_ventas = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Ventas Diarias"
+        verbose_name_plural = "Ventas Diarias"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'medio_pago'], name='uniq_ventas_diarias_fecha_medio')
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.medio_pago}: {self.total}"
+
+
+class VentasDiariasProducto(models.Model):
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Ventas Diarias (Producto)"
+        verbose_name_plural = "Ventas Diarias (Productos)"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='uniq_ventas_diarias_fecha_producto')
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.producto_id}: {self.cantidad}"
+
+
+class VentasDiariasServicio(models.Model):
+    fecha = models.DateField()
+    servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE)
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Ventas Diarias (Servicio)"
+        verbose_name_plural = "Ventas Diarias (Servicios)"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'servicio'], name='uniq_ventas_diarias_fecha_servicio')
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.servicio_id}: {self.cantidad}"
+
+
+# ---------- Señales ----------
+
+@receiver([post_save, post_delete], sender=Estado_Venta)
+def limpiar_cache_estados(sender, **kwargs):
+    # Ahora para este hilo, y al confirmar por si otro hilo recargó antes
+    Estado_Venta.limpiar_cache()
+    transaction.on_commit(Estado_Venta.limpiar_cache)
+
+
+@receiver([post_save, post_delete], sender=Venta)
+@receiver([post_save, post_delete], sender='compras.Compra')
+@receiver([post_save, post_delete], sender='movimiento_caja.Ingreso')
+@receiver([post_save, post_delete], sender='movimiento_caja.Egreso')
+def invalidar_estadisticas(sender, **kwargs):
+    # Las respuestas cacheadas del dashboard se descartan al confirmar
+    transaction.on_commit(cache_estadisticas.invalidar)
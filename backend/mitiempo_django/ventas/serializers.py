@@ -9,9 +9,13 @@ from .models import Venta, Detalle_Venta, Estado_Venta, Detalle_Venta_Servicio
 from turnos.models import Turno
 from servicio.models import Servicio
 from inventario.models import Producto
+from inventario import stock
+from . import estadisticas
 from caja.models import Caja
 from movimiento_caja.models import Ingreso, Egreso
 
+from core.serializers import CamposDinamicosMixin
+
 # --- SERIALIZERS ANIDADOS ---
 from cliente.serializers import ClienteSerializer
 from empleado.serializers import EmpleadoNestedSerializer
@@ -55,7 +59,7 @@ class DetalleVentaServicioSerializer(serializers.ModelSerializer):
 # ---------------------------------------------------------
 #   LISTA DE VENTAS (LECTURA)
 # ---------------------------------------------------------
-class VentaListSerializer(serializers.ModelSerializer):
+class VentaListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     cliente = ClienteSerializer(read_only=True, allow_null=True)
     empleado_nombre = serializers.CharField(source='empleado.user.username', read_only=True) 
     estado_venta = EstadoVentaSerializer(read_only=True)
@@ -74,6 +78,28 @@ class VentaListSerializer(serializers.ModelSerializer):
         ]
 
 
+
+class VentaResumenSerializer(serializers.ModelSerializer):
+    """
+    Versión liviana para el listado (?vista=resumen): sin los detalles de
+    productos/servicios, así la vista no necesita prefetch.
+    """
+    cliente_nombre = serializers.SerializerMethodField()
+    empleado_nombre = serializers.CharField(source='empleado.user.username', read_only=True)
+    estado_venta = serializers.CharField(source='estado_venta.estado_venta_nombre', read_only=True)
+
+    class Meta:
+        model = Venta
+        fields = [
+            'id', 'cliente', 'cliente_nombre', 'empleado_nombre', 'caja', 'turno',
+            'estado_venta', 'venta_fecha_hora', 'venta_total',
+            'venta_medio_pago', 'venta_descuento'
+        ]
+
+    def get_cliente_nombre(self, obj):
+        return str(obj.cliente) if obj.cliente_id else None
+
+
 # ---------------------------------------------------------
 #   DETALLES (ESCRITURA)
 # ---------------------------------------------------------
@@ -124,7 +150,7 @@ class VentaCreateSerializer(serializers.ModelSerializer):
             # Excluimos las anuladas porque si se anuló, se debería permitir cobrar de nuevo (opcional)
             venta_existente = Venta.objects.filter(
                 turno_id=turno_id
-            ).exclude(estado_venta__estado_venta_nombre='Anulado').exists()
+            ).exclude(estado_venta_id=Estado_Venta.id_por_nombre(Estado_Venta.ANULADO)).exists()
             
             if venta_existente:
                  raise serializers.ValidationError(f"El Turno #{turno_id} ya fue cobrado anteriormente.")
@@ -144,64 +170,83 @@ class VentaCreateSerializer(serializers.ModelSerializer):
 
         try:
             with transaction.atomic():
-                estado_pagado, _ = Estado_Venta.objects.get_or_create(estado_venta_nombre='Pagado')
+                estado_pagado_id = Estado_Venta.id_por_nombre(Estado_Venta.PAGADO, crear=True)
+
+                # Productos: se bloquean todos juntos, ordenados por id, y el
+                # stock se valida en memoria antes de tocar nada
+                cantidades = stock.sumar_cantidades(
+                    (item['producto_id'], item['cantidad']) for item in productos_data
+                )
+                productos = stock.bloquear(Producto, cantidades)
+                if len(productos) != len(cantidades):
+                    raise Producto.DoesNotExist
+                for prod_id, cantidad in cantidades.items():
+                    prod = productos[prod_id]
+                    if prod.stock < cantidad:
+                        raise serializers.ValidationError(f"Stock insuficiente para {prod.producto_nombre}. Disponible: {prod.stock}")
+
+                servicios = Servicio.objects.in_bulk({item['servicio_id'] for item in servicios_data})
+                if len(servicios) != len({item['servicio_id'] for item in servicios_data}):
+                    raise Servicio.DoesNotExist
 
                 venta = Venta.objects.create(
                     empleado=empleado,
                     caja=caja_abierta,
                     cliente_id=cliente_id,
                     turno_id=turno_id,
-                    estado_venta=estado_pagado,
+                    estado_venta_id=estado_pagado_id,
                     venta_medio_pago=validated_data.get('venta_medio_pago', 'efectivo'),
                     venta_descuento=validated_data.get('venta_descuento', 0),
                     venta_total=0
                 )
 
-                # Productos
+                detalles = []
                 for item in productos_data:
-                    prod = Producto.objects.select_for_update().get(id=item['producto_id'])
-                    if prod.stock < item['cantidad']:
-                        raise serializers.ValidationError(f"Stock insuficiente para {prod.producto_nombre}. Disponible: {prod.stock}")
-
                     subtotal = (item['precio_unitario'] * item['cantidad']) - item.get('descuento', 0)
                     total_calculado += subtotal
-                    
-                    Detalle_Venta.objects.create(
+                    detalles.append(Detalle_Venta(
                         venta=venta,
-                        producto=prod,
+                        producto=productos[item['producto_id']],
                         detalle_venta_cantidad=item['cantidad'],
                         detalle_venta_precio_unitario=item['precio_unitario'],
                         detalle_venta_descuento=item.get('descuento', 0)
-                    )
-                    prod.stock -= item['cantidad']
-                    prod.save()
+                    ))
+                Detalle_Venta.objects.bulk_create(detalles)
+
+                # Un único UPDATE condicional (stock >= cantidad) para todos
+                stock.mover(
+                    Producto, 'stock',
+                    {prod_id: -cantidad for prod_id, cantidad in cantidades.items()},
+                    campo_fecha='producto_fecha_actualizacion'
+                )
 
                 # Servicios
+                detalles_servicio = []
                 for item in servicios_data:
-                    serv = Servicio.objects.get(id_serv=item['servicio_id']) 
                     subtotal = (item['precio'] * item['cantidad']) - item.get('descuento', 0)
                     total_calculado += subtotal
-
-                    Detalle_Venta_Servicio.objects.create(
+                    detalles_servicio.append(Detalle_Venta_Servicio(
                         venta=venta,
-                        servicio=serv,
+                        servicio=servicios[item['servicio_id']],
                         cantidad=item['cantidad'],
                         precio=item['precio'],
                         descuento=item.get('descuento', 0)
-                    )
+                    ))
+                Detalle_Venta_Servicio.objects.bulk_create(detalles_servicio)
 
                 total_final = total_calculado - venta.venta_descuento
                 if total_final < 0: total_final = 0
                 venta.venta_total = total_final
-                venta.save()
+                venta.save(update_fields=['venta_total'])
                 
-                # Actualizar saldo físico solo si es efectivo
-                if venta.venta_medio_pago == 'efectivo':
-                    # CORRECCIÓN: Usamos 'caja_saldo_final' para llevar el acumulado
-                    # Si tu lógica era diferente (ej: 'saldo_actual'), debes agregar ese campo al modelo Caja.
-                    # Por ahora, usaremos caja_saldo_final que sí existe.
-                    caja_abierta.caja_saldo_final = (caja_abierta.caja_saldo_final or 0) + total_final
-                    caja_abierta.save()
+                # Totales de la caja; el saldo físico sólo cambia si es efectivo
+                caja_abierta.acumular(
+                    saldo=total_final if venta.venta_medio_pago == 'efectivo' else 0,
+                    **{f'total_ventas_{venta.venta_medio_pago}': total_final}
+                )
+
+                # Acumulados diarios del dashboard
+                estadisticas.acumular_venta(venta, detalles, detalles_servicio)
 
                 return venta
 
@@ -209,6 +254,8 @@ class VentaCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Producto no encontrado.")
         except Servicio.DoesNotExist:
             raise serializers.ValidationError("Servicio no encontrado.")
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             raise serializers.ValidationError(str(e))
 
@@ -223,8 +270,29 @@ class VentaUpdateSerializer(serializers.ModelSerializer):
         model = Venta
         fields = ['estado_venta', 'venta_medio_pago']
 
+    def _ajustar_acumulados(self, instance, estado_anterior):
+        """
+        Los totales de ventas de la caja y los acumulados diarios sólo
+        cuentan ventas 'Pagado': si la venta entra o sale de ese estado se
+        suma o resta.
+        """
+        era_pagada = estado_anterior.estado_venta_nombre == Estado_Venta.PAGADO
+        es_pagada = instance.estado_venta.estado_venta_nombre == Estado_Venta.PAGADO
+        if era_pagada == es_pagada:
+            return
+        if instance.caja_id:
+            monto = instance.venta_total if es_pagada else -instance.venta_total
+            instance.caja.acumular(**{f'total_ventas_{instance.venta_medio_pago}': monto})
+        estadisticas.acumular_venta(
+            instance,
+            instance.detalle_venta_set.all(),
+            instance.detalle_venta_servicio_set.all(),
+            signo=1 if es_pagada else -1
+        )
+
     def update(self, instance, validated_data):
         nuevo_estado = validated_data.get('estado_venta')
+        estado_anterior = instance.estado_venta
         
         # Detectar intento de ANULACIÓN
         es_anulacion = (
@@ -293,15 +361,19 @@ class VentaUpdateSerializer(serializers.ModelSerializer):
                         egreso_monto=monto_a_devolver
                     )
                     
-                    # 2. Restar saldo físico si fue efectivo
-                    if instance.venta_medio_pago == 'efectivo':
-                        caja.caja_saldo_final = (caja.caja_saldo_final or 0) - monto_a_devolver
-                        caja.save()
+                    # 2. Sumar el egreso y restar saldo físico si fue efectivo
+                    caja.acumular(
+                        saldo=-monto_a_devolver if instance.venta_medio_pago == 'efectivo' else 0,
+                        total_egresos_manuales=monto_a_devolver
+                    )
 
-            instance.save()
+                instance.save()
+                self._ajustar_acumulados(instance, estado_anterior)
             return instance
 
         # Si no es anulación, comportamiento normal
-        instance.estado_venta = nuevo_estado
-        instance.save()
+        with transaction.atomic():
+            instance.estado_venta = nuevo_estado
+            instance.save()
+            self._ajustar_acumulados(instance, estado_anterior)
         return instance
\ No newline at end of file
@@ -1,3 +1,581 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from caja.models import Caja
+from cliente.models import Cliente
+from compras.models import Compra, Proveedor
+from core.fechas import filtro_dias, rango_dias
+from empleado.models import Empleado
+from inventario.models import Producto, Tipo_Producto
+from movimiento_caja.models import Egreso, Ingreso
+from servicio.models import Servicio
+from . import estadisticas
+from .models import (
+    Estado_Venta, Venta, VentasDiarias, VentasDiariasProducto, VentasDiariasServicio
+)
+
+
+class AcumuladosDiariosTest(TestCase):
+    """Los acumulados del dashboard deben coincidir con recalcular_ventas_diarias."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        Empleado.objects.create(user=cls.staff)
+        Caja.objects.create(empleado=cls.staff.empleado, caja_monto_inicial=0)
+        tipo = Tipo_Producto.objects.create(tipo_producto_nombre='Reventa')
+        cls.shampoo = Producto.objects.create(
+            tipo_producto=tipo, producto_nombre='Shampoo', producto_precio=10, stock=100
+        )
+        cls.crema = Producto.objects.create(
+            tipo_producto=tipo, producto_nombre='Crema', producto_precio=25, stock=100
+        )
+        cls.corte = Servicio.objects.create(
+            tipo_serv='peluqueria', nombre='Corte', precio=100, duracion=30, dias_disponibles=['lunes']
+        )
+        cls.anulado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.ANULADO)
+
+    def setUp(self):
+        cache.clear()
+        Estado_Venta.limpiar_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def vender(self, medio_pago, productos=(), servicios=0, descuento='0'):
+        resp = self.client.post('/api/ventas/ventas/', {
+            'venta_medio_pago': medio_pago,
+            'venta_descuento': descuento,
+            'productos': [
+                {'producto_id': p.pk, 'cantidad': cantidad, 'precio_unitario': str(p.producto_precio)}
+                for p, cantidad in productos
+            ],
+            'servicios': [
+                {'servicio_id': self.corte.pk, 'cantidad': servicios, 'precio': '100', 'descuento': '10'}
+            ] if servicios else [],
+        }, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return Venta.objects.latest('id')
+
+    def anular(self, venta):
+        resp = self.client.patch(
+            f'/api/ventas/ventas/{venta.pk}/', {'estado_venta': self.anulado.pk}, format='json'
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+
+    def acumulados(self):
+        """Filas de las tres tablas, sin las que quedaron en cero."""
+        filas = {}
+        for modelo, clave in ((VentasDiarias, 'medio_pago'),
+                              (VentasDiariasProducto, 'producto_id'),
+                              (VentasDiariasServicio, 'servicio_id')):
+            campo = 'cantidad_ventas' if modelo is VentasDiarias else 'cantidad'
+            for fila in modelo.objects.values('fecha', clave, campo, 'total'):
+                if fila[campo] or fila['total']:
+                    filas[(modelo.__name__, fila['fecha'], fila[clave])] = (fila[campo], Decimal(fila['total']))
+        return filas
+
+    def test_coinciden_con_el_recalculo(self):
+        self.vender('efectivo', [(self.shampoo, 2), (self.crema, 1)])
+        solo_productos = self.vender('efectivo', [(self.shampoo, 3)])
+        mixta = self.vender('transferencia', [(self.crema, 2)], servicios=1, descuento='5')
+        self.vender('transferencia', servicios=2)
+
+        self.anular(solo_productos)
+        self.anular(mixta)   # devolución parcial: deja de contar como pagada
+
+        incrementales = self.acumulados()
+        estadisticas.recalcular()
+        recalculados = self.acumulados()
+
+        self.assertEqual(incrementales, recalculados)
+        hoy = timezone.localdate()
+        self.assertEqual(recalculados[('VentasDiarias', hoy, 'efectivo')], (1, Decimal('45')))
+        self.assertEqual(recalculados[('VentasDiarias', hoy, 'transferencia')], (1, Decimal('190')))
+        self.assertEqual(recalculados[('VentasDiariasProducto', hoy, self.shampoo.pk)], (2, Decimal('20')))
+        self.assertEqual(recalculados[('VentasDiariasServicio', hoy, self.corte.pk)], (2, Decimal('190')))
+
+
+class RecalcularVentasDiariasTest(TestCase):
+    """Parámetros del comando recalcular_ventas_diarias."""
+
+    def test_fechas_invalidas(self):
+        for opcion in ('--desde=ayer', '--desde=2020-13-01', '--hasta=2025-02-30'):
+            with self.assertRaisesMessage(CommandError, 'formato de fecha inválido'):
+                call_command('recalcular_ventas_diarias', opcion, stdout=io.StringIO())
+
+
+class EstadoVentaIdsTest(TestCase):
+    """Estado_Venta.id_por_nombre y su cache por proceso."""
+
+    def setUp(self):
+        Estado_Venta.limpiar_cache()
+        self.pagado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.PAGADO)
+
+    def test_nombre_cargado_sin_consultas(self):
+        Estado_Venta.id_por_nombre(Estado_Venta.PAGADO)
+        with self.assertNumQueries(0):
+            self.assertEqual(Estado_Venta.id_por_nombre(Estado_Venta.PAGADO), self.pagado.pk)
+
+    def test_estado_creado_por_otro_proceso(self):
+        Estado_Venta.id_por_nombre(Estado_Venta.PAGADO)
+        # bulk_create no dispara post_save: como una fila insertada por otro
+        # proceso o por una migración, el cache de este proceso no se entera
+        anulado, = Estado_Venta.objects.bulk_create([Estado_Venta(estado_venta_nombre=Estado_Venta.ANULADO)])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Estado_Venta.id_por_nombre(Estado_Venta.ANULADO), anulado.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(Estado_Venta.id_por_nombre(Estado_Venta.ANULADO), anulado.pk)
+
+    def test_nombre_faltante_se_recuerda(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(Estado_Venta.id_por_nombre('Inexistente'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(Estado_Venta.id_por_nombre('Inexistente'))
+            self.assertEqual(Estado_Venta.id_por_nombre(Estado_Venta.PAGADO), self.pagado.pk)
+
+        # Creado sin señales: se ve después de limpiar el cache
+        nuevo, = Estado_Venta.objects.bulk_create([Estado_Venta(estado_venta_nombre='Inexistente')])
+        self.assertIsNone(Estado_Venta.id_por_nombre('Inexistente'))
+        Estado_Venta.limpiar_cache()
+        self.assertEqual(Estado_Venta.id_por_nombre('Inexistente'), nuevo.pk)
+
+    def test_crear_un_nombre_faltante(self):
+        self.assertIsNone(Estado_Venta.id_por_nombre(Estado_Venta.ANULADO))
+        pk = Estado_Venta.id_por_nombre(Estado_Venta.ANULADO, crear=True)
+
+        self.assertEqual(Estado_Venta.objects.get(pk=pk).estado_venta_nombre, Estado_Venta.ANULADO)
+        with self.assertNumQueries(1):
+            # El post_save del estado descartó la tabla: se carga una vez
+            self.assertEqual(Estado_Venta.id_por_nombre(Estado_Venta.ANULADO), pk)
+
+
+class EstadisticasCacheTest(TestCase):
+    """Respuestas cacheadas del dashboard (ventas/cache_estadisticas.py)."""
+
+    STATS = '/api/ventas/stats/ingresos-egresos/'
+    KPIS = '/api/ventas/dashboard/kpis/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.empleado = Empleado.objects.create(user=cls.staff)
+        cls.caja = Caja.objects.create(empleado=cls.empleado, caja_monto_inicial=0)
+        cls.proveedor = Proveedor.objects.create(proveedor_nombre='Proveedor')
+        tipo = Tipo_Producto.objects.create(tipo_producto_nombre='Reventa')
+        cls.producto = Producto.objects.create(
+            tipo_producto=tipo, producto_nombre='Shampoo', producto_precio=10, stock=100
+        )
+
+    def setUp(self):
+        cache.clear()
+        Estado_Venta.limpiar_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def get(self, url, params=None):
+        resp = self.client.get(url, params or {})
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def totales_de_hoy(self):
+        hoy = timezone.localdate().isoformat()
+        dia = next((d for d in self.get(self.STATS) if d['date'] == hoy), None)
+        return (dia['ingresos'], dia['egresos']) if dia else (0, 0)
+
+    def test_respuesta_cacheada_sin_consultas(self):
+        for url in (self.STATS, self.KPIS):
+            primera = self.get(url)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.get(url), primera)
+
+    def test_una_venta_cambia_stats_y_kpis(self):
+        self.totales_de_hoy()
+        self.assertEqual(self.get(self.KPIS)['finanzas']['ventas_cantidad'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post('/api/ventas/ventas/', {
+                'venta_medio_pago': 'efectivo',
+                'productos': [{'producto_id': self.producto.pk, 'cantidad': 2, 'precio_unitario': '10'}],
+            }, format='json')
+        self.assertEqual(resp.status_code, 201)
+
+        self.assertEqual(self.totales_de_hoy(), (Decimal('20'), 0))
+        finanzas = self.get(self.KPIS)['finanzas']
+        self.assertEqual(finanzas['ventas_cantidad'], 1)
+        self.assertEqual(finanzas['desglose_pagos']['efectivo'], Decimal('20'))
+
+    def test_compra_ingreso_y_egreso_cambian_stats(self):
+        self.assertEqual(self.totales_de_hoy(), (0, 0))
+        altas = (
+            (lambda: Compra.objects.create(
+                proveedor=self.proveedor, empleado=self.empleado, caja=self.caja, compra_total=15
+            ), (0, Decimal('15'))),
+            (lambda: Ingreso.objects.create(
+                caja=self.caja, ingreso_descripcion='Cambio', ingreso_monto=30
+            ), (Decimal('30'), Decimal('15'))),
+            (lambda: Egreso.objects.create(
+                caja=self.caja, egreso_descripcion='Limpieza', egreso_monto=5
+            ), (Decimal('30'), Decimal('20'))),
+        )
+        for alta, esperado in altas:
+            with self.captureOnCommitCallbacks(execute=True):
+                alta()
+            self.assertEqual(self.totales_de_hoy(), esperado)
+
+    def test_sin_confirmar_sigue_la_respuesta_cacheada(self):
+        self.assertEqual(self.totales_de_hoy(), (0, 0))
+        with self.captureOnCommitCallbacks(execute=False):
+            Ingreso.objects.create(caja=self.caja, ingreso_descripcion='Cambio', ingreso_monto=30)
+        # La invalidación espera al commit
+        self.assertEqual(self.totales_de_hoy(), (0, 0))
+
+    def test_clave_por_parametros_y_fecha_local(self):
+        self.get(self.STATS, {'dias': 7})
+        with self.assertNumQueries(0):
+            self.get(self.STATS, {'dias': 7})
+        # Otros parámetros: otra clave
+        with self.assertNumQueries(4):
+            self.get(self.STATS, {'dias': 30})
+
+        # Las claves de KPIS y STATS no se pisan con los mismos parámetros
+        self.assertIn('finanzas', self.get(self.KPIS, {'dias': 7}))
+
+        # Cambia el día local: las respuestas de ayer no sirven
+        manana = timezone.localdate() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.localdate', return_value=manana):
+            with self.assertNumQueries(4):
+                self.get(self.STATS, {'dias': 7})
+
+
+class FiltroDiasTest(TestCase):
+    """core/fechas.filtro_dias: días locales como rango sobre el índice."""
+
+    @classmethod
+    def setUpTestData(cls):
+        staff = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.empleado = Empleado.objects.create(user=staff)
+        cls.pagado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.PAGADO)
+
+    def crear(self, *momentos):
+        ids = []
+        for momento in momentos:
+            venta = Venta.objects.create(empleado=self.empleado, estado_venta=self.pagado)
+            Venta.objects.filter(pk=venta.pk).update(venta_fecha_hora=momento)
+            ids.append(venta.pk)
+        return ids
+
+    def filtrar(self, desde=None, hasta=None):
+        return list(
+            Venta.objects.filter(**filtro_dias('venta_fecha_hora', desde, hasta))
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def test_limites_de_medianoche(self):
+        local = lambda *args: timezone.make_aware(datetime(*args))
+        antes, inicio, fin, despues = self.crear(
+            local(2025, 3, 9, 23, 59, 59, 999999),
+            local(2025, 3, 10, 0, 0),
+            local(2025, 3, 10, 23, 59, 59, 999999),
+            local(2025, 3, 11, 0, 0),
+        )
+        dia = date(2025, 3, 10)
+        self.assertEqual(self.filtrar(dia, dia), [inicio, fin])
+        self.assertEqual(self.filtrar(desde=dia), [inicio, fin, despues])
+        self.assertEqual(self.filtrar(hasta=dia), [antes, inicio, fin])
+        self.assertEqual(filtro_dias('venta_fecha_hora'), {})
+
+    def test_cambio_de_horario(self):
+        # Nueva York: el 9/3/2025 dura 23 horas y el 2/11/2025 dura 25
+        with timezone.override('America/New_York'):
+            for dia, horas in ((date(2025, 3, 9), 23), (date(2025, 11, 2), 25), (date(2025, 6, 1), 24)):
+                inicio, fin = rango_dias(dia, dia)
+                # En UTC: restar dos aware de la misma zona da horas de reloj
+                self.assertEqual(fin.astimezone(dt_timezone.utc) - inicio.astimezone(dt_timezone.utc),
+                                 timedelta(hours=horas), dia)
+                self.assertEqual((inicio.hour, fin.hour), (0, 0), dia)
+
+            tz = timezone.get_current_timezone()
+            adentro, afuera = self.crear(
+                timezone.make_aware(datetime(2025, 3, 9, 23, 30), tz),
+                timezone.make_aware(datetime(2025, 3, 10, 0, 0), tz),
+            )
+            self.assertEqual(self.filtrar(date(2025, 3, 9), date(2025, 3, 9)), [adentro])
+            self.assertEqual(self.filtrar(date(2025, 3, 10), date(2025, 3, 10)), [afuera])
+
+    def test_rango_sobre_el_indice(self):
+        dia = date(2025, 3, 10)
+        qs = Venta.objects.filter(**filtro_dias('venta_fecha_hora', dia, dia))
+        # Sin funciones sobre la columna (__date haría un CAST/CONVERT_TZ)
+        self.assertNotIn('cast_date', str(qs.query).lower())
+        self.assertIn('venta_fecha_idx', qs.order_by('venta_fecha_hora', 'id').explain())
+        self.assertIn(
+            'venta_estado_fecha_idx',
+            qs.filter(estado_venta=self.pagado).order_by('venta_fecha_hora').explain()
+        )
+
+
+class VentaCamposTest(TestCase):
+    """?fields=, ?expand= y ?vista=resumen en GET /api/ventas/ventas/."""
+
+    URL = '/api/ventas/ventas/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        Empleado.objects.create(user=cls.staff)
+        Caja.objects.create(empleado=cls.staff.empleado, caja_monto_inicial=0)
+        tipo = Tipo_Producto.objects.create(tipo_producto_nombre='Reventa')
+        producto = Producto.objects.create(
+            tipo_producto=tipo, producto_nombre='Shampoo', producto_precio=10, stock=100
+        )
+        servicio = Servicio.objects.create(
+            tipo_serv='peluqueria', nombre='Corte', precio=100, duracion=30, dias_disponibles=['lunes']
+        )
+        client = APIClient()
+        client.force_authenticate(cls.staff)
+        for _ in range(3):
+            client.post(cls.URL, {
+                'venta_medio_pago': 'efectivo',
+                'productos': [{'producto_id': producto.pk, 'cantidad': 1, 'precio_unitario': '10'}],
+                'servicios': [{'servicio_id': servicio.pk, 'cantidad': 1, 'precio': '100'}],
+            }, format='json')
+
+    def setUp(self):
+        Estado_Venta.limpiar_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def get(self, params):
+        resp = self.client.get(self.URL, params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_consultas_segun_lo_pedido(self):
+        # ventas (con sus joins) + detalles y productos + detalles y servicios
+        with self.assertNumQueries(5):
+            data = self.get({})
+        self.assertEqual(len(data), 3)
+        self.assertEqual(len(data[0]['productos']), 1)
+
+        with self.assertNumQueries(1):
+            data = self.get({'fields': 'id,venta_total,estado_venta'})
+        self.assertEqual(set(data[0]), {'id', 'venta_total', 'estado_venta'})
+        self.assertEqual(data[0]['estado_venta']['estado_venta_nombre'], Estado_Venta.PAGADO)
+
+        with self.assertNumQueries(3):
+            data = self.get({'fields': 'id', 'expand': 'productos'})
+        self.assertEqual(set(data[0]), {'id', 'productos'})
+        self.assertEqual(data[0]['productos'][0]['producto_nombre'], 'Shampoo')
+
+        with self.assertNumQueries(1):
+            data = self.get({'vista': 'resumen'})
+        self.assertNotIn('productos', data[0])
+
+    def test_nombres_desconocidos(self):
+        data = self.get({'fields': 'id,inexistente', 'expand': 'servicios,otro'})
+        self.assertEqual(set(data[0]), {'id', 'servicios'})
+        self.assertEqual(self.get({'expand': 'otro'}), self.get({}))
+
+        # expand anidado (con punto) no está soportado: se ignora
+        with self.assertNumQueries(1):
+            data = self.get({'fields': 'id', 'expand': 'productos.producto_nombre'})
+        self.assertEqual(set(data[0]), {'id'})
+
+
+URLS_EXPORTAR = (
+    '/api/ventas/ventas/exportar/',
+    '/api/compras/compras/exportar/',
+    '/api/movimiento-caja/exportar/',
+)
+
+
+def contenido(resp):
+    return b''.join(resp.streaming_content).decode()
+
+
+class ExportarVentasTest(TestCase):
+    """GET /api/ventas/ventas/exportar/ y los parámetros comunes (core/exportar.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        empleado = Empleado.objects.create(user=cls.staff)
+        caja = Caja.objects.create(empleado=empleado, caja_monto_inicial=0)
+        pagado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.PAGADO)
+        cls.ventas = []
+        for dia, total in ((9, 100), (10, 250), (11, 40)):
+            venta = Venta.objects.create(
+                empleado=empleado, caja=caja, estado_venta=pagado, venta_total=total,
+                venta_medio_pago='efectivo' if dia != 10 else 'transferencia'
+            )
+            # auto_now_add: la fecha se fija después (23:30 local, cerca del cambio de día)
+            Venta.objects.filter(pk=venta.pk).update(
+                venta_fecha_hora=timezone.make_aware(datetime(2025, 3, dia, 23, 30))
+            )
+            cls.ventas.append(venta)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_csv(self):
+        resp = self.client.get(URLS_EXPORTAR[0], {'desde': '2025-03-10', 'hasta': '2025-03-11'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('ventas.csv', resp['Content-Disposition'])
+
+        filas = list(csv.DictReader(io.StringIO(contenido(resp))))
+        self.assertEqual([int(f['id']) for f in filas], [v.pk for v in self.ventas[1:]])
+        self.assertEqual(filas[0]['venta_total'], '250.00')
+        self.assertEqual(filas[0]['venta_medio_pago'], 'transferencia')
+        self.assertEqual(filas[0]['estado_venta__estado_venta_nombre'], Estado_Venta.PAGADO)
+        # Fecha en hora local, no en UTC
+        self.assertTrue(filas[0]['venta_fecha_hora'].startswith('2025-03-10T23:30:00'))
+        self.assertEqual(filas[0]['cliente_id'], '')
+
+    def test_ndjson(self):
+        resp = self.client.get(URLS_EXPORTAR[0], {'formato': 'ndjson', 'hasta': '2025-03-09'})
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        filas = [json.loads(linea) for linea in contenido(resp).splitlines()]
+        self.assertEqual(len(filas), 1)
+        self.assertEqual(filas[0]['id'], self.ventas[0].pk)
+        self.assertEqual(filas[0]['venta_total'], '100.00')
+        self.assertIsNone(filas[0]['cliente_id'])
+
+    def test_parametros_invalidos(self):
+        casos = (
+            ({'formato': 'xml'}, 'formato'),
+            ({'desde': 'ayer'}, 'desde'),
+            ({'desde': '2020-13-01'}, 'desde'),       # bien formada, fecha inexistente
+            ({'hasta': '2025-02-30'}, 'hasta'),
+            ({'desde': '2025-03-11', 'hasta': '2025-03-10'}, 'hasta'),
+        )
+        for url in URLS_EXPORTAR:
+            for params, campo in casos:
+                resp = self.client.get(url, params)
+                self.assertEqual(resp.status_code, 400, (url, params))
+                self.assertIn(campo, resp.data, (url, params))
+
+    def test_requiere_autenticacion(self):
+        for url in URLS_EXPORTAR:
+            resp = APIClient().get(url)
+            self.assertIn(resp.status_code, (401, 403), url)
+
+
+class VentaFiltrosTest(TestCase):
+    """Filtros, validación y orden de GET /api/ventas/ventas/."""
+
+    URL = '/api/ventas/ventas/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.otro = User.objects.create_user('cajero', password='x', is_staff=True)
+        cls.empleado = Empleado.objects.create(user=cls.staff)
+        cls.empleado_otro = Empleado.objects.create(user=cls.otro)
+        cls.caja = Caja.objects.create(empleado=cls.empleado, caja_monto_inicial=0)
+        cls.caja_otra = Caja.objects.create(empleado=cls.empleado_otro, caja_monto_inicial=0)
+        cliente_user = User.objects.create_user('ana', password='x')
+        cls.cliente = Cliente.objects.create(user=cliente_user, nombre='Ana')
+        cls.pagado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.PAGADO)
+        cls.anulado = Estado_Venta.objects.create(estado_venta_nombre=Estado_Venta.ANULADO)
+
+        # (día, hora, total, medio, estado, empleado, caja, cliente)
+        filas = (
+            (9, 23, 100, 'efectivo', cls.pagado, cls.empleado, cls.caja, cls.cliente),
+            (10, 0, 250, 'transferencia', cls.pagado, cls.empleado, cls.caja, None),
+            (10, 23, 100, 'efectivo', cls.anulado, cls.empleado_otro, cls.caja_otra, None),
+            (11, 10, 40, 'efectivo', cls.pagado, cls.empleado_otro, cls.caja_otra, cls.cliente),
+            (12, 10, 100, 'transferencia', cls.pagado, cls.empleado, cls.caja, None),
+        )
+        cls.ventas = []
+        for dia, hora, total, medio, estado, empleado, caja, cliente in filas:
+            venta = Venta.objects.create(
+                empleado=empleado, caja=caja, cliente=cliente, estado_venta=estado,
+                venta_total=total, venta_medio_pago=medio
+            )
+            Venta.objects.filter(pk=venta.pk).update(
+                venta_fecha_hora=timezone.make_aware(datetime(2025, 3, dia, hora, 30))
+            )
+            cls.ventas.append(venta)
+
+    def setUp(self):
+        Estado_Venta.limpiar_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def ids(self, params):
+        resp = self.client.get(self.URL, dict(params, ordering='id'))
+        self.assertEqual(resp.status_code, 200, (params, resp.data))
+        return [v['id'] for v in resp.data]
+
+    def esperados(self, *posiciones):
+        return [self.ventas[i].pk for i in posiciones]
+
+    def test_filtros(self):
+        casos = (
+            ({'fecha': '2025-03-10'}, (1, 2)),
+            ({'desde': '2025-03-10'}, (1, 2, 3, 4)),
+            ({'hasta': '2025-03-10'}, (0, 1, 2)),
+            ({'desde': '2025-03-10', 'hasta': '2025-03-11'}, (1, 2, 3)),
+            ({'cliente': self.cliente.pk}, (0, 3)),
+            ({'empleado': self.empleado_otro.pk}, (2, 3)),
+            ({'caja': self.caja.pk}, (0, 1, 4)),
+            ({'estado': self.anulado.pk}, (2,)),
+            ({'estado': Estado_Venta.PAGADO}, (0, 1, 3, 4)),
+            ({'estado': 'Inexistente'}, ()),
+            ({'medio_pago': 'transferencia'}, (1, 4)),
+            ({'total_min': '100'}, (0, 1, 2, 4)),
+            ({'total_max': '99.99'}, (3,)),
+            ({'total_min': '50', 'total_max': '100'}, (0, 2, 4)),
+            ({'caja': self.caja.pk, 'medio_pago': 'efectivo', 'desde': '2025-03-09'}, (0,)),
+        )
+        for params, posiciones in casos:
+            self.assertEqual(self.ids(params), self.esperados(*posiciones), params)
+
+    def test_parametros_invalidos(self):
+        casos = (
+            ({'fecha': '2020-13-01'}, 'fecha'),
+            ({'fecha': 'hoy'}, 'fecha'),
+            ({'desde': '2020-13-01'}, 'desde'),
+            ({'hasta': '2025-02-30'}, 'hasta'),
+            ({'desde': '2025-03-11', 'hasta': '2025-03-10'}, 'hasta'),
+            ({'caja': 'abc'}, 'caja'),
+            ({'cliente': '1.5'}, 'cliente'),
+            ({'total_min': 'x'}, 'total_min'),
+            ({'total_max': 'NaN'}, 'total_max'),
+            ({'medio_pago': 'cheque'}, 'medio_pago'),
+        )
+        for params, campo in casos:
+            resp = self.client.get(self.URL, params)
+            self.assertEqual(resp.status_code, 400, params)
+            self.assertIn(campo, resp.data, params)
+
+    def test_orden_por_total_con_empates_entre_paginas(self):
+        vistos = []
+        resp = self.client.get(self.URL, {'ordering': '-total', 'page_size': 2})
+        while True:
+            self.assertEqual(resp.status_code, 200)
+            vistos += [v['id'] for v in resp.data['results']]
+            if not resp.data['next']:
+                break
+            resp = self.client.get(resp.data['next'])
+
+        # Tres ventas de 100: la página 2 sigue por id, sin saltear ni repetir
+        self.assertEqual(vistos, self.esperados(1, 4, 2, 0, 3))
 
-# Create your tests here.
+    def test_ordering_desconocido_usa_el_por_defecto(self):
+        resp = self.client.get(self.URL, {'ordering': 'cliente'})
+        self.assertEqual([v['id'] for v in resp.data], self.esperados(4, 3, 2, 1, 0))
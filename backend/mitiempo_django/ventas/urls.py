@@ -10,13 +10,15 @@ from .views import (
     resumen_ventas,
     stats_ingresos,
     stats_ingresos_egresos,  # NUEVO
-    dashboard_kpis
+    dashboard_kpis,
+    exportar_ventas
 )
 
 urlpatterns = [
     # Venta CRUD
     path('ventas/', VentaListCreateView.as_view(), name='venta-list'),
     path('ventas/<int:pk>/', VentaDetailView.as_view(), name='venta-detail'),
+    path('ventas/exportar/', exportar_ventas, name='venta-exportar'),
 
     # Estado de venta
     path('estados-venta/', EstadoVentaListView.as_view(), name='estado-venta-list'),
@@ -3,23 +3,33 @@
 # Vistas actualizadas con endpoint de Ingresos/Egresos
 # ========================================
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.db.models import Sum, F, Q
-from django.db.models.functions import TruncDate
 from django.utils import timezone
-from django.utils.dateparse import parse_date
-from datetime import datetime, time, timedelta
+from datetime import timedelta
 from decimal import Decimal
 
+from core.pagination import HistorialCursorPagination
+from core import exportar
+from core.fechas import filtro_dias
+from core.idempotencia import IdempotenciaMixin
+from core.serializers import incluye
+from . import cache_estadisticas
+
 # Modelos
-from .models import Venta, Estado_Venta, Detalle_Venta, Detalle_Venta_Servicio
+from .models import (
+    Venta, Estado_Venta,
+    VentasDiarias, VentasDiariasProducto, VentasDiariasServicio
+)
 from compras.models import Compra
 from movimiento_caja.models import Ingreso, Egreso
 
 # Serializers
 from .serializers import (
     VentaListSerializer,
+    VentaResumenSerializer,
     VentaCreateSerializer,
     VentaUpdateSerializer,
     EstadoVentaSerializer
@@ -29,45 +39,145 @@ from .serializers import (
 #   VISTAS GENÉRICAS (CRUD)
 # ---------------------------------------------------------
 
-class VentaListCreateView(generics.ListCreateAPIView):
+# ?ordering= admitidos (con '-' adelante para descendente)
+ORDEN_VENTAS = {
+    'fecha': 'venta_fecha_hora',
+    'total': 'venta_total',
+    'id': 'id',
+}
+
+
+def orden_ventas(request):
+    """
+    Traduce ?ordering= (ej. '-total') a los campos del queryset, con el id
+    como desempate. Valores desconocidos usan el orden por defecto.
+    """
+    valor = request.query_params.get('ordering', '')
+    campo = ORDEN_VENTAS.get(valor.lstrip('-'))
+    if not campo:
+        return ('-venta_fecha_hora', '-id')
+    signo = '-' if valor.startswith('-') else ''
+    if campo == 'id':
+        return (f'{signo}id',)
+    return (f'{signo}{campo}', f'{signo}id')
+
+
+class VentaPagination(HistorialCursorPagination):
+    ordering = ('-venta_fecha_hora', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return orden_ventas(request)
+
+
+def _entero(params, param):
+    """?param= como int, None si no vino; un valor inválido es un 400."""
+    valor = params.get(param)
+    if not valor:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValidationError({param: "Debe ser un número entero."})
+
+
+def _decimal(params, param):
+    valor = params.get(param)
+    if not valor:
+        return None
+    try:
+        numero = Decimal(valor)
+    except ArithmeticError:
+        numero = None
+    if numero is None or not numero.is_finite():
+        raise ValidationError({param: "Debe ser un monto válido."})
+    return numero
+
+
+class VentaListCreateView(IdempotenciaMixin, generics.ListCreateAPIView):
+    """
+    GET /api/ventas/ventas/
+
+    Filtros (todos opcionales, se combinan):
+      ?fecha=YYYY-MM-DD              un día
+      ?desde=&hasta=                 rango de días (inclusive)
+      ?cliente= ?empleado= ?caja=    ids
+      ?estado=                       id o nombre del estado (ej. Pagado)
+      ?medio_pago=efectivo|transferencia
+      ?total_min= ?total_max=
+      ?ordering=fecha|total|id       con '-' para descendente (def. -fecha)
+      ?vista=resumen                 sin el detalle de productos/servicios
+      ?fields= ?expand=              columnas a devolver (core/serializers.py)
+    """
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = VentaPagination
+
+    def es_resumen(self):
+        return self.request.query_params.get('vista') == 'resumen'
 
     def get_queryset(self):
         qs = Venta.objects.select_related(
-            "cliente", "empleado__user", "caja", "turno", "estado_venta"
-        ).prefetch_related(
-            "detalle_venta_set__producto", 
-            "detalle_venta_servicio_set__servicio"
-        ).order_by("-venta_fecha_hora")
-        
-        # --- FILTRO DE FECHA CORREGIDO (SOLUCIÓN TIMEZONE) ---
-        fecha_str = self.request.query_params.get('fecha')
-        
-        if fecha_str:
-            # 1. Parseamos el string 'YYYY-MM-DD' a objeto date
-            fecha = parse_date(fecha_str)
-            
-            if fecha:
-                # 2. Creamos el rango de inicio (00:00) y fin (23:59:59.999)
-                inicio_dia = datetime.combine(fecha, time.min)
-                fin_dia = datetime.combine(fecha, time.max)
-
-                # 3. Hacemos que las fechas sean "conscientes" (Aware) de la zona horaria
-                start_aware = timezone.make_aware(inicio_dia, timezone.get_current_timezone())
-                end_aware = timezone.make_aware(fin_dia, timezone.get_current_timezone())
-
-                # 4. Filtramos por rango exacto
-                qs = qs.filter(venta_fecha_hora__range=(start_aware, end_aware))
-            
-        return qs
+            "cliente", "empleado__user", "estado_venta"
+        )
+        if not self.es_resumen():
+            # Con ?fields= sólo se cargan las relaciones que se van a mostrar
+            qs = qs.select_related("caja", "turno")
+            if incluye(self.request, 'productos'):
+                qs = qs.prefetch_related("detalle_venta_set__producto")
+            if incluye(self.request, 'servicios'):
+                qs = qs.prefetch_related("detalle_venta_servicio_set__servicio")
+        params = self.request.query_params
+
+        # --- FECHAS (días locales, como rango sobre el índice) ---
+        fecha = exportar.fecha_param(self.request, 'fecha')
+        if fecha:
+            qs = qs.filter(**filtro_dias('venta_fecha_hora', fecha, fecha))
+        desde, hasta = exportar.rango_fechas(self.request)
+        if desde or hasta:
+            qs = qs.filter(**filtro_dias('venta_fecha_hora', desde, hasta))
+
+        # --- RELACIONES ---
+        for param, campo in (('cliente', 'cliente_id'), ('empleado', 'empleado_id'), ('caja', 'caja_id')):
+            valor = _entero(params, param)
+            if valor is not None:
+                qs = qs.filter(**{campo: valor})
+
+        estado = params.get('estado')
+        if estado:
+            if estado.isdigit():
+                qs = qs.filter(estado_venta_id=int(estado))
+            else:
+                qs = qs.filter(estado_venta_id=Estado_Venta.id_por_nombre(estado))
+
+        medio_pago = params.get('medio_pago')
+        if medio_pago:
+            if medio_pago not in dict(Venta.MEDIO_PAGO_CHOICES):
+                raise ValidationError({'medio_pago': "Opciones: efectivo, transferencia."})
+            qs = qs.filter(venta_medio_pago=medio_pago)
+
+        # --- MONTOS ---
+        total_min = _decimal(params, 'total_min')
+        if total_min is not None:
+            qs = qs.filter(venta_total__gte=total_min)
+        total_max = _decimal(params, 'total_max')
+        if total_max is not None:
+            qs = qs.filter(venta_total__lte=total_max)
+
+        return qs.order_by(*orden_ventas(self.request))
 
     def get_serializer_class(self):
         if self.request.method == "POST":
             return VentaCreateSerializer
+        if self.es_resumen():
+            return VentaResumenSerializer
         return VentaListSerializer
 
 
-class VentaDetailView(generics.RetrieveUpdateDestroyAPIView):
+class VentaDetailView(generics.RetrieveUpdateAPIView):
+    """
+    GET/PUT/PATCH /api/ventas/ventas/<id>/
+    Sin DELETE: una venta se anula (PATCH del estado), así se revierten el
+    stock, los acumulados diarios y los totales de la caja.
+    """
     queryset = Venta.objects.all()
     permission_classes = [permissions.IsAuthenticated]
 
@@ -77,6 +187,29 @@ class VentaDetailView(generics.RetrieveUpdateDestroyAPIView):
         return VentaListSerializer
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def exportar_ventas(request):
+    """
+    GET /api/ventas/ventas/exportar/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&formato=csv|ndjson
+    Exporta las ventas (una fila por venta) en streaming.
+    """
+    formato = exportar.formato_pedido(request)
+    desde, hasta = exportar.rango_fechas(request)
+
+    qs = Venta.objects.filter(
+        **filtro_dias('venta_fecha_hora', desde, hasta)
+    ).order_by('venta_fecha_hora', 'id')
+
+    columnas = [
+        'id', 'venta_fecha_hora', 'cliente_id', 'cliente__nombre', 'cliente__apellido',
+        'empleado__user__username', 'caja_id', 'turno_id', 'estado_venta__estado_venta_nombre',
+        'venta_medio_pago', 'venta_descuento', 'venta_total'
+    ]
+    filas = qs.values(*columnas).iterator(chunk_size=exportar.CHUNK_SIZE)
+    return exportar.respuesta_streaming(filas, columnas, formato, 'ventas')
+
+
 class EstadoVentaListView(generics.ListAPIView):
     queryset = Estado_Venta.objects.all().order_by("id")
     serializer_class = EstadoVentaSerializer
@@ -89,26 +222,18 @@ class EstadoVentaListView(generics.ListAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cache_estadisticas.cachear
 def resumen_ventas(request):
-    hoy = timezone.localtime(timezone.now()).date()
-    mes_actual = hoy.month
-    anio_actual = hoy.year
-    
-    inicio_hoy = timezone.make_aware(datetime.combine(hoy, time.min))
-    fin_hoy = timezone.make_aware(datetime.combine(hoy, time.max))
+    hoy = timezone.localdate()
+
+    # Lee los acumulados diarios (ventas/estadisticas.py)
+    ventas_mes = VentasDiarias.objects.filter(fecha__gte=hoy.replace(day=1), fecha__lte=hoy)
 
     # Ventas de Hoy
-    total_hoy = Venta.objects.filter(
-        venta_fecha_hora__range=(inicio_hoy, fin_hoy),
-        estado_venta__estado_venta_nombre='Pagado'
-    ).aggregate(Sum('venta_total'))['venta_total__sum'] or 0
+    total_hoy = ventas_mes.filter(fecha=hoy).aggregate(Sum('total'))['total__sum'] or 0
 
     # Ventas del Mes
-    total_mes = Venta.objects.filter(
-        venta_fecha_hora__year=anio_actual,
-        venta_fecha_hora__month=mes_actual,
-        estado_venta__estado_venta_nombre='Pagado'
-    ).aggregate(Sum('venta_total'))['venta_total__sum'] or 0
+    total_mes = ventas_mes.aggregate(Sum('total'))['total__sum'] or 0
 
     return Response({
         "hoy": total_hoy,
@@ -118,6 +243,7 @@ def resumen_ventas(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cache_estadisticas.cachear
 def stats_ingresos(request):
     """Estadísticas de ingresos por servicios vs productos"""
     dias_param = request.query_params.get('dias', 90)
@@ -126,24 +252,19 @@ def stats_ingresos(request):
     except ValueError:
         dias = 90
 
-    fecha_limite = timezone.now() - timedelta(days=dias)
+    fecha_limite = timezone.localdate() - timedelta(days=dias)
 
-    servicios = Detalle_Venta_Servicio.objects.filter(
-        venta__venta_fecha_hora__gte=fecha_limite,
-        venta__estado_venta__estado_venta_nombre='Pagado'
-    ).annotate(
-        fecha=TruncDate('venta__venta_fecha_hora')
-    ).values('fecha').annotate(
-        total=Sum(F('precio') * F('cantidad') - F('descuento'))
+    # Acumulados diarios: el costo depende de los días, no de las ventas
+    servicios = VentasDiariasServicio.objects.filter(
+        fecha__gte=fecha_limite
+    ).exclude(cantidad=0).values('fecha').annotate(
+        total=Sum('total')
     ).order_by('fecha')
 
-    productos = Detalle_Venta.objects.filter(
-        venta__venta_fecha_hora__gte=fecha_limite,
-        venta__estado_venta__estado_venta_nombre='Pagado'
-    ).annotate(
-        fecha=TruncDate('venta__venta_fecha_hora')
-    ).values('fecha').annotate(
-        total=Sum(F('detalle_venta_precio_unitario') * F('detalle_venta_cantidad') - F('detalle_venta_descuento'))
+    productos = VentasDiariasProducto.objects.filter(
+        fecha__gte=fecha_limite
+    ).exclude(cantidad=0).values('fecha').annotate(
+        total=Sum('total')
     ).order_by('fecha')
 
     data_map = {}
@@ -167,6 +288,7 @@ def stats_ingresos(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cache_estadisticas.cachear
 def stats_ingresos_egresos(request):
     """
     NUEVO ENDPOINT: Ingresos vs Egresos por día
@@ -178,33 +300,30 @@ def stats_ingresos_egresos(request):
     except ValueError:
         dias = 30
 
-    fecha_limite = timezone.now() - timedelta(days=dias)
+    fecha_limite = timezone.localdate() - timedelta(days=dias)
 
-    # 1. INGRESOS: Ventas Pagadas + Ingresos Manuales
-    ventas_diarias = Venta.objects.filter(
-        venta_fecha_hora__gte=fecha_limite,
-        estado_venta__estado_venta_nombre='Pagado'
-    ).annotate(
-        fecha=TruncDate('venta_fecha_hora')
-    ).values('fecha').annotate(
-        total=Sum('venta_total')
+    # 1. INGRESOS: Ventas Pagadas (acumulados diarios) + Ingresos Manuales
+    ventas_diarias = VentasDiarias.objects.filter(
+        fecha__gte=fecha_limite
+    ).exclude(cantidad_ventas=0).values('fecha').annotate(
+        total=Sum('total')
     )
 
     ingresos_manuales = Ingreso.objects.filter(
-        ingreso_fecha__gte=fecha_limite.date()
+        ingreso_fecha__gte=fecha_limite
     ).values('ingreso_fecha').annotate(
         total=Sum('ingreso_monto')
     )
 
     # 2. EGRESOS: Compras + Egresos Manuales
     compras_diarias = Compra.objects.filter(
-        compra_fecha__gte=fecha_limite.date()
+        compra_fecha__gte=fecha_limite
     ).values('compra_fecha').annotate(
         total=Sum('compra_total')
     )
 
     egresos_manuales = Egreso.objects.filter(
-        egreso_fecha__gte=fecha_limite.date()
+        egreso_fecha__gte=fecha_limite
     ).values('egreso_fecha').annotate(
         total=Sum('egreso_monto')
     )
@@ -244,48 +363,48 @@ def stats_ingresos_egresos(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cache_estadisticas.cachear
 def dashboard_kpis(request):
-    hoy = timezone.localtime(timezone.now()).date()
+    hoy = timezone.localdate()
     inicio_mes = hoy.replace(day=1)
     
-    # 1. Ventas del Mes Globales (Solo Pagadas)
-    ventas_mes_qs = Venta.objects.filter(
-        venta_fecha_hora__date__gte=inicio_mes,
-        estado_venta__estado_venta_nombre='Pagado'
-    )
-    
-    total_ingresos_mes = ventas_mes_qs.aggregate(Sum('venta_total'))['venta_total__sum'] or 0
-    cantidad_ventas_mes = ventas_mes_qs.count()
-    ticket_promedio = total_ingresos_mes / cantidad_ventas_mes if cantidad_ventas_mes > 0 else 0
+    # 1. Ventas del Mes Globales (Solo Pagadas), desde los acumulados diarios
+    pagos_desglose = VentasDiarias.objects.filter(
+        fecha__gte=inicio_mes
+    ).values('medio_pago').annotate(
+        total=Sum('total'),
+        cantidad=Sum('cantidad_ventas')
+    ).order_by()
 
     # 2. DESGLOSE: EFECTIVO VS TRANSFERENCIA
-    pagos_desglose = ventas_mes_qs.values('venta_medio_pago').annotate(
-        total=Sum('venta_total')
-    )
-
-    # Transformar a dict para facilitar acceso
     desglose_dict = {
         'efectivo': Decimal(0),
         'transferencia': Decimal(0)
     }
-    
+    total_ingresos_mes = 0
+    cantidad_ventas_mes = 0
+
     for p in pagos_desglose:
-        metodo = p['venta_medio_pago']
+        total_ingresos_mes += p['total']
+        cantidad_ventas_mes += p['cantidad']
+        metodo = p['medio_pago']
         if metodo in desglose_dict:
             desglose_dict[metodo] = p['total']
 
+    ticket_promedio = total_ingresos_mes / cantidad_ventas_mes if cantidad_ventas_mes > 0 else 0
+
     # 3. RANKINGS
-    top_servicios = Detalle_Venta_Servicio.objects.filter(
-        venta__in=ventas_mes_qs
+    top_servicios = VentasDiariasServicio.objects.filter(
+        fecha__gte=inicio_mes
     ).values('servicio__nombre').annotate(
         total_vendidos=Sum('cantidad')
-    ).order_by('-total_vendidos')[:5]
+    ).filter(total_vendidos__gt=0).order_by('-total_vendidos')[:5]
 
-    top_productos = Detalle_Venta.objects.filter(
-        venta__in=ventas_mes_qs
+    top_productos = VentasDiariasProducto.objects.filter(
+        fecha__gte=inicio_mes
     ).values('producto__producto_nombre').annotate(
-        total_vendidos=Sum('detalle_venta_cantidad')
-    ).order_by('-total_vendidos')[:5]
+        total_vendidos=Sum('cantidad')
+    ).filter(total_vendidos__gt=0).order_by('-total_vendidos')[:5]
 
     return Response({
         "finanzas": {